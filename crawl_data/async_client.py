@@ -0,0 +1,207 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for --async
+    aiohttp = None
+
+from config import Config
+from metrics import metrics
+from github_client import GitHubGraphQLClient
+from retry_policy import Outcome, QueryFailedError, QueryResult, classify_response
+
+
+class AsyncGitHubGraphQLClient(GitHubGraphQLClient):
+    """asyncio version of GitHubGraphQLClient with bounded concurrency per API key
+
+    Query builders are inherited; execute_query and fetch_readmes_batch are coroutines here.
+    """
+
+    def __init__(self, api_key_manager, concurrency_per_key: int = None):
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for the async crawler (pip install aiohttp)")
+        super().__init__(api_key_manager)
+        self.concurrency_per_key = concurrency_per_key or Config.ASYNC_CONCURRENCY_PER_KEY
+        self.in_flight = defaultdict(int)
+        self.session = None
+        self._slot_released = None
+        self.connections_opened = 0
+        self.connections_reused = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """Open the shared HTTP session"""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=len(self.api_key_manager.keys) * self.concurrency_per_key)
+            timeout = aiohttp.ClientTimeout(sock_connect=Config.HTTP_CONNECT_TIMEOUT, sock_read=Config.HTTP_READ_TIMEOUT)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers={"Accept-Encoding": "gzip, deflate", "Content-Type": "application/json"},
+                trace_configs=[self._connection_trace()]
+            )
+            self._slot_released = asyncio.Condition()
+
+    def _connection_trace(self) -> "aiohttp.TraceConfig":
+        """Count new vs reused connections"""
+        trace = aiohttp.TraceConfig()
+
+        async def on_create(session, context, params):
+            self.connections_opened += 1
+
+        async def on_reuse(session, context, params):
+            self.connections_reused += 1
+
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    def connection_stats(self) -> Dict[str, int]:
+        """Connection reuse statistics of the session"""
+        return {
+            "requests": self.request_count,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused
+        }
+
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _pick_key(self) -> Optional[str]:
+        """Pick the key with the most headroom that still has a free slot"""
+        free = [key for key in self.api_key_manager.usable_keys() if self.in_flight[key] < self.concurrency_per_key]
+        with self.api_key_manager.lock:
+            usable = [key for key in free if not self.api_key_manager.should_switch_key(self.api_key_manager.headroom(key))]
+            if not usable:
+                return None
+            return max(usable, key=lambda key: self.api_key_manager.headroom(key) - self.in_flight[key])
+
+    async def _acquire_key(self) -> str:
+        """Wait for a free request slot on a key with budget and reserve it"""
+        async with self._slot_released:
+            while True:
+                if not self.api_key_manager.usable_keys():
+                    raise ValueError("All API keys were rejected (401)")
+
+                key = self._pick_key()
+                if key:
+                    self.in_flight[key] += 1
+                    return key
+
+                if self.api_key_manager.best_key() is None:
+                    # Every key is drained: sleep until the earliest reset instead of hammering 403s
+                    wait_time = self.api_key_manager.seconds_until_reset() + 1
+                    print(f"⏳ All API keys drained, sleeping {wait_time:.0f}s until the earliest reset")
+                    try:
+                        await asyncio.wait_for(self._slot_released.wait(), timeout=wait_time)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await self._slot_released.wait()
+
+    async def _release_key(self, key: str):
+        """Give a request slot back"""
+        async with self._slot_released:
+            self.in_flight[key] -= 1
+            self._slot_released.notify_all()
+
+    async def send(self, query: str, variables: Optional[Dict], key: str) -> QueryResult:
+        """Send one request and classify the response"""
+        start = time.perf_counter()
+        try:
+            self.request_count += 1
+            async with self.session.post(
+                self.base_url,
+                json={"query": query, "variables": variables or {}},
+                headers={"Authorization": f"Bearer {key}"},
+            ) as response:
+                body = await response.text()
+                result = classify_response(response.status, response.headers, body)
+                result.latency = time.perf_counter() - start
+        except asyncio.TimeoutError:
+            result = QueryResult(Outcome.NETWORK_ERROR, message="request timeout")
+        except aiohttp.ClientError as e:
+            result = QueryResult(Outcome.NETWORK_ERROR, message=str(e))
+        self.record_metrics(query, result)
+        return result
+
+    async def probe_rate_limits(self):
+        """Query rateLimit for every key concurrently, then make the best key current"""
+        keys = self.api_key_manager.keys
+        results = await asyncio.gather(*(self.send(self.PROBE_QUERY, None, key) for key in keys))
+        self.apply_probe_results(keys, results)
+
+    async def execute(self, query: str, variables: Dict = None) -> QueryResult:
+        """Execute GraphQL query on the key with most headroom, following the retry policy"""
+        await self.start()
+        attempts = self.retry_policy.start()
+
+        while True:
+            key = await self._acquire_key()
+            try:
+                attempts.attempts += 1
+                result = await self.send(query, variables, key)
+                result.attempts = attempts.attempts
+                self.record_key_outcome(result, key)
+                self.report_outcome(result)
+            finally:
+                await self._release_key(key)
+
+            if result.ok or not attempts.should_retry(result):
+                return result
+
+            metrics.inc("github_retries_total", outcome=result.outcome.value)
+            wait_time = attempts.delay(result)
+            if wait_time:
+                # Only this task waits; other requests keep flowing
+                metrics.inc("github_backoff_seconds_total", wait_time, outcome=result.outcome.value)
+                await asyncio.sleep(wait_time)
+
+    async def execute_query(self, query: str, variables: Dict = None) -> Optional[Dict]:
+        """Execute GraphQL query; returns None on query timeout (signal to reduce batch size)"""
+        return self.query_data(await self.execute(query, variables))
+
+    async def execute_timed_query(self, query: str, variables: Dict = None) -> Tuple[Optional[Dict], Optional[float]]:
+        """execute_query, also returning the latency of the request that answered (retry waits excluded)"""
+        result = await self.execute(query, variables)
+        return self.query_data(result), result.latency
+
+    async def fetch_readmes_batch(self, repos: List[Tuple[str, str]], batch_size: int = 25) -> Dict[str, Optional[str]]:
+        """Fetch README batches concurrently, splitting batches that are too large (failed batches are left out)"""
+        readmes = {}
+
+        async def fetch_chunk(chunk):
+            try:
+                result = await self.execute_query(self.get_readmes_batch_query(chunk))
+            except QueryFailedError as e:
+                print(f"  ⚠️ README batch of {len(chunk)} failed: {e}")
+                return
+
+            if self._needs_smaller_batch(result) and len(chunk) > 1:
+                half = len(chunk) // 2
+                print(f"  ⚠️ README batch too large, splitting {len(chunk)} -> {half} + {len(chunk) - half}")
+                await asyncio.gather(fetch_chunk(chunk[:half]), fetch_chunk(chunk[half:]))
+                return
+
+            data = (result or {}).get("data")
+            if not data:
+                # A single repo that timed out or came back without data: left out, not "no README"
+                print(f"  ⚠️ README batch of {len(chunk)} returned no data")
+                return
+            for i, (owner, name) in enumerate(chunk):
+                readmes[f"{owner}/{name}"] = self.extract_readme_text(data.get(f"r{i}"))
+
+        await asyncio.gather(*(fetch_chunk(repos[i:i + batch_size]) for i in range(0, len(repos), batch_size)))
+        return readmes
@@ -0,0 +1,279 @@
+import asyncio
+import copy
+from typing import Dict, List, Optional, Tuple
+from tqdm import tqdm
+from config import Config
+from crawler import GitHubCrawler, ReadmeFetchError
+from journal import atomic_write_json
+from async_client import AsyncGitHubGraphQLClient
+from query_planner import QueryPlanner
+from metrics import metrics
+
+
+class AsyncGitHubCrawler(GitHubCrawler):
+    """Crawl topic/sort pages and README batches concurrently over all API keys
+
+    Checkpoint semantics match GitHubCrawler: "current_topic_index" is the first topic
+    that is not finished yet. Topics past it that are in flight keep their per-sort
+    cursors in "sort_cursors" ("<topic_index>:<sort_index>" -> cursor or "done") and
+    the repos saved so far in "sort_counts".
+    """
+
+    DONE = "done"
+
+    def __init__(self, single_pass: bool = None, partition_search: bool = None):
+        super().__init__(single_pass, partition_search)
+        self.client = AsyncGitHubGraphQLClient(self.api_key_manager)
+        self.checkpoint.setdefault("sort_cursors", {})
+        self.checkpoint.setdefault("sort_counts", {})
+        self.claimed_repos = set()  # Repos being processed by another sort task
+        self.finished_topics = set()
+        self.save_lock = asyncio.Lock()  # Held by saves and by the code changing what they write
+        self.pbar = None
+
+    def resume_state(self, topic_index: int, sort_index: int) -> Tuple[bool, Optional[str]]:
+        """Return (already done, cursor to resume from) for a topic/sort pair"""
+        if topic_index < self.checkpoint.get("current_topic_index", 0):
+            return True, None
+
+        cursor_key = f"{topic_index}:{sort_index}"
+        if cursor_key in self.checkpoint["sort_cursors"]:
+            cursor = self.checkpoint["sort_cursors"][cursor_key]
+            return cursor == self.DONE, None if cursor == self.DONE else cursor
+
+        # Checkpoints written by the sequential crawler
+        if topic_index == self.checkpoint.get("current_topic_index", 0):
+            current_sort_index = self.checkpoint.get("current_sort_index", 0)
+            if sort_index < current_sort_index:
+                return True, None
+            if sort_index == current_sort_index:
+                return False, self.checkpoint.get("current_page")
+
+        return False, None
+
+    def collect_candidates(self, nodes: List[Dict]) -> List[Tuple[Dict, List[str]]]:
+        """Keep new search nodes that no other sort task is processing, and claim them"""
+        candidates = [
+            (repo, topics) for repo, topics in super().collect_candidates(nodes)
+            if repo["id"] not in self.claimed_repos
+        ]
+        self.claimed_repos.update(repo["id"] for repo, _ in candidates)
+        return candidates
+
+    async def fetch_readmes_async(self, repos: List[Dict]) -> Dict[str, str]:
+        """Fetch READMEs for a page of repos with concurrent batched queries"""
+        if self.single_pass or not repos:
+            return self.fetch_readmes(repos)
+
+        repo_names = [tuple(repo["nameWithOwner"].split('/', 1)) for repo in repos]
+        return self.require_readmes(repos, await self.client.fetch_readmes_batch(repo_names, Config.README_BATCH_SIZE))
+
+    async def error_delay(self):
+        """ERROR_DELAY_SECONDS pause of one task, accounted like metrics.sleep"""
+        if Config.ERROR_DELAY_SECONDS > 0:
+            metrics.inc("crawler_sleep_seconds_total", Config.ERROR_DELAY_SECONDS, reason="error_delay")
+            await asyncio.sleep(Config.ERROR_DELAY_SECONDS)
+
+    async def save_checkpoint_async(self):
+        """save_checkpoint with its writes and fsyncs in a thread, off the event loop
+
+        The checkpoint is copied on the loop, since other tasks keep changing it. Tasks
+        wait for save_lock before touching the store, journal or crawled index.
+        """
+        async with self.save_lock:
+            checkpoint = copy.deepcopy(self.checkpoint)
+            await asyncio.to_thread(self.save_checkpoint, checkpoint)
+            self.checkpoint["store"] = checkpoint["store"]
+
+    def advance_topic_watermark(self):
+        """Move current_topic_index past every finished topic"""
+        current = self.checkpoint.get("current_topic_index", 0)
+        while current in self.finished_topics:
+            self.finished_topics.discard(current)
+            for cursor_key in [key for key in self.checkpoint["sort_cursors"] if key.startswith(f"{current}:")]:
+                del self.checkpoint["sort_cursors"][cursor_key]
+                self.checkpoint["sort_counts"].pop(cursor_key, None)
+            current += 1
+
+        if current != self.checkpoint.get("current_topic_index", 0):
+            self.checkpoint.update({
+                "current_topic_index": current,
+                "current_sort_index": 0,
+                "current_page": None,
+            })
+
+    async def plan_topic_search_async(self, topic: str, topic_index: int) -> Optional[List[Dict]]:
+        """Search slices of a topic, with the count queries sent through the async client"""
+        if not self.partition_search:
+            return None
+        plans = self.search_plans
+        if str(topic_index) not in plans:
+            planner = QueryPlanner(self.build_search_query(topic, 'best-match'))
+            while not planner.finished:
+                batch = planner.next_batch()
+                try:
+                    result = await self.client.execute_query(planner.count_query(batch))
+                except Exception as e:
+                    print(f"  ❌ Error counting search slices: {e}")
+                    result = None
+                planner.record(batch, result)
+            plans[str(topic_index)] = planner.plan()
+            self.report_plan(topic, planner, plans[str(topic_index)])
+            atomic_write_json(Config.SEARCH_PLAN_FILE, plans)  # Small and written once per topic, so on the loop
+        return plans[str(topic_index)]
+
+    async def crawl_sort(self, topic: str, topic_index: int, sort_index: int, search: Tuple[str, str, int],
+                         topic_repos: Dict):
+        """Crawl one topic search (sort or slice); pages are sequential, README batches run concurrently"""
+        done, cursor = self.resume_state(topic_index, sort_index)
+        if done:
+            return
+
+        sort_option, search_query, repos_per_sort = search
+        cursor_key = f"{topic_index}:{sort_index}"
+
+        repos_crawled = self.checkpoint["sort_counts"].get(cursor_key, 0)
+        has_next_page = True
+        consecutive_errors = 0
+
+        while has_next_page and repos_crawled < repos_per_sort:
+            # One controller for all searches: its latency estimate sees the real concurrency
+            page_size = self.page_size.size
+            if self.single_pass:
+                query = self.client.search_repos_with_readme_query(search_query, page_size, cursor)
+            else:
+                query = self.client.search_repos_simple_query(search_query, page_size, cursor,
+                                                              readme_sizes=self.prefilter is not None)
+
+            try:
+                result, latency = await self.client.execute_timed_query(query)
+            except Exception as e:
+                print(f"\n  ❌ Error ({topic} - {sort_option}): {e}")
+                consecutive_errors += 1
+                if consecutive_errors > 5:
+                    print(f"  ❌ Too many errors, skipping {topic} - {sort_option}")
+                    break
+                await self.error_delay()
+                continue
+
+            if not result:
+                # Query timeout: shrink the page
+                self.page_size.record_timeout()
+                consecutive_errors += 1
+                if consecutive_errors > 5:
+                    print(f"  ❌ Too many errors, skipping {topic} - {sort_option}")
+                    break
+                await self.error_delay()
+                continue
+
+            if not result.get("data") or "search" not in result["data"]:
+                print(f"  ⚠️ No data returned for {topic} - {sort_option}")
+                break
+
+            search_data = result["data"]["search"]
+            self.page_size.record(page_size, latency, result["data"].get("rateLimit"), len(search_data["nodes"]))
+
+            async with self.save_lock:
+                candidates = self.collect_candidates(search_data["nodes"])
+            try:
+                try:
+                    readmes = await self.fetch_readmes_async([repo for repo, _ in candidates])
+                except ReadmeFetchError as e:
+                    # Retry the same page; its cursor is not advanced
+                    print(f"\n  ❌ Error ({topic} - {sort_option}): {e}")
+                    consecutive_errors += 1
+                    if consecutive_errors > 5:
+                        print(f"  ❌ Too many errors, skipping {topic} - {sort_option}")
+                        break
+                    await self.error_delay()
+                    continue
+                consecutive_errors = 0  # Reset once the whole page came through
+
+                async with self.save_lock:
+                    for repo, topics in candidates:
+                        if repos_crawled >= repos_per_sort:
+                            break
+
+                        repo_data = self.accept_repo(repo, topics, readmes.get(repo["nameWithOwner"]))
+                        if not repo_data:
+                            continue
+
+                        topic_repos[repo_data['repo_id']] = repo_data
+                        repos_crawled += 1
+                        self.repos_since_save += 1
+                        self.pbar.update(1)
+            finally:
+                self.claimed_repos.difference_update(repo["id"] for repo, _ in candidates)
+
+            has_next_page = search_data["pageInfo"]["hasNextPage"]
+            cursor = search_data["pageInfo"]["endCursor"]
+            self.checkpoint["sort_cursors"][cursor_key] = cursor
+            self.checkpoint["sort_counts"][cursor_key] = repos_crawled
+
+            # Save periodically
+            if self.repos_since_save >= self.store.flush_interval:
+                await self.save_checkpoint_async()
+
+        self.checkpoint["sort_cursors"][cursor_key] = self.DONE
+        await self.save_checkpoint_async()
+
+    async def crawl_topic(self, topic: str, topic_index: int, topic_slots: asyncio.Semaphore):
+        """Crawl all searches (sorts or slices) of a topic concurrently"""
+        async with topic_slots:
+            searches = self.topic_searches(topic, await self.plan_topic_search_async(topic, topic_index))
+            topic_repos = {}
+            await asyncio.gather(*(
+                self.crawl_sort(topic, topic_index, sort_index, search, topic_repos)
+                for sort_index, search in enumerate(searches)
+            ))
+            print(f"\n  📊 Total unique repos for {topic}: {len(topic_repos)} ({self.page_size.summary()})")
+
+            self.finished_topics.add(topic_index)
+            self.advance_topic_watermark()
+            await self.save_checkpoint_async()
+            self.prune_search_plans()
+
+    async def crawl_all_topics_async(self):
+        """Crawl all remaining topics with bounded topic concurrency"""
+        start_topic_index = self.checkpoint.get("current_topic_index", 0)
+        topic_slots = asyncio.Semaphore(max(1, len(Config.API_KEYS) * Config.ASYNC_TOPICS_PER_KEY))
+
+        self.pbar = tqdm(desc="  repos")
+        try:
+            async with self.client:
+                if self.should_probe_keys():
+                    await self.client.probe_rate_limits()
+                await asyncio.gather(*(
+                    self.crawl_topic(topic, i, topic_slots)
+                    for i, topic in enumerate(Config.ALL_TOPICS[start_topic_index:], start_topic_index)
+                ))
+        finally:
+            self.pbar.close()
+
+    def crawl_all_topics(self):
+        """Main crawling function"""
+        print("🚀 Starting async GitHub Repository Crawler")
+        print(f"📋 Total topics to crawl: {len(Config.ALL_TOPICS)}")
+        print(f"🔑 Available API keys: {len(Config.API_KEYS)} "
+              f"(up to {Config.ASYNC_CONCURRENCY_PER_KEY} requests in flight per key)")
+
+        try:
+            asyncio.run(self.crawl_all_topics_async())
+
+            print("\n✅ Crawling completed!")
+            print(f"📊 Total unique repositories crawled: {len(self.crawled_repos)}")
+            self.print_connection_stats()
+            if self.prefilter is not None:
+                self.prefilter.print_stats()
+            metrics.print_summary()
+
+        except KeyboardInterrupt:
+            self.save_checkpoint()
+            print("\n\n🛑 Crawling stopped by user")
+            print(f"📊 Progress saved. Crawled {len(self.crawled_repos)} repos so far.")
+            print("ℹ️ Run again to resume from checkpoint.")
+
+        finally:
+            self.store.close()
+            self.journal.close()
+            self.crawled_repos.close()
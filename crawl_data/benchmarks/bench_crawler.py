@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the whole crawl pipeline offline against the stub GitHub API
+Runs GitHubCrawler (and optionally the pipelined and async crawlers) in single-pass and
+two-phase mode against benchmarks/stub_server.py, each in a fresh directory, and
+reports repos/s, requests per repo and rate-limit points per repo. The crawler's
+politeness delays are switched off; retry back-off is shortened with --retry-delay.
+
+Usage: python benchmarks/bench_crawler.py [--topics 3] [--repos 20000] [--repos-per-sort 200]
+                                          [--modes two-phase single-pass] [--pipeline] [--async]
+                                          [--error-rate 0.02]
+"""
+
+import argparse
+import contextlib
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from retry_policy import RetryPolicy
+from stub_server import StubGitHub
+
+
+def run_crawl(mode: str, kind: str, stub: StubGitHub, retry_delay: float):
+    """Crawl in a temporary directory; returns (rows, seconds, requests)"""
+    workdir = tempfile.mkdtemp(prefix=f"bench-crawl-{mode}-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        if kind == 'async':
+            from async_crawler import AsyncGitHubCrawler
+            crawler = AsyncGitHubCrawler(single_pass=(mode == 'single-pass'))
+        elif kind == 'pipeline':
+            from pipeline_crawler import PipelinedCrawler
+            crawler = PipelinedCrawler(single_pass=(mode == 'single-pass'))
+        else:
+            from crawler import GitHubCrawler
+            crawler = GitHubCrawler(single_pass=(mode == 'single-pass'))
+        crawler.client.retry_policy = RetryPolicy(base_delay=retry_delay)
+
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            crawler.crawl_all_topics()
+        elapsed = time.perf_counter() - start
+
+        with open(Config.CSV_FILE, newline='', encoding='utf-8') as f:
+            rows = sum(1 for _ in csv.DictReader(f))
+        return rows, elapsed, crawler.client.request_count
+    finally:
+        os.chdir(cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the crawler against the stub GitHub API')
+    parser.add_argument('--topics', type=int, default=3, help='First N topics of Config.ALL_TOPICS')
+    parser.add_argument('--repos', type=int, default=20000, help='Synthetic repositories served')
+    parser.add_argument('--repos-per-sort', type=int, default=200)
+    parser.add_argument('--modes', nargs='+', default=['two-phase', 'single-pass'], choices=['two-phase', 'single-pass'])
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Also run the async crawler (requires aiohttp)')
+    parser.add_argument('--pipeline', action='store_true', help='Also run the threaded pipeline crawler')
+    parser.add_argument('--keys', type=int, default=2, help='Stub API keys')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 502')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    parser.add_argument('--node-latency', type=float, default=0.0, help='Seconds added per node')
+    parser.add_argument('--retry-delay', type=float, default=0.05, help='Base delay of the retry back-off')
+    args = parser.parse_args()
+
+    topics = Config.ALL_TOPICS[:args.topics]
+    stub = StubGitHub(topics=topics, repos=args.repos, error_rate=args.error_rate, latency=args.latency,
+                      node_latency=args.node_latency)
+    Config.GRAPHQL_ENDPOINT = stub.start()
+    Config.API_KEYS = [f"stub-key-{i + 1}" for i in range(args.keys)]
+    Config.ALL_TOPICS = topics
+    Config.REPOS_PER_SORT = args.repos_per_sort
+    Config.PAGE_DELAY_SECONDS = Config.ERROR_DELAY_SECONDS = Config.TOPIC_PAUSE_SECONDS = 0
+
+    print(f"🧪 {args.repos} stub repos, {len(topics)} topics, {args.repos_per_sort} repos per sort, "
+          f"{args.error_rate:.0%} injected 502s")
+    print(f"  {'crawler':<22} {'repos':>6} {'seconds':>8} {'repos/s':>8} {'requests':>9} {'req/repo':>9} "
+          f"{'points':>7} {'pts/repo':>9}")
+    kinds = ['sequential'] + (['pipeline'] if args.pipeline else []) + (['async'] if args.use_async else [])
+    runs = [(mode, kind) for kind in kinds for mode in args.modes]
+    for mode, kind in runs:
+        points_before = stub.stats["points"]
+        rows, elapsed, requests = run_crawl(mode, kind, stub, args.retry_delay)
+        points = stub.stats["points"] - points_before
+        label = mode if kind == 'sequential' else f"{mode} ({kind})"
+        print(f"  {label:<22} {rows:>6} {elapsed:>8.2f} {rows / elapsed:>8.1f} {requests:>9} "
+              f"{requests / max(1, rows):>9.3f} {points:>7} {points / max(1, rows):>9.3f}")
+    stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark the crawled-repo dedup index backends
+Compares build, save, startup, lookup time and memory of set / sorted / bloom
+at 1M and 10M synthetic GraphQL node IDs.
+
+Usage: python benchmarks/bench_dedup_index.py [--sizes 1000000 10000000] [--lookups 200000]
+"""
+
+import argparse
+import base64
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from dedup_index import create_dedup_index
+
+
+def make_ids(count: int, seed: int):
+    """Node-ID-like strings (R_kgDO + base64 payload)"""
+    rng = random.Random(seed)
+    return ["R_kgDO" + base64.b64encode(rng.getrandbits(64).to_bytes(8, 'little')).decode()[:11]
+            for _ in range(count)]
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_backend(backend: str, ids, hits, misses, workdir: str):
+    Config.CRAWLED_REPOS_FILE = os.path.join(workdir, f"{backend}.json")
+    Config.DEDUP_INDEX_FILE = os.path.join(workdir, f"{backend}.idx")
+    Config.DEDUP_BLOOM_FILE = os.path.join(workdir, f"{backend}.bloom")
+    Config.DEDUP_BLOOM_CAPACITY = max(len(ids), 1)
+
+    def build():
+        index = create_dedup_index(backend)
+        for repo_id in ids:
+            index.add(repo_id)
+        index.save()
+        return index
+
+    index, build_time, build_peak = measure(build)
+    index.close()
+    index, startup_time, startup_peak = measure(lambda: create_dedup_index(backend))
+
+    start = time.perf_counter()
+    found = sum(1 for repo_id in hits if repo_id in index)
+    hit_rate = len(hits) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    false_hits = sum(1 for repo_id in misses if repo_id in index)
+    miss_rate = len(misses) / (time.perf_counter() - start)
+    index.close()
+
+    assert found == len(hits), f"{backend}: lost {len(hits) - found} IDs"
+    disk = sum(os.path.getsize(path) for path in (Config.CRAWLED_REPOS_FILE, Config.DEDUP_INDEX_FILE,
+                                                   Config.DEDUP_BLOOM_FILE) if os.path.exists(path))
+    print(f"  {backend:<7} build+save {build_time:7.1f}s (peak {build_peak / 2**20:7.1f} MB) | "
+          f"startup {startup_time:6.2f}s (peak {startup_peak / 2**20:7.1f} MB) | "
+          f"hits {hit_rate:9.0f}/s | misses {miss_rate:9.0f}/s ({false_hits} false) | disk {disk / 2**20:6.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dedup index backends')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--lookups', type=int, default=200_000)
+    parser.add_argument('--backends', nargs='+', default=['set', 'sorted', 'bloom'])
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        print(f"\n📏 {size:,} repo IDs")
+        ids = make_ids(size, seed=1)
+        hits = random.Random(2).sample(ids, min(args.lookups, size))
+        misses = make_ids(args.lookups, seed=3)
+        with tempfile.TemporaryDirectory() as workdir:
+            for backend in args.backends:
+                bench_backend(backend, ids, hits, misses, workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark README language detection
+Measures throughput and English precision/recall of the language detectors on a
+labeled sample of the README corpus: JSONL lines with a 'readme' text and an
+'english' true/false label (e.g. hand-labeled lines taken from readme_data.jsonl).
+
+Usage: python benchmarks/bench_language_id.py --sample readme_langid_sample.jsonl [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from language_id import create_language_detector
+
+
+def load_sample(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [row['readme'] for row in rows], [bool(row['english']) for row in rows]
+
+
+def bench_backend(backend: str, texts, labels, repeat: int):
+    detector = create_language_detector(backend)
+    predictions = detector.is_english_batch(texts)  # Warm-up (fills the word cache)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        predictions = detector.is_english_batch(texts)
+    elapsed = time.perf_counter() - start
+
+    true_positives = sum(1 for p, l in zip(predictions, labels) if p and l)
+    precision = true_positives / max(1, sum(predictions))
+    recall = true_positives / max(1, sum(labels))
+    size = sum(len(text) for text in texts) * repeat
+    print(f"  {backend:<7} {len(texts) * repeat / elapsed:9.0f} READMEs/s ({size / elapsed / 2**20:6.1f} MB/s) | "
+          f"precision {precision:.3f} | recall {recall:.3f}")
+    return predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark README language detection')
+    parser.add_argument('--sample', default='readme_langid_sample.jsonl', help='Labeled JSONL sample')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--backends', nargs='+', default=['simple', 'ngram'])
+    parser.add_argument('--show-errors', action='store_true', help='Print misclassified READMEs of the last backend')
+    args = parser.parse_args()
+
+    texts, labels = load_sample(args.sample)
+    print(f"📏 {len(texts)} READMEs ({sum(labels)} English)")
+    for backend in args.backends:
+        predictions = bench_backend(backend, texts, labels, args.repeat)
+
+    if args.show_errors:
+        for text, label, prediction in zip(texts, labels, predictions):
+            if label != prediction:
+                print(f"\n--- labeled {'English' if label else 'other'}, predicted {'English' if prediction else 'other'}")
+                print(text[:300])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark README storage: plain JSONL vs zstd shards (with and without a dictionary)
+Writes a README corpus through CsvJsonlStore, flushing as often as the crawler does
+(or every --flush-every records), then reports write throughput, bytes on disk, a
+full sequential read and random get()s through ReadmeCorpus. Each backend runs in a fresh temporary directory.
+
+Usage: python benchmarks/bench_readme_storage.py --readmes readme_data.jsonl [--limit 50000] [--lookups 2000]
+       python benchmarks/bench_readme_storage.py --synthetic 20000 [--flush-every 1000]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from readme_corpus import ReadmeCorpus
+from storage import CsvJsonlStore
+
+# (label, README_COMPRESSION, README_ZSTD_DICT_SAMPLES)
+BACKENDS = [("jsonl", None, 0), ("zstd", "zstd", 0), ("zstd+dict", "zstd", 2000)]
+
+
+def load_records(args):
+    if args.readmes:
+        records = []
+        with open(args.readmes, 'r', encoding='utf-8') as f:
+            for line in f:
+                records.append(json.loads(line))
+                if args.limit and len(records) >= args.limit:
+                    break
+        return records
+    from stub_server import StubGitHub
+    stub = StubGitHub(repos=args.synthetic)
+    return [{'repo_id': repo.id, 'full_name': name, 'readme': repo.readme, 'timestamp': '2024-01-01T00:00:00'}
+            for name, repo in stub.by_name.items() if repo.readme]
+
+
+def directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def bench_backend(label: str, compression, dict_samples: int, records, lookups: int, flush_every: int = None):
+    workdir = tempfile.mkdtemp(prefix=f"bench-readme-{label}-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    Config.README_COMPRESSION = compression
+    Config.README_ZSTD_DICT_SAMPLES = dict_samples
+    try:
+        store = CsvJsonlStore()
+        flush_every = flush_every or store.flush_interval
+        start = time.perf_counter()
+        for i, record in enumerate(records, 1):
+            store.write_readme(record['repo_id'], record['full_name'], record['readme'], record['timestamp'])
+            if i % flush_every == 0:
+                store.flush()
+        store.close()
+        write_seconds = time.perf_counter() - start
+        disk = directory_bytes(workdir)
+
+        start = time.perf_counter()
+        read = sum(1 for _ in CsvJsonlStore().iter_readmes())
+        scan_seconds = time.perf_counter() - start
+
+        ids = [record['repo_id'] for record in random.Random(1).choices(records, k=lookups)]
+        with ReadmeCorpus() as corpus:
+            start = time.perf_counter()
+            found = sum(1 for repo_id in ids if corpus.get(repo_id) is not None)
+            lookup_seconds = time.perf_counter() - start
+        if read != len(records) or found != lookups:
+            raise RuntimeError(f"{label}: read {read}/{len(records)} records, found {found}/{lookups}")
+        return write_seconds, disk, scan_seconds, lookup_seconds
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark README storage backends')
+    parser.add_argument('--readmes', help='README JSONL file (e.g. readme_data.jsonl)')
+    parser.add_argument('--limit', type=int, help='First N records of --readmes')
+    parser.add_argument('--synthetic', type=int, default=20000, help='Stub repositories when --readmes is not given')
+    parser.add_argument('--lookups', type=int, default=2000, help='Random get() calls')
+    parser.add_argument('--flush-every', type=int, help="Records per flush (default: the store's flush interval)")
+    args = parser.parse_args()
+
+    records = load_records(args)
+    raw = sum(len(json.dumps(record, ensure_ascii=False).encode('utf-8')) + 1 for record in records)
+    print(f"📚 {len(records)} READMEs, {raw / 2**20:.1f} MB as JSONL")
+    print(f"  {'backend':<10} {'write MB/s':>10} {'disk MB':>8} {'ratio':>6} {'scan MB/s':>10} {'get/s':>8}")
+    for label, compression, dict_samples in BACKENDS:
+        write_seconds, disk, scan_seconds, lookup_seconds = bench_backend(label, compression, dict_samples,
+                                                                          records, args.lookups, args.flush_every)
+        print(f"  {label:<10} {raw / write_seconds / 2**20:>10.1f} {disk / 2**20:>8.1f} {raw / disk:>6.2f} "
+              f"{raw / scan_seconds / 2**20:>10.1f} {args.lookups / lookup_seconds:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
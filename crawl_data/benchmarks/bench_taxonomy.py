@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark row-wise vs vectorized taxonomy classification
+Times df['topics'].apply(classify_repository) against classify_series on synthetic
+topic strings and checks that both give identical categories.
+
+Usage: python benchmarks/bench_taxonomy.py [--rows 1000000] [--seed 1]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from config import Config
+from taxonomy import TaxonomyClassifier
+
+
+def make_topics(rows: int, seed: int) -> pd.Series:
+    """Topic strings mixing taxonomy topics, unknown topics, duplicates and missing values"""
+    rng = random.Random(seed)
+    known = sorted({topic for topics in Config.TOPICS.values() for topic in topics})
+    unknown = [f"misc-topic-{i}" for i in range(2000)]
+    values = []
+    for _ in range(rows):
+        roll = rng.random()
+        if roll < 0.05:
+            values.append(None)
+        elif roll < 0.07:
+            values.append("")
+        else:
+            count = rng.randint(1, 8)
+            topics = [rng.choice(known) if rng.random() < 0.6 else rng.choice(unknown) for _ in range(count)]
+            values.append(';'.join(topics))
+    return pd.Series(values, name='topics')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark taxonomy classification')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    classifier = TaxonomyClassifier()
+    topics = make_topics(args.rows, args.seed)
+    print(f"📏 {args.rows:,} repos")
+
+    start = time.perf_counter()
+    expected = topics.apply(classifier.classify_repository)
+    row_time = time.perf_counter() - start
+    print(f"  row-wise apply   {row_time:7.2f}s ({args.rows / row_time:10.0f} repos/s)")
+
+    start = time.perf_counter()
+    actual = classifier.classify_series(topics)
+    vector_time = time.perf_counter() - start
+    print(f"  classify_series  {vector_time:7.2f}s ({args.rows / vector_time:10.0f} repos/s)")
+
+    mismatches = int((expected != actual).sum())
+    assert mismatches == 0, f"{mismatches} rows differ from classify_repository"
+    print(f"✅ Identical results, {row_time / vector_time:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Local stub of the GitHub GraphQL API for offline crawls and benchmarks
+Serves a deterministic synthetic population of repositories and answers the queries
+the crawler sends: topic searches with cursor pagination and the 1,000-result cap,
+aliased repositoryCount queries, aliased README batches, single-pass README blobs
+and nodes(ids:) refreshes. Every key has its own rate-limit budget (rateLimit block,
+X-RateLimit-* headers, 403 once spent); 502s, secondary rate limits and latency
+(timeouts past --timeout) are injected as configured.
+
+Usage: python benchmarks/stub_server.py [--port 8787] [--repos 20000] [--error-rate 0.01]
+       python main.py --crawl --endpoint http://127.0.0.1:8787/graphql
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from github_client import GitHubGraphQLClient
+
+ENGLISH = ("this project provides a simple and fast library for building web applications with a clean api "
+           "you can install it with pip and use it in your own code the documentation explains how to "
+           "configure the server run the tests and deploy the service to production").split()
+SPANISH = ("este proyecto es una herramienta para crear aplicaciones web con una interfaz sencilla puedes "
+           "instalarlo con pip y usarlo en tu propio código la documentación explica cómo configurar el "
+           "servidor ejecutar las pruebas y desplegar el servicio").split()
+TIMEOUT_ERROR = ("Something went wrong while executing your query. This may be the result of a timeout, "
+                 "or it could be a GitHub bug.")
+
+
+class StubRepo:
+    __slots__ = ("index", "id", "owner", "name", "topics", "stars", "forks", "created", "updated",
+                 "description", "readme", "readme_path", "head")
+
+    def to_node(self, readme_field: Optional[str]) -> Dict:
+        node = {
+            "id": self.id,
+            "name": self.name,
+            "nameWithOwner": f"{self.owner}/{self.name}",
+            "description": self.description,
+            "primaryLanguage": {"name": "Python"},
+            "repositoryTopics": {"nodes": [{"topic": {"name": topic}} for topic in self.topics]},
+            "stargazerCount": self.stars,
+            "forkCount": self.forks,
+            "createdAt": f"{self.created.isoformat()}T00:00:00Z",
+            "updatedAt": f"{self.updated.isoformat()}T00:00:00Z",
+            "url": f"https://github.com/{self.owner}/{self.name}",
+            "defaultBranchRef": {"name": "main", "target": {"oid": self.head}},
+        }
+        if readme_field:
+            node.update(self.readme_blobs(readme_field))
+        return node
+
+    def readme_blobs(self, field: str) -> Dict:
+        """README aliases of GitHubGraphQLClient.readme_fields, with 'text' or 'byteSize'"""
+        blobs = {alias: None for alias, _ in GitHubGraphQLClient.README_EXPRESSIONS}
+        if self.readme is not None:
+            value = self.readme if field == "text" else len(self.readme.encode('utf-8'))
+            blobs[self.readme_path] = {field: value}
+        return blobs
+
+
+class StubGitHub:
+    """Synthetic repository population plus the request handling and per-key rate limits"""
+
+    def __init__(self, topics: List[str] = None, repos: int = 20000, seed: int = 1, rate_limit: int = 5000,
+                 window: float = 3600, error_rate: float = 0.0, secondary_rate: float = 0.0,
+                 latency: float = 0.0, node_latency: float = 0.0, timeout: float = 10.0):
+        self.topics = topics or Config.ALL_TOPICS
+        self.rng = random.Random(seed)
+        self.repos = [self.make_repo(i) for i in range(repos)]
+        self.by_id = {repo.id: repo for repo in self.repos}
+        self.by_name = {f"{repo.owner}/{repo.name}": repo for repo in self.repos}
+        self.rate_limit = rate_limit
+        self.window = window
+        self.error_rate = error_rate
+        self.secondary_rate = secondary_rate
+        self.latency = latency
+        self.node_latency = node_latency
+        self.timeout = timeout
+        self.budgets: Dict[str, Dict] = {}
+        self.search_cache: Dict[str, List[StubRepo]] = {}
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.server = None
+
+    def make_repo(self, index: int) -> StubRepo:
+        rng = self.rng
+        repo = StubRepo()
+        repo.index = index
+        repo.id = "R_kgDO" + base64.b64encode(index.to_bytes(6, 'big')).decode()
+        repo.owner = f"owner{index % 997}"
+        repo.name = f"project-{index}"
+        repo.topics = rng.sample(self.topics, k=min(len(self.topics), rng.randint(1, 3)))
+        repo.stars = int(rng.paretovariate(1.1)) - 1
+        repo.forks = repo.stars // rng.randint(2, 10)
+        repo.created = date(2010, 1, 1) + timedelta(days=rng.randrange(5000))
+        repo.updated = repo.created + timedelta(days=rng.randrange(1000))
+        repo.head = f"{rng.getrandbits(160):040x}"
+        words = SPANISH if rng.random() < 0.08 else ENGLISH
+        repo.description = " ".join(rng.choice(words) for _ in range(rng.randint(4, 12)))
+        roll = rng.random()
+        if roll < 0.04:
+            repo.readme = None
+        elif roll < 0.07:
+            repo.readme = "# " + repo.name
+        else:
+            paragraphs = rng.randint(2, 30)
+            repo.readme = f"# {repo.name}\n\n" + "\n\n".join(
+                " ".join(rng.choice(words) for _ in range(rng.randint(15, 60))) for _ in range(paragraphs))
+        repo.readme_path = "readmeRst" if rng.random() < 0.05 else "readme"
+        return repo
+
+    # Search
+
+    def search(self, query: str) -> List[StubRepo]:
+        """Repos matching a search string, in its sort order"""
+        with self.lock:
+            if query in self.search_cache:
+                return self.search_cache[query]
+        results = self.repos
+        for qualifier, value in re.findall(r'(\w+):(\S+)', query):
+            results = self.apply_qualifier(results, qualifier, value)
+        sort = re.search(r'sort:(\w+)-desc', query)
+        if sort:
+            key = {"stars": lambda r: r.stars, "forks": lambda r: r.forks, "updated": lambda r: r.updated}[sort.group(1)]
+            results = sorted(results, key=key, reverse=True)
+        with self.lock:
+            self.search_cache[query] = results
+        return results
+
+    def apply_qualifier(self, results: List[StubRepo], qualifier: str, value: str) -> List[StubRepo]:
+        if qualifier == "topic":
+            return [r for r in results if value in r.topics]
+        if qualifier in ("stars", "forks"):
+            field = (lambda r: r.stars) if qualifier == "stars" else (lambda r: r.forks)
+            if value.startswith(">="):
+                return [r for r in results if field(r) >= int(value[2:])]
+            if value.startswith(">"):
+                return [r for r in results if field(r) > int(value[1:])]
+            low, high = value.split("..")
+            return [r for r in results if int(low) <= field(r) <= int(high)]
+        if qualifier in ("created", "pushed"):
+            field = (lambda r: r.created) if qualifier == "created" else (lambda r: r.updated)
+            if value.startswith(">"):
+                return [r for r in results if field(r) > date.fromisoformat(value[1:])]
+            low, high = value.split("..")
+            return [r for r in results if date.fromisoformat(low) <= field(r) <= date.fromisoformat(high)]
+        return results  # language:, in:, sort: and others do not filter
+
+    # Request handling
+
+    @staticmethod
+    def blob_field(fragment: str) -> Optional[str]:
+        """'text' or 'byteSize' if the fragment selects README blobs"""
+        match = re.search(r'\.\.\. on Blob \{\s*(\w+)', fragment)
+        return match.group(1) if match else None
+
+    def answer(self, query: str) -> Dict:
+        """Data of a GraphQL query, plus its cost and node count"""
+        data = {}
+        counts = re.findall(r'(s\d+): search\(query: "([^"]*)", type: REPOSITORY, first: 0\)', query)
+        if counts:
+            self.stats["count_queries"] += 1
+            for alias, search_query in counts:
+                data[alias] = {"repositoryCount": len(self.search(search_query))}
+            return {"data": data, "cost": 1, "nodes": len(counts)}
+
+        search = re.search(r'search\(\s*query: "([^"]*)"\s*type: REPOSITORY\s*first: (\d+)\s*(?:, after: "([^"]*)")?', query)
+        if search:
+            self.stats["search_pages"] += 1
+            results = self.search(search.group(1))
+            first = int(search.group(2))
+            offset = int(base64.b64decode(search.group(3)).decode().split(":")[1]) if search.group(3) else 0
+            page = results[:1000][offset:offset + first]
+            end = offset + len(page)
+            data["search"] = {
+                "repositoryCount": len(results),
+                "pageInfo": {"hasNextPage": end < min(1000, len(results)),
+                             "endCursor": base64.b64encode(f"cursor:{end}".encode()).decode()},
+                "nodes": [repo.to_node(self.blob_field(query)) for repo in page]
+            }
+            # GitHub: one request for the search plus one per node's topics connection, /100
+            return {"data": data, "cost": max(1, round((1 + first) / 100)), "nodes": first + first * 20}
+
+        ids = re.search(r'nodes\(ids: (\[[^\]]*\])\)', query)
+        if ids:
+            self.stats["node_queries"] += 1
+            node_ids = json.loads(ids.group(1))
+            data["nodes"] = [self.by_id[i].to_node(None) if i in self.by_id else None for i in node_ids]
+            return {"data": data, "cost": max(1, round(len(node_ids) / 100)), "nodes": len(node_ids) * 21}
+
+        repositories = re.findall(r'(?:(r\d+): )?repository\(owner: "([^"]*)", name: "([^"]*)"\)', query)
+        if repositories:
+            self.stats["readme_queries"] += 1
+            field = self.blob_field(query)
+            for alias, owner, name in repositories:
+                repo = self.by_name.get(f"{owner}/{name}")
+                data[alias or "repository"] = repo.readme_blobs(field) if repo else None
+            return {"data": data, "cost": 1, "nodes": len(repositories)}
+
+        if "rateLimit" in query:
+            # Budget-only probe: the rateLimit block is added by handle()
+            self.stats["probe_queries"] += 1
+            return {"data": {}, "cost": 1, "nodes": 0}
+
+        return {"data": None, "cost": 1, "nodes": 0}
+
+    def charge(self, key: str, cost: int) -> Dict:
+        """Spend points of a key's budget; returns its state (remaining < 0: rate limited)"""
+        with self.lock:
+            now = time.time()
+            budget = self.budgets.get(key)
+            if budget is None or budget["reset"] <= now:
+                budget = self.budgets[key] = {"remaining": self.rate_limit, "reset": now + self.window}
+            if budget["remaining"] < cost:
+                return {"remaining": -1, "reset": budget["reset"]}
+            budget["remaining"] -= cost
+            self.stats["points"] += cost
+            return dict(budget)
+
+    def handle(self, key: str, payload: Dict):
+        """(status, headers, body) for one request"""
+        self.stats["requests"] += 1
+        if self.rng.random() < self.error_rate:
+            self.stats["injected_502"] += 1
+            return 502, {}, "<html><body><h1>502 Bad Gateway</h1></body></html>"
+        if self.rng.random() < self.secondary_rate:
+            self.stats["injected_secondary"] += 1
+            return 403, {"Retry-After": "1"}, json.dumps({"message": "You have exceeded a secondary rate limit."})
+
+        answer = self.answer(payload.get("query", ""))
+        budget = self.charge(key, answer["cost"])
+        headers = {"X-RateLimit-Limit": str(self.rate_limit), "X-RateLimit-Reset": str(int(budget["reset"]))}
+        if budget["remaining"] < 0:
+            self.stats["rate_limited"] += 1
+            headers["X-RateLimit-Remaining"] = "0"
+            return 403, headers, json.dumps({"message": "API rate limit exceeded"})
+        headers["X-RateLimit-Remaining"] = str(budget["remaining"])
+
+        latency = self.latency + self.node_latency * answer["nodes"]
+        if latency > self.timeout:
+            time.sleep(self.timeout)
+            self.stats["timeouts"] += 1
+            return 200, headers, json.dumps({"data": None, "errors": [{"message": TIMEOUT_ERROR}]})
+        if latency:
+            time.sleep(latency)
+
+        data = answer["data"]
+        if data is not None:
+            data["rateLimit"] = {"cost": answer["cost"], "nodeCount": answer["nodes"], "limit": self.rate_limit,
+                                 "remaining": budget["remaining"],
+                                 "resetAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(budget["reset"]))}
+        return 200, headers, json.dumps({"data": data}, ensure_ascii=False)
+
+    # Server
+
+    def start(self, port: int = 0) -> str:
+        """Serve in a background thread; returns the GraphQL endpoint URL"""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                key = self.headers.get("Authorization", "").replace("Bearer ", "")
+                status, headers, body = stub.handle(key, payload)
+                encoded = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(encoded)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}/graphql"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stub of the GitHub GraphQL API')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--repos', type=int, default=20000, help='Synthetic repositories')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--rate-limit', type=int, default=5000, help='Points per key per window')
+    parser.add_argument('--window', type=float, default=3600, help='Rate-limit window in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 502')
+    parser.add_argument('--secondary-rate', type=float, default=0.0, help='Share answered with a secondary rate limit')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    parser.add_argument('--node-latency', type=float, default=0.0, help='Seconds added per node (rateLimit.nodeCount)')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Latency past which a query times out')
+    args = parser.parse_args()
+
+    stub = StubGitHub(repos=args.repos, seed=args.seed, rate_limit=args.rate_limit, window=args.window,
+                      error_rate=args.error_rate, secondary_rate=args.secondary_rate, latency=args.latency,
+                      node_latency=args.node_latency, timeout=args.timeout)
+    url = stub.start(args.port)
+    print(f"🧪 Stub GitHub GraphQL API with {args.repos} repos at {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"  📊 {dict(stub.stats)}")
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import sqlite3
+from collections import Counter
+from typing import List, Optional, Tuple
+from config import Config
+
+
+class ClassificationCache:
+    """Per-repo classification results in SQLite, with running topic and category counts
+
+    Results are valid for one taxonomy hash; when the taxonomy or priority order
+    changes the cache is cleared and every repo is classified again. The counts are
+    maintained with deltas, so they always equal the totals over the cached results.
+    Repos looked up in a run are remembered; remove_unseen() drops the ones that left
+    the input, so the counts match the current input.
+    """
+
+    def __init__(self, taxonomy_hash: str, path: str = None):
+        self.path = path or Config.CLASSIFY_CACHE_FILE
+        self.conn = sqlite3.connect(self.path)
+        self.classified = 0  # Repos classified (not served from the cache) in this run
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS results (repo_id TEXT PRIMARY KEY, topics TEXT, category TEXT);
+            CREATE TABLE IF NOT EXISTS topic_counts (topic TEXT UNIQUE, count INTEGER);
+            CREATE TABLE IF NOT EXISTS category_counts (category TEXT UNIQUE, count INTEGER);
+            CREATE TEMP TABLE chunk (repo_id TEXT, topics TEXT);
+            CREATE TEMP TABLE seen (repo_id TEXT PRIMARY KEY);
+        """)
+
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'taxonomy_hash'").fetchone()
+        if row is None or row[0] != taxonomy_hash:
+            if row is not None:
+                print("🔄 Taxonomy changed, clearing the classification cache")
+            self.conn.executescript("DELETE FROM results; DELETE FROM topic_counts; DELETE FROM category_counts;")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('taxonomy_hash', ?)", (taxonomy_hash,))
+            self.conn.commit()
+
+    def cached_categories(self, repo_ids: List[str], topics: List[Optional[str]]) -> List[Optional[str]]:
+        """Cached category per repo, or None where the repo is new or its topics changed"""
+        self.conn.execute("DELETE FROM chunk")
+        self.conn.executemany("INSERT INTO chunk VALUES (?, ?)", zip(repo_ids, topics))
+        self.conn.execute("INSERT OR IGNORE INTO seen SELECT repo_id FROM chunk")
+        rows = self.conn.execute(
+            "SELECT r.category FROM chunk c LEFT JOIN results r ON r.repo_id = c.repo_id AND r.topics IS c.topics "
+            "ORDER BY c.rowid"
+        )
+        return [category for category, in rows]
+
+    def changed_results(self) -> List[Tuple[Optional[str], str]]:
+        """Previous (topics, category) of the repos in the last cached_categories call whose topics changed"""
+        return self.conn.execute(
+            "SELECT r.topics, r.category FROM chunk c JOIN results r ON r.repo_id = c.repo_id WHERE r.topics IS NOT c.topics"
+        ).fetchall()
+
+    def store(self, results: List[Tuple[str, Optional[str], str]], topic_delta: Counter, category_delta: Counter):
+        """Save new results and apply the count deltas in one transaction"""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", results)
+            self._apply_deltas(topic_delta, category_delta)
+        self.classified += len(results)
+
+    def remove_unseen(self) -> int:
+        """Drop the results of repos not looked up in this run and take them out of the counts"""
+        removed = self.conn.execute(
+            "SELECT topics, category FROM results WHERE repo_id NOT IN (SELECT repo_id FROM seen)"
+        ).fetchall()
+        if not removed:
+            return 0
+        topic_delta, category_delta = Counter(), Counter()
+        for topics, category in removed:
+            if topics is not None:
+                topic_delta.subtract(topics.split(';'))
+            category_delta[category] -= 1
+        with self.conn:
+            self.conn.execute("DELETE FROM results WHERE repo_id NOT IN (SELECT repo_id FROM seen)")
+            self._apply_deltas(topic_delta, category_delta)
+        return len(removed)
+
+    def _apply_deltas(self, topic_delta: Counter, category_delta: Counter):
+        for table, column, delta in (("topic_counts", "topic", topic_delta),
+                                     ("category_counts", "category", category_delta)):
+            self.conn.executemany(
+                f"INSERT INTO {table} VALUES (?, ?) ON CONFLICT({column}) DO UPDATE SET count = count + excluded.count",
+                ((key, count) for key, count in delta.items() if count)
+            )
+            self.conn.execute(f"DELETE FROM {table} WHERE count <= 0")
+
+    def topic_frequency(self) -> Counter:
+        """Topic counts over all cached repos, in first-seen order"""
+        return Counter(dict(self.conn.execute("SELECT topic, count FROM topic_counts ORDER BY rowid")))
+
+    def category_counts(self) -> Counter:
+        """Category counts over all cached repos, in first-seen order"""
+        return Counter(dict(self.conn.execute("SELECT category, count FROM category_counts ORDER BY rowid")))
+
+    def close(self):
+        self.conn.close()
@@ -1,7 +1,10 @@
+import hashlib
 import json
 import os
-from typing import List, Dict
-from datetime import datetime
+import threading
+from typing import List, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from metrics import metrics
 
 class Config:
     # Danh sách 50 topics theo 10 nhóm
@@ -33,40 +36,334 @@ class Config:
     REPOS_PER_TOPIC = 2000
     UNIQUE_REPOS_PER_TOPIC = 1000
     REPOS_PER_SORT = 500
+    README_BATCH_SIZE = 25  # Repos per aliased README query
+    SINGLE_PASS_CRAWL = False  # Select READMEs inside the search query itself
+    
+    # Pre-filter: reject search nodes before paying for their README
+    PREFILTER_ENABLED = True
+    PREFILTER_MIN_README_BYTES = 50  # is_english_readme needs at least 50 characters
+    PREFILTER_MIN_DESCRIPTION_WORDS = 5  # Shorter descriptions are not judged
+    # Descriptions judged non-English are rejected; the "simple" detector below only
+    # recognizes non-Latin scripts (LANGID_MAX_NON_LATIN_RATIO), "ngram" any language
+    PREFILTER_EXCLUDED_LANGUAGES = []  # Primary languages never crawled
+    
+    # README language detection: "simple" (original word check) or "ngram" (character trigram
+    # model). "ngram" is opt-in until benchmarks/bench_language_id.py has validated it on a
+    # labeled sample of real crawl output
+    LANGUAGE_DETECTOR = "simple"
+    LANGID_MIN_WORDS = 8  # Prose words needed to judge a README
+    LANGID_MAX_WORDS = 300  # Words scored per README
+    LANGID_MAX_NON_LATIN_RATIO = 0.3  # More non-Latin letters than this is not English (both detectors)
+    
+    # Search page size (first:), adapted to query cost and latency by PageSizeController
+    PAGE_SIZE_INITIAL = 20
+    PAGE_SIZE_MIN = 5
+    PAGE_SIZE_MAX = 100  # GitHub's first: limit
+    PAGE_SIZE_STEP = 10  # Largest increase per page
+    PAGE_LATENCY_TARGET = 5.0  # Seconds; GitHub aborts queries after ~10s
+    
+    # Search partitioning: split each topic by created:/stars: until every slice is under the cap
+    SEARCH_PARTITIONING = False
+    SEARCH_RESULT_CAP = 1000  # GitHub search returns at most this many results per query
+    SEARCH_PLAN_START = "2008-01-01"  # Earliest created: date searched
+    SEARCH_PLAN_END = None  # Latest created: date searched (ISO date); None: today. Fixtures pin it
+    SEARCH_PLAN_BATCH = 10  # Slices counted per aliased query
     
     # File paths
     CHECKPOINT_FILE = "checkpoint.json"
+    SEARCH_PLAN_FILE = "search_plans.json"  # Slice plans of unfinished topics, written once per plan
     CSV_FILE = "github_repos.csv"
-    README_FILE = "readme_data.jsonl"
+    README_FILE = "readme_data.jsonl"  # Byte offsets of its lines in readme_data.jsonl.idx
+    README_CORPUS_BATCH_SIZE = 1000  # Records per batch of ReadmeCorpus.iter_batches
     CRAWLED_REPOS_FILE = "crawled_repos.json"
+    JOURNAL_FILE = "crawl_journal.log"
+    JOURNAL_COMPACT_BYTES = 4 * 1024 * 1024  # Fold the journal into the snapshot past this size
+    SHARD_DIR = "shards"  # Per-shard checkpoints and output of --workers crawls
+    
+    # Dedup index for crawled repo IDs: "set" (JSON list in memory), "sorted" (mmap'd
+    # sorted hash file) or "bloom" (Bloom filter in front of "sorted")
+    DEDUP_BACKEND = "set"
+    DEDUP_INDEX_FILE = "crawled_repos.idx"
+    DEDUP_BLOOM_FILE = "crawled_repos.bloom"
+    DEDUP_BLOOM_CAPACITY = 10_000_000
+    DEDUP_BLOOM_ERROR_RATE = 0.01
+    
+    # Output store: "csv" (CSV + JSONL) or "parquet" (columnar part files, needs pyarrow)
+    OUTPUT_FORMAT = "csv"
+    PARQUET_REPOS_DIR = "github_repos.parquet"
+    PARQUET_README_DIR = "readme_data.parquet"
+    PARQUET_CHECKPOINT_INTERVAL = 250  # Repos between checkpoints, each writes a part file (below REPOS_PER_SORT)
+    
+    # Compressed READMEs: "zstd" writes one zstd frame per README into size-rotated
+    # shards instead of readme_data.jsonl; None keeps the JSONL file. zstandard is an
+    # optional dependency, only needed for "zstd": pip install zstandard
+    README_COMPRESSION = None
+    README_SHARD_DIR = "readme_shards"  # Shards, their offset indexes, dictionaries and manifest.json
+    README_SHARD_MAX_BYTES = 256 * 1024 * 1024  # Compressed bytes per shard
+    README_ZSTD_LEVEL = 3  # Level 1 is no faster with a dictionary and compresses ~15% worse
+    README_ZSTD_THREADS = -1  # Threads compressing a flush batch (-1: one per CPU)
+    README_ZSTD_PARALLEL_MIN = 256  # Smaller batches are compressed on one thread (threads cost more)
+    README_ZSTD_DICT_SAMPLES = 2000  # READMEs a dictionary is trained on (0: no dictionary)
+    README_ZSTD_DICT_BYTES = 112 * 1024
+    
+    # Classification
+    CLASSIFIED_CSV_FILE = "github_repos_classified.csv"
+    TAXONOMY_MAPPING_FILE = "taxonomy_mapping.json"
+    CLASSIFY_CHUNK_SIZE = 100_000  # Repos read, classified and appended per chunk
+    CLASSIFY_WORKERS = 1  # Processes classifying chunks in parallel
+    CLASSIFY_CACHE_FILE = "classification_cache.db"  # Per-repo results for --incremental
+    
+    # Refresh mode: re-check stored repos and re-fetch only what changed
+    REFRESH_STATE_FILE = "repo_watermarks.db"  # updatedAt / head OID recorded per repo
+    REFRESH_BATCH_SIZE = 100  # Node IDs per nodes(ids:) query (GitHub maximum)
+    REFRESH_REWRITE_INTERVAL = 5000  # Changed repos upserted into the output store per rewrite
+    
+    # README content dedup: exact normalized-text hash + MinHash/LSH near duplicates
+    README_DEDUP_INDEX_FILE = "readme_dedup.db"  # Signatures and LSH buckets of indexed READMEs
+    README_CLUSTERS_FILE = "readme_clusters.csv"
+    README_SHINGLE_SIZE = 5  # Words per shingle
+    README_MINHASH_PERMUTATIONS = 128
+    README_LSH_BANDS = 32  # 4 rows per band: pairs above ~0.4 similarity become candidates
+    README_NEAR_DUP_THRESHOLD = 0.8  # Estimated Jaccard similarity of a near duplicate
     
     # Rate limit threshold
     RATE_LIMIT_THRESHOLD = 100
+    RATE_LIMIT_PER_HOUR = 5000  # GraphQL points per key per window
+    RATE_LIMIT_RETRY_SECONDS = 60  # Back-off for a limited key without resetAt
+    RATE_LIMIT_WINDOW_SECONDS = 3600
+    KEY_STATE_FILE = "key_state.json"  # Budget per key fingerprint, saved with the checkpoint
+    KEY_PROBE_ON_START = True  # Query rateLimit for every key before crawling
+    
+    # GraphQL endpoint (point at benchmarks/stub_server.py to crawl offline)
+    GRAPHQL_ENDPOINT = "https://api.github.com/graphql"
+    HTTP_RECORD_FILE = None  # Append every response to this JSONL fixture file
+    HTTP_REPLAY_FILE = None  # Answer requests from this fixture file instead of the network
+    
+    # Politeness delays of the sequential crawler (seconds)
+    PAGE_DELAY_SECONDS = 1  # After every search page
+    ERROR_DELAY_SECONDS = 10  # After a failed page
+    TOPIC_PAUSE_SECONDS = 5  # Between topics
+    
+    # Metrics (see metrics.py): Prometheus text endpoint and/or periodic JSON snapshot
+    METRICS_PORT = None  # Serve /metrics on this port
+    METRICS_SNAPSHOT_FILE = None  # e.g. "crawl_metrics.json"
+    METRICS_SNAPSHOT_INTERVAL = 60  # Seconds between snapshots
+    
+    # HTTP session settings
+    HTTP_POOL_SIZE = 10  # Keep-alive connections kept per host
+    HTTP_CONNECT_TIMEOUT = 10
+    HTTP_READ_TIMEOUT = 60
+    
+    # Async crawler settings
+    ASYNC_CONCURRENCY_PER_KEY = 4  # In-flight requests per API key
+    ASYNC_TOPICS_PER_KEY = 1  # Topics crawled concurrently per API key
+    
+    # Pipelined crawler (--pipeline): search -> README fetch -> filter -> writer threads
+    PIPELINE_README_WORKERS = 4  # Threads fetching README batches
+    PIPELINE_QUEUE_PAGES = 4  # Pages buffered between two stages
+    PIPELINE_README_ATTEMPTS = 3  # README fetches of a page before its sort is paged again from it
 
 class APIKeyManager:
+    """Hands out the API key with the most rate-limit headroom
+
+    Thread-safe; async callers use best_key()/seconds_until_reset() and sleep themselves.
+    """
+    
     def __init__(self, keys: List[str]):
         self.keys = keys
         self.current_index = 0
         self.rate_limits = {}
+        self.disabled_keys = set()
+        self.lock = threading.RLock()
         
     def get_current_key(self):
         if not self.keys:
             raise ValueError("No API keys configured")
         return self.keys[self.current_index]
     
+    @staticmethod
+    def fingerprint(key: str) -> str:
+        """Stable identifier of a key for state files; the token itself is never written"""
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+    
+    def key_label(self, key: str) -> str:
+        """Metric label of a key: its position, never the token"""
+        return f"key{self.keys.index(key) + 1}" if key in self.keys else "unknown"
+    
+    def usable_keys(self) -> List[str]:
+        """Keys that have not been rejected as invalid"""
+        with self.lock:
+            return [key for key in self.keys if key not in self.disabled_keys]
+    
+    def headroom(self, key: str) -> int:
+        """Known remaining budget of a key; a key with an expired or unknown window has full budget"""
+        with self.lock:
+            info = self.rate_limits.get(key)
+            if not info:
+                return Config.RATE_LIMIT_PER_HOUR
+            reset_at = parse_reset_at(info.get("reset_at"))
+            if reset_at and reset_at <= datetime.now(timezone.utc):
+                return Config.RATE_LIMIT_PER_HOUR
+            return info["remaining"]
+    
+    def best_key(self) -> Optional[str]:
+        """Usable key with the most headroom above the threshold, or None if all are drained"""
+        with self.lock:
+            candidates = [key for key in self.usable_keys() if not self.should_switch_key(self.headroom(key))]
+            if not candidates:
+                return None
+            return max(candidates, key=self.headroom)
+    
+    def seconds_until_reset(self) -> float:
+        """Seconds until the earliest rate-limit window of a usable key resets"""
+        with self.lock:
+            now = datetime.now(timezone.utc)
+            resets = [parse_reset_at(self.rate_limits.get(key, {}).get("reset_at")) for key in self.usable_keys()]
+            resets = [reset_at for reset_at in resets if reset_at]
+            if not resets:
+                return Config.RATE_LIMIT_RETRY_SECONDS
+            return max(0.0, (min(resets) - now).total_seconds())
+    
     def switch_to_next_key(self):
-        """Switch to next API key"""
-        self.current_index = (self.current_index + 1) % len(self.keys)
-        print(f"🔄 Switched to API key #{self.current_index + 1}")
-        return self.get_current_key()
-    
-    def update_rate_limit(self, remaining: int, reset_at: str):
-        """Update rate limit info for current key"""
-        self.rate_limits[self.get_current_key()] = {
-            "remaining": remaining,
-            "reset_at": reset_at
-        }
+        """Switch to the key with the most headroom, sleeping until a reset if every key is drained"""
+        while True:
+            with self.lock:
+                if not self.usable_keys():
+                    raise ValueError("All API keys were rejected (401)")
+                key = self.best_key()
+                if key:
+                    self.current_index = self.keys.index(key)
+                    metrics.inc("github_key_switches_total")
+                    print(f"🔄 Switched to API key #{self.current_index + 1} ({self.headroom(key)} remaining)")
+                    return key
+                wait_time = self.seconds_until_reset() + 1
+            
+            print(f"⏳ All API keys drained, sleeping {wait_time:.0f}s until the earliest reset")
+            metrics.sleep(wait_time, "keys_drained")
+    
+    def update_rate_limit(self, remaining: int, reset_at: str, key: str = None, cost: int = None):
+        """Update rate limit info for a key (current key by default)"""
+        with self.lock:
+            key = key or self.get_current_key()
+            previous = self.rate_limits.get(key, {})
+            self.rate_limits[key] = {
+                "remaining": remaining,
+                "reset_at": reset_at,
+                "cost": previous.get("cost") if cost is None else cost
+            }
+        metrics.set("github_rate_limit_remaining", remaining, key=self.key_label(key))
+    
+    def mark_exhausted(self, key: str = None, reset_at: str = None):
+        """Record that a key hit its rate limit (403 or rate-limit error)"""
+        if not reset_at:
+            retry_at = datetime.now(timezone.utc) + timedelta(seconds=Config.RATE_LIMIT_RETRY_SECONDS)
+            reset_at = retry_at.isoformat()
+        self.update_rate_limit(0, reset_at, key)
+        metrics.inc("github_key_exhausted_total", key=self.key_label(key or self.get_current_key()))
+    
+    def disable_key(self, key: str = None):
+        """Take a key out of rotation for good (401)"""
+        with self.lock:
+            key = key or self.get_current_key()
+            self.disabled_keys.add(key)
+            metrics.inc("github_key_disabled_total", key=self.key_label(key))
+            print(f"🚫 Disabled API key #{self.keys.index(key) + 1} (authentication failed)")
         
+    def enable_key(self, key: str):
+        """Put a key back into rotation (a disabled key answered again)"""
+        with self.lock:
+            if key in self.disabled_keys:
+                self.disabled_keys.discard(key)
+                print(f"✅ Re-enabled API key #{self.keys.index(key) + 1}")
+    
+    def select_best_key(self):
+        """Make the key with the most headroom current, if any has budget left"""
+        with self.lock:
+            key = self.best_key()
+            if key:
+                self.current_index = self.keys.index(key)
+    
     def should_switch_key(self, remaining: int) -> bool:
         """Check if should switch to next key"""
-        return remaining <= Config.RATE_LIMIT_THRESHOLD
\ No newline at end of file
+        return remaining <= Config.RATE_LIMIT_THRESHOLD
+    
+    # Persistence: budgets survive restarts, so drained keys are not rediscovered through 403s
+    
+    def save_state(self, path: str):
+        """Write the budget of every key (by fingerprint) atomically"""
+        with self.lock:
+            state = {
+                self.fingerprint(key): {**self.rate_limits.get(key, {}), "disabled": key in self.disabled_keys}
+                for key in self.keys
+            }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"saved_at": datetime.now(timezone.utc).isoformat(), "keys": state}, f, indent=2)
+        os.replace(tmp_path, path)
+    
+    def load_state(self, path: str) -> int:
+        """Restore saved budgets of the configured keys; returns how many were known
+        
+        A window whose resetAt has passed is rolled forward by whole windows from the
+        current time, with the full budget.
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r') as f:
+                saved = json.load(f).get("keys", {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable key state {path}: {e}")
+            return 0
+        
+        now = datetime.now(timezone.utc)
+        window = timedelta(seconds=Config.RATE_LIMIT_WINDOW_SECONDS)
+        restored = 0
+        with self.lock:
+            for key in self.keys:
+                info = saved.get(self.fingerprint(key))
+                if not info:
+                    continue
+                restored += 1
+                if info.get("disabled"):
+                    self.disabled_keys.add(key)
+                reset_at = parse_reset_at(info.get("reset_at"))
+                if reset_at is None or info.get("remaining") is None:
+                    continue
+                remaining = info["remaining"]
+                if reset_at <= now:
+                    reset_at += window * ((now - reset_at) // window + 1)
+                    remaining = Config.RATE_LIMIT_PER_HOUR
+                self.rate_limits[key] = {
+                    "remaining": remaining,
+                    "reset_at": reset_at.isoformat(),
+                    "cost": info.get("cost")
+                }
+            self.select_best_key()
+        return restored
+    
+    def budget_summary(self) -> str:
+        """One-line budget of every key"""
+        now = datetime.now(timezone.utc)
+        parts = []
+        with self.lock:
+            for key in self.keys:
+                if key in self.disabled_keys:
+                    parts.append(f"{self.key_label(key)} disabled")
+                    continue
+                part = f"{self.key_label(key)} {self.headroom(key)}"
+                reset_at = parse_reset_at(self.rate_limits.get(key, {}).get("reset_at"))
+                if reset_at and reset_at > now and self.should_switch_key(self.headroom(key)):
+                    part += f" (resets in {(reset_at - now).total_seconds() / 60:.0f}m)"
+                parts.append(part)
+        return ", ".join(parts)
+
+
+def parse_reset_at(reset_at: Optional[str]) -> Optional[datetime]:
+    """Parse a GitHub resetAt timestamp (ISO 8601, 'Z' suffix)"""
+    if not reset_at:
+        return None
+    try:
+        return datetime.fromisoformat(reset_at.replace("Z", "+00:00"))
+    except ValueError:
+        return None
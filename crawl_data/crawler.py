@@ -1,62 +1,95 @@
-import csv
 import json
 import os
 import random
 import time
-from datetime import datetime
-from typing import Set, Dict, List
+from typing import Dict, List, Optional, Tuple
 from tqdm import tqdm
 from config import Config, APIKeyManager
 from github_client import GitHubGraphQLClient
+from http_fixtures import FixtureMissingError
+from storage import create_store
+from journal import CrawlJournal, atomic_write_json
+from dedup_index import create_dedup_index
+from query_planner import QueryPlanner
+from prefilter import CandidateFilter
+from language_id import create_language_detector
+from page_size import PageSizeController
+from metrics import metrics
+
+class ReadmeFetchError(Exception):
+    """README batches of a search page failed; the page is retried rather than its repos rejected"""
+
 
 class GitHubCrawler:
-    def __init__(self):
+    SORT_OPTIONS = ['stars', 'forks', 'updated', 'best-match']
+    
+    def __init__(self, single_pass: bool = None, partition_search: bool = None):
         self.api_key_manager = APIKeyManager(Config.API_KEYS)
+        self.restored_keys = self.api_key_manager.load_state(Config.KEY_STATE_FILE)
         self.client = GitHubGraphQLClient(self.api_key_manager)
-        self.checkpoint = self.load_checkpoint()
-        self.crawled_repos = self.load_crawled_repos()
+        self.single_pass = Config.SINGLE_PASS_CRAWL if single_pass is None else single_pass
+        self.partition_search = Config.SEARCH_PARTITIONING if partition_search is None else partition_search
+        # README sizes come with the search page in two-phase mode; single-pass already has the text
+        self.language_detector = create_language_detector()
+        self.prefilter = CandidateFilter(not self.single_pass, self.language_detector) if Config.PREFILTER_ENABLED else None
+        self.store = create_store()
+        self.journal = CrawlJournal()
+        self.crawled_repos = create_dedup_index()
+        self.repos_since_save = 0  # Accepted repos the journal has not committed yet
+        checkpoint = self.journal.load(self.crawled_repos, self.store)
+        self.checkpoint = checkpoint or self.default_checkpoint()
+        self.page_size = PageSizeController.from_checkpoint(self.checkpoint)
+        self.search_plans = self.load_search_plans(checkpoint is not None)
+        if checkpoint is None:
+            self.save_crawled_repos()  # Record where the store starts, so a crash before the first commit is undone
         
-    def load_checkpoint(self) -> Dict:
-        """Load checkpoint from file"""
-        if os.path.exists(Config.CHECKPOINT_FILE):
-            with open(Config.CHECKPOINT_FILE, 'r') as f:
-                return json.load(f)
+    def default_checkpoint(self) -> Dict:
+        """Checkpoint for a fresh crawl"""
         return {
             "current_topic_index": 0,
             "current_sort_index": 0, 
             "current_page": None,
+            "repos_crawled_for_sort": 0,
             "repos_crawled_for_topic": 0,
-            "batch_size": 20  # Start with smaller batch
+            "page_size": {}  # PageSizeController state
         }
     
-    def save_checkpoint(self):
-        """Save checkpoint to file"""
-        with open(Config.CHECKPOINT_FILE, 'w') as f:
-            json.dump(self.checkpoint, f, indent=2)
+    def save_checkpoint(self, checkpoint: Dict = None):
+        """Commit the checkpoint (or a snapshot of it) together with the crawled repos, and save the key budgets"""
+        self.save_crawled_repos(checkpoint)
+        self.api_key_manager.save_state(Config.KEY_STATE_FILE)
+    
+    def should_probe_keys(self) -> bool:
+        """Probe key budgets at startup (not when replaying fixtures, which may not hold the probe)"""
+        if self.restored_keys:
+            print(f"🔑 Restored saved budgets of {self.restored_keys} key(s)")
+        return Config.KEY_PROBE_ON_START and not Config.HTTP_REPLAY_FILE
     
-    def load_crawled_repos(self) -> Set[str]:
-        """Load set of already crawled repo IDs"""
-        if os.path.exists(Config.CRAWLED_REPOS_FILE):
-            with open(Config.CRAWLED_REPOS_FILE, 'r') as f:
-                return set(json.load(f))
-        return set()
+    def mark_crawled(self, repo_id: str):
+        """Add a repo to the crawled set and journal it"""
+        self.crawled_repos.add(repo_id)
+        self.journal.append_repo(repo_id)
     
-    def save_crawled_repos(self):
-        """Save crawled repo IDs"""
-        with open(Config.CRAWLED_REPOS_FILE, 'w') as f:
-            json.dump(list(self.crawled_repos), f)
+    def save_crawled_repos(self, checkpoint: Dict = None):
+        """Flush the output store to disk, then commit the journal with the checkpoint and the store's size"""
+        checkpoint = self.checkpoint if checkpoint is None else checkpoint
+        with metrics.timer("crawler_io_seconds", op="store_flush"):
+            self.store.flush()
+        checkpoint["store"] = self.store.position()
+        self.journal.append_checkpoint(checkpoint)
+        with metrics.timer("crawler_io_seconds", op="journal_commit"):
+            self.journal.commit()
+        self.repos_since_save = 0
+        if self.journal.needs_compaction():
+            self.compact_journal(checkpoint)
+    
+    def compact_journal(self, checkpoint: Dict = None):
+        with metrics.timer("crawler_io_seconds", op="journal_compact"):
+            self.journal.compact(self.checkpoint if checkpoint is None else checkpoint, self.crawled_repos)
     
     def is_english_readme(self, readme_text: str) -> bool:
         """Check if README is in English"""
-        if not readme_text or len(readme_text) < 50:
-            return False
-        
-        # Common English words to check
-        english_indicators = ['the', 'is', 'and', 'to', 'of', 'in', 'for', 'with', 'this', 'that']
-        text_lower = readme_text.lower()[:1000]
-        
-        english_count = sum(1 for word in english_indicators if f' {word} ' in text_lower)
-        return english_count >= 3
+        return self.language_detector.is_english(readme_text)
     
     def fetch_readme(self, owner: str, repo_name: str) -> str:
         """Fetch README content separately"""
@@ -68,47 +101,113 @@ class GitHubCrawler:
                 return None
                 
             repo_data = result["data"].get("repository", {})
+            return self.client.extract_readme_text(repo_data)
             
-            # Try different README variations
-            readme_text = None
-            for key in ["readme", "readmeLower", "readmeUpper", "readmeRst"]:
-                if repo_data.get(key) and repo_data[key].get("text"):
-                    readme_text = repo_data[key]["text"]
-                    break
-                    
-            return readme_text
-            
+        except FixtureMissingError:
+            raise
         except Exception as e:
             print(f"  ⚠️ Error fetching README for {owner}/{repo_name}: {e}")
             return None
     
-    def save_repo_to_csv(self, repo_data: Dict):
-        """Save repository data to CSV"""
-        file_exists = os.path.exists(Config.CSV_FILE)
+    def fetch_readmes(self, repos: List[Dict]) -> Dict[str, str]:
+        """Fetch READMEs for a page of repos with batched queries"""
+        if self.single_pass:
+            # README blobs came with the search page
+            return {repo["nameWithOwner"]: self.client.extract_readme_text(repo) for repo in repos}
         
-        with open(Config.CSV_FILE, 'a', newline='', encoding='utf-8') as f:
-            fieldnames = [
-                'repo_id', 'name', 'full_name', 'description', 'topics',
-                'language', 'stars_count', 'forks_count', 'created_at',
-                'updated_at', 'url'
-            ]
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+        repo_names = [tuple(repo["nameWithOwner"].split('/', 1)) for repo in repos]
+        if not repo_names:
+            return {}
+        return self.require_readmes(repos, self.client.fetch_readmes_batch(repo_names, Config.README_BATCH_SIZE))
+    
+    def require_readmes(self, repos: List[Dict], readmes: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+        """Raise ReadmeFetchError if a batch failed (its repos are missing from readmes)"""
+        failed = sum(1 for repo in repos if repo["nameWithOwner"] not in readmes)
+        if failed:
+            raise ReadmeFetchError(f"README fetch failed for {failed} of {len(repos)} repos")
+        return readmes
+    
+    def extract_topics(self, repo: Dict) -> List[str]:
+        """Extract topic names from a repository node"""
+        topics = []
+        if repo.get("repositoryTopics"):
+            for topic_node in repo["repositoryTopics"]["nodes"]:
+                if topic_node and topic_node.get("topic"):
+                    topics.append(topic_node["topic"]["name"])
+        return topics
+    
+    def build_repo_data(self, repo: Dict, topics: List[str]) -> Dict:
+        """Build the CSV row for a repository node"""
+        return {
+            'repo_id': repo["id"],
+            'name': repo["name"],
+            'full_name': repo["nameWithOwner"],
+            'description': repo.get("description", ""),
+            'topics': ";".join(topics),
+            'language': repo["primaryLanguage"]["name"] if repo.get("primaryLanguage") else "",
+            'stars_count': repo["stargazerCount"],
+            'forks_count': repo["forkCount"],
+            'created_at': repo["createdAt"],
+            'updated_at': repo["updatedAt"],
+            'url': repo["url"]
+        }
+    
+    def collect_candidates(self, nodes: List[Dict]) -> List[Tuple[Dict, List[str]]]:
+        """Keep search nodes that are new and have topics"""
+        candidates = []
+        for repo in nodes:
+            if not repo:
+                continue
             
-            if not file_exists:
-                writer.writeheader()
+            # Skip if already crawled
+            if repo["id"] in self.crawled_repos:
+                metrics.inc("crawler_repos_total", result="rejected", reason="already_crawled")
+                continue
+            
+            # Skip if no topics, or if search fields show the README check would fail
+            topics = self.extract_topics(repo)
+            if self.prefilter is not None:
+                if not self.prefilter.accept(repo, topics):
+                    continue
+            elif not topics:
+                metrics.inc("crawler_repos_total", result="rejected", reason="no_topics")
+                continue
             
-            writer.writerow(repo_data)
+            candidates.append((repo, topics))
+        return candidates
+    
+    def check_readme(self, readme_text: Optional[str]) -> bool:
+        """README check of a candidate; rejections are counted by reason"""
+        if not readme_text:
+            metrics.inc("crawler_repos_total", result="rejected", reason="readme_missing")
+            return False
+        if not self.is_english_readme(readme_text):
+            metrics.inc("crawler_repos_total", result="rejected", reason="readme_not_english")
+            return False
+        return True
+    
+    def accept_repo(self, repo: Dict, topics: List[str], readme_text: Optional[str]) -> Optional[Dict]:
+        """Check the README, save the repository and mark it crawled"""
+        if not self.check_readme(readme_text):
+            return None
+        return self.save_repo(repo, topics, readme_text)
+    
+    def save_repo(self, repo: Dict, topics: List[str], readme_text: str) -> Dict:
+        """Save an accepted repository and its README and mark it crawled"""
+        metrics.inc("crawler_repos_total", result="accepted", reason="")
+        repo_data = self.build_repo_data(repo, topics)
+        self.save_repo_to_csv(repo_data)
+        self.save_readme_to_jsonl(repo_data['repo_id'], repo_data['full_name'], readme_text)
+        self.mark_crawled(repo_data['repo_id'])
+        return repo_data
+    
+    def save_repo_to_csv(self, repo_data: Dict):
+        """Save repository data to the output store"""
+        self.store.write_repo(repo_data)
     
     def save_readme_to_jsonl(self, repo_id: str, full_name: str, readme_text: str):
-        """Save README to JSONL file (append mode)"""
-        with open(Config.README_FILE, 'a', encoding='utf-8') as f:
-            json_line = json.dumps({
-                'repo_id': repo_id,
-                'full_name': full_name,
-                'readme': readme_text,
-                'timestamp': datetime.now().isoformat()
-            }, ensure_ascii=False)
-            f.write(json_line + '\n')
+        """Save README to the output store"""
+        self.store.write_readme(repo_id, full_name, readme_text)
     
     def build_search_query(self, topic: str, sort: str) -> str:
         """Build search query string"""
@@ -143,125 +242,145 @@ class GitHubCrawler:
             
         return query
     
+    def topic_searches(self, topic: str, plan: Optional[List[Dict]] = None) -> List[Tuple[str, str, int]]:
+        """(label, search query, repo limit) of every search for a topic, in checkpoint order
+        
+        One search per sort option, or one per planned slice when partitioning.
+        """
+        if not self.partition_search:
+            return [(sort, self.build_search_query(topic, sort), Config.REPOS_PER_SORT) for sort in self.SORT_OPTIONS]
+        base_query = self.build_search_query(topic, 'best-match')
+        return [(search_slice["qualifiers"], f'{base_query} {search_slice["qualifiers"]}',
+                 min(Config.SEARCH_RESULT_CAP, search_slice["count"] or Config.SEARCH_RESULT_CAP))
+                for search_slice in plan]
+    
+    def report_plan(self, topic: str, planner: QueryPlanner, plan: List[Dict]):
+        print(f"  🗺️ {topic}: {len(plan)} slices covering {sum(s['count'] for s in plan if s['count'])} repos "
+              f"({planner.requests} count requests)")
+    
+    def load_search_plans(self, resuming: bool) -> Dict[str, List[Dict]]:
+        """Slice plans by topic index; plans still in an older checkpoint are moved to their file"""
+        plans = {}
+        if resuming and os.path.exists(Config.SEARCH_PLAN_FILE):
+            with open(Config.SEARCH_PLAN_FILE, 'r') as f:
+                plans = json.load(f)
+        if "search_plans" in self.checkpoint:
+            plans.update(self.checkpoint.pop("search_plans"))
+            atomic_write_json(Config.SEARCH_PLAN_FILE, plans)
+        return plans
+    
+    def prune_search_plans(self):
+        """Drop the plans of topics below current_topic_index (call once that index is committed)"""
+        done = [key for key in self.search_plans if int(key) < self.checkpoint.get("current_topic_index", 0)]
+        for key in done:
+            del self.search_plans[key]
+        if done:
+            atomic_write_json(Config.SEARCH_PLAN_FILE, self.search_plans)
+    
+    def plan_topic_search(self, topic: str, topic_index: int) -> Optional[List[Dict]]:
+        """Search slices of a topic, planned once and kept in Config.SEARCH_PLAN_FILE until the topic is done
+        
+        The checkpoint only holds the slice index and cursor, so journal commits stay small.
+        """
+        if not self.partition_search:
+            return None
+        plans = self.search_plans
+        if str(topic_index) not in plans:
+            planner = QueryPlanner(self.build_search_query(topic, 'best-match'))
+            while not planner.finished:
+                batch = planner.next_batch()
+                try:
+                    result = self.client.execute_query(planner.count_query(batch))
+                except FixtureMissingError:
+                    raise
+                except Exception as e:
+                    print(f"  ❌ Error counting search slices: {e}")
+                    result = None
+                planner.record(batch, result)
+            plans[str(topic_index)] = planner.plan()
+            self.report_plan(topic, planner, plans[str(topic_index)])
+            atomic_write_json(Config.SEARCH_PLAN_FILE, plans)
+        return plans[str(topic_index)]
+    
     def crawl_repos_for_topic(self, topic: str, topic_index: int):
         """Crawl repositories for a specific topic"""
         print(f"\n📌 Crawling topic: {topic} ({topic_index + 1}/{len(Config.ALL_TOPICS)})")
+        topic_start_time = time.time()
+        topic_start_requests = self.client.request_count
         
-        sort_options = ['stars', 'forks', 'updated', 'best-match']
-        repos_per_sort = Config.REPOS_PER_SORT
+        searches = self.topic_searches(topic, self.plan_topic_search(topic, topic_index))
         topic_repos = {}
         
         # Resume from checkpoint
         start_sort_index = self.checkpoint.get("current_sort_index", 0) if \
                           self.checkpoint.get("current_topic_index") == topic_index else 0
         
-        for sort_index, sort_option in enumerate(sort_options[start_sort_index:], start_sort_index):
-            print(f"\n  🔍 Sort by: {sort_option}")
-            
-            # Build search query
-            search_query = self.build_search_query(topic, sort_option)
+        for sort_index, (sort_option, search_query, repos_per_sort) in enumerate(searches[start_sort_index:], start_sort_index):
+            print(f"\n  🔍 {'Slice' if self.partition_search else 'Sort by'}: {sort_option}")
             print(f"  📝 Query: {search_query}")
             
-            cursor = self.checkpoint.get("current_page") if \
-                    self.checkpoint.get("current_topic_index") == topic_index and \
-                    self.checkpoint.get("current_sort_index") == sort_index else None
+            resuming = self.checkpoint.get("current_topic_index") == topic_index and \
+                    self.checkpoint.get("current_sort_index") == sort_index
+            cursor = self.checkpoint.get("current_page") if resuming else None
             
-            repos_crawled = 0
+            # Repos already saved for this sort count towards its limit after a resume
+            repos_crawled = self.checkpoint.get("repos_crawled_for_sort", 0) if resuming else 0
             has_next_page = True
-            batch_size = self.checkpoint.get("batch_size", 20)
             consecutive_errors = 0
             
-            pbar = tqdm(total=repos_per_sort, desc=f"  {sort_option}")
+            pbar = tqdm(total=repos_per_sort, initial=repos_crawled, desc=f"  {sort_option}")
             
             while has_next_page and repos_crawled < repos_per_sort:
                 try:
                     # Execute search query
-                    query = self.client.search_repos_simple_query(search_query, batch_size, cursor)
-                    result = self.client.execute_query(query)
+                    page_size = self.page_size.size
+                    if self.single_pass:
+                        query = self.client.search_repos_with_readme_query(search_query, page_size, cursor)
+                    else:
+                        query = self.client.search_repos_simple_query(search_query, page_size, cursor,
+                                                                      readme_sizes=self.prefilter is not None)
+                    result, latency = self.client.execute_timed_query(query)
                     
                     if not result:
-                        # Reduce batch size if query failed
-                        batch_size = max(5, batch_size // 2)
-                        self.checkpoint["batch_size"] = batch_size
-                        print(f"  ⚠️ Reducing batch size to {batch_size}")
+                        # Query timed out: shrink the page
+                        self.page_size.record_timeout()
+                        print(f"  ⚠️ Reducing page size to {self.page_size.size}")
                         consecutive_errors += 1
                         if consecutive_errors > 5:
                             print(f"  ❌ Too many errors, skipping {sort_option}")
                             break
-                        time.sleep(10)
+                        metrics.sleep(Config.ERROR_DELAY_SECONDS, "error_delay")
                         continue
                     
-                    consecutive_errors = 0  # Reset on success
-                    
                     if "data" not in result or not result["data"] or "search" not in result["data"]:
                         print(f"  ⚠️ No data returned for {topic} - {sort_option}")
                         break
                     
                     search_data = result["data"]["search"]
                     has_next_page = search_data["pageInfo"]["hasNextPage"]
-                    cursor = search_data["pageInfo"]["endCursor"]
+                    end_cursor = search_data["pageInfo"]["endCursor"]
+                    self.page_size.record(page_size, latency, result["data"].get("rateLimit"), len(search_data["nodes"]))
                     
-                    # Process repositories
-                    for repo in search_data["nodes"]:
-                        if not repo:
-                            continue
-                        
-                        repo_id = repo["id"]
-                        
-                        # Skip if already crawled
-                        if repo_id in self.crawled_repos:
-                            continue
-                        
-                        # Extract basic info
-                        full_name = repo["nameWithOwner"]
-                        owner, repo_name = full_name.split('/')
-                        
-                        # Extract topics
-                        topics = []
-                        if repo.get("repositoryTopics"):
-                            for topic_node in repo["repositoryTopics"]["nodes"]:
-                                if topic_node and topic_node.get("topic"):
-                                    topics.append(topic_node["topic"]["name"])
-                        
-                        # Skip if no topics
-                        if not topics:
-                            continue
-                        
-                        # Fetch README separately with retry
-                        readme_text = None
-                        for attempt in range(3):
-                            readme_text = self.fetch_readme(owner, repo_name)
-                            if readme_text:
-                                break
-                            time.sleep(2)
-                        
-                        # Check README
-                        if not readme_text or not self.is_english_readme(readme_text):
+                    # Collect new candidates with topics
+                    candidates = self.collect_candidates(search_data["nodes"])
+                    
+                    # Fetch READMEs for the whole page in batched queries
+                    # (a failed batch raises ReadmeFetchError: the page is retried)
+                    readmes = self.fetch_readmes([repo for repo, _ in candidates])
+                    consecutive_errors = 0  # Reset once the whole page came through
+                    
+                    # Process repositories; the checkpoint keeps this page's start
+                    # cursor until the whole page is done, so a crash mid-page resumes
+                    # on the same page (already saved repos are skipped as crawled)
+                    for repo, topics in candidates:
+                        repo_data = self.accept_repo(repo, topics, readmes.get(repo["nameWithOwner"]))
+                        if not repo_data:
                             continue
                         
-                        # Prepare repo data
-                        repo_data = {
-                            'repo_id': repo_id,
-                            'name': repo["name"],
-                            'full_name': full_name,
-                            'description': repo.get("description", ""),
-                            'topics': ";".join(topics),
-                            'language': repo["primaryLanguage"]["name"] if repo.get("primaryLanguage") else "",
-                            'stars_count': repo["stargazerCount"],
-                            'forks_count': repo["forkCount"],
-                            'created_at': repo["createdAt"],
-                            'updated_at': repo["updatedAt"],
-                            'url': repo["url"]
-                        }
-                        
-                        # Save data
-                        self.save_repo_to_csv(repo_data)
-                        self.save_readme_to_jsonl(repo_id, full_name, readme_text)
-                        
                         # Track progress
-                        self.crawled_repos.add(repo_id)
-                        topic_repos[repo_id] = repo_data
+                        topic_repos[repo_data['repo_id']] = repo_data
                         repos_crawled += 1
+                        self.repos_since_save += 1
                         pbar.update(1)
                         
                         # Update checkpoint
@@ -269,64 +388,82 @@ class GitHubCrawler:
                             "current_topic_index": topic_index,
                             "current_sort_index": sort_index,
                             "current_page": cursor,
-                            "repos_crawled_for_topic": len(topic_repos),
-                            "batch_size": batch_size
+                            "repos_crawled_for_sort": repos_crawled,
+                            "repos_crawled_for_topic": len(topic_repos)
                         })
                         
                         # Save periodically
-                        if repos_crawled % 10 == 0:
+                        if self.repos_since_save >= self.store.flush_interval:
                             self.save_checkpoint()
-                            self.save_crawled_repos()
                         
                         if repos_crawled >= repos_per_sort:
                             break
                     
-                    # Gradually increase batch size on success
-                    if batch_size < 20 and consecutive_errors == 0:
-                        batch_size = min(20, batch_size + 5)
-                        self.checkpoint["batch_size"] = batch_size
+                    # Page fully processed: resume from the next one
+                    cursor = end_cursor
+                    self.checkpoint.update({
+                        "current_topic_index": topic_index,
+                        "current_sort_index": sort_index,
+                        "current_page": cursor,
+                        "repos_crawled_for_sort": repos_crawled,
+                        "repos_crawled_for_topic": len(topic_repos)
+                    })
                     
                     # Rate limiting
-                    time.sleep(1)
+                    metrics.sleep(Config.PAGE_DELAY_SECONDS, "page_delay")
                     
                 except KeyboardInterrupt:
                     print("\n\n⚠️ Interrupted by user. Saving checkpoint...")
                     self.save_checkpoint()
-                    self.save_crawled_repos()
                     raise
                     
+                except FixtureMissingError:
+                    raise  # Replay cannot answer it on a retry either
+                    
                 except Exception as e:
                     print(f"\n  ❌ Error: {e}")
                     consecutive_errors += 1
                     if consecutive_errors > 5:
                         print(f"  ❌ Too many consecutive errors, moving to next sort option")
                         break
-                    time.sleep(10)
+                    metrics.sleep(Config.ERROR_DELAY_SECONDS, "error_delay")
                     continue
             
             pbar.close()
             
             # Save after each sort option
             self.save_checkpoint()
-            self.save_crawled_repos()
         
         print(f"\n  📊 Total unique repos for {topic}: {len(topic_repos)}")
+        topic_requests = self.client.request_count - topic_start_requests
+        print(f"  📡 Requests: {topic_requests} ({topic_requests / max(1, len(topic_repos)):.2f} per repo) "
+              f"in {time.time() - topic_start_time:.0f}s [{'single-pass' if self.single_pass else 'two-phase'}, "
+              f"{self.page_size.summary()}]")
         
         # Reset for next topic
         self.checkpoint["current_sort_index"] = 0
         self.checkpoint["current_page"] = None
-        self.checkpoint["batch_size"] = 20
+        self.checkpoint["repos_crawled_for_sort"] = 0
         self.save_checkpoint()
         
         return topic_repos
     
+    def print_connection_stats(self):
+        """Print HTTP connection reuse"""
+        stats = self.client.connection_stats()
+        print(f"🔌 HTTP: {stats['requests']} requests, {stats['connections_opened']} connections opened, "
+              f"{stats['connections_reused']} reused")
+    
     def crawl_all_topics(self):
         """Main crawling function"""
         print("🚀 Starting GitHub Repository Crawler")
         print(f"📋 Total topics to crawl: {len(Config.ALL_TOPICS)}")
         print(f"🔑 Available API keys: {len(Config.API_KEYS)}")
+        print(f"🧭 Crawl mode: {'single-pass (README in search)' if self.single_pass else 'two-phase (batched README fetch)'}")
         
         start_topic_index = self.checkpoint.get("current_topic_index", 0)
+        if self.should_probe_keys():
+            self.client.probe_rate_limits()
         
         try:
             for i, topic in enumerate(Config.ALL_TOPICS[start_topic_index:], start_topic_index):
@@ -334,17 +471,26 @@ class GitHubCrawler:
                 
                 self.checkpoint["current_topic_index"] = i + 1
                 self.save_checkpoint()
-                self.save_crawled_repos()
+                self.prune_search_plans()
                 
                 # Small break between topics
                 if i < len(Config.ALL_TOPICS) - 1:
                     print("\n⏸️ Pausing between topics...")
-                    time.sleep(5)
+                    metrics.sleep(Config.TOPIC_PAUSE_SECONDS, "topic_pause")
             
             print("\n✅ Crawling completed!")
             print(f"📊 Total unique repositories crawled: {len(self.crawled_repos)}")
+            self.print_connection_stats()
+            if self.prefilter is not None:
+                self.prefilter.print_stats()
+            metrics.print_summary()
             
         except KeyboardInterrupt:
             print("\n\n🛑 Crawling stopped by user")
             print(f"📊 Progress saved. Crawled {len(self.crawled_repos)} repos so far.")
-            print("ℹ️ Run again to resume from checkpoint.")
\ No newline at end of file
+            print("ℹ️ Run again to resume from checkpoint.")
+        
+        finally:
+            self.store.close()
+            self.journal.close()
+            self.crawled_repos.close()
\ No newline at end of file
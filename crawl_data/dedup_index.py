@@ -0,0 +1,238 @@
+import bisect
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+from array import array
+from typing import Iterator, Optional
+from config import Config
+from journal import atomic_write_json
+
+
+def repo_key(repo_id: str) -> int:
+    """64-bit key of a repo ID (collision odds ~n^2/2^65, about 3e-6 at 10M repos)"""
+    return int.from_bytes(hashlib.blake2b(repo_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class SetIndex:
+    """Baseline: every repo ID in a Python set, snapshotted as a JSON list"""
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.CRAWLED_REPOS_FILE
+        self.ids = set()
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                self.ids = set(json.load(f))
+
+    def __contains__(self, repo_id: str) -> bool:
+        return repo_id in self.ids
+
+    def add(self, repo_id: str):
+        self.ids.add(repo_id)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def iter_keys(self) -> Iterator[int]:
+        return (repo_key(repo_id) for repo_id in self.ids)
+
+    def save(self):
+        atomic_write_json(self.path, list(self.ids))
+
+    def close(self):
+        pass
+
+
+class SortedArrayIndex:
+    """Sorted uint64 repo keys in an mmap'd file, plus a small in-memory set of new keys
+
+    Startup only maps the file, lookups are a binary search over the mapping, and
+    save() merges the new keys in with one sequential rewrite.
+    """
+
+    MERGE_CHUNK = 65536
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.DEDUP_INDEX_FILE
+        self.pending = set()
+        self.handle = None
+        self.mapping = None
+        self.keys = array('Q')
+        self._open()
+
+        # One-time import of a set-based snapshot
+        if not os.path.exists(self.path) and os.path.exists(Config.CRAWLED_REPOS_FILE):
+            with open(Config.CRAWLED_REPOS_FILE, 'r') as f:
+                self.pending = {repo_key(repo_id) for repo_id in json.load(f)}
+            print(f"📥 Imported {len(self.pending)} repo IDs from {Config.CRAWLED_REPOS_FILE}")
+            self.save()
+
+    def _open(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            self.handle = open(self.path, 'rb')
+            self.mapping = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self.keys = memoryview(self.mapping).cast('Q')
+
+    def _release(self):
+        if self.mapping is not None:
+            self.keys.release()
+            self.mapping.close()
+            self.handle.close()
+        self.handle = self.mapping = None
+        self.keys = array('Q')
+
+    def contains_key(self, key: int) -> bool:
+        if key in self.pending:
+            return True
+        position = bisect.bisect_left(self.keys, key)
+        return position < len(self.keys) and self.keys[position] == key
+
+    def __contains__(self, repo_id: str) -> bool:
+        return self.contains_key(repo_key(repo_id))
+
+    def add(self, repo_id: str):
+        self.add_key(repo_key(repo_id))
+
+    def add_key(self, key: int):
+        if not self.contains_key(key):
+            self.pending.add(key)
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.pending)
+
+    def iter_keys(self) -> Iterator[int]:
+        return heapq.merge(self.keys, sorted(self.pending))
+
+    def save(self):
+        """Merge new keys into the sorted file (tmp file + rename)"""
+        if not self.pending:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            chunk = array('Q')
+            for key in self.iter_keys():
+                chunk.append(key)
+                if len(chunk) >= self.MERGE_CHUNK:
+                    chunk.tofile(f)
+                    chunk = array('Q')
+            chunk.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._release()
+        os.replace(tmp_path, self.path)
+        self.pending = set()
+        self._open()
+
+    def close(self):
+        self._release()
+
+
+class BloomIndex:
+    """Bloom filter in front of a SortedArrayIndex: most new repos never touch the exact lookup"""
+
+    def __init__(self, exact, path: str = None, capacity: int = None, error_rate: float = None):
+        self.exact = exact
+        self.path = path or Config.DEDUP_BLOOM_FILE
+        capacity = capacity or Config.DEDUP_BLOOM_CAPACITY
+        error_rate = error_rate or Config.DEDUP_BLOOM_ERROR_RATE
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.filtered = 0  # Lookups answered by the filter alone
+
+        size = (self.num_bits + 7) // 8
+        if os.path.exists(self.path) and os.path.getsize(self.path) == size:
+            with open(self.path, 'rb') as f:
+                self.bits = bytearray(f.read())
+        else:
+            self.bits = bytearray(size)
+            for key in exact.iter_keys():
+                self._set(key)
+
+    def _set(self, key: int):
+        h1 = key & 0xFFFFFFFF
+        h2 = (key >> 32) | 1
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % self.num_bits
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def _maybe_contains(self, key: int) -> bool:
+        h1 = key & 0xFFFFFFFF
+        h2 = (key >> 32) | 1
+        bits = self.bits
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % self.num_bits
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, repo_id: str) -> bool:
+        key = repo_key(repo_id)
+        if not self._maybe_contains(key):
+            self.filtered += 1
+            return False
+        return self.exact.contains_key(key)
+
+    def add(self, repo_id: str):
+        key = repo_key(repo_id)
+        self._set(key)
+        self.exact.add_key(key)
+
+    def __len__(self) -> int:
+        return len(self.exact)
+
+    def iter_keys(self) -> Iterator[int]:
+        return self.exact.iter_keys()
+
+    def save(self):
+        self.exact.save()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.bits)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        self.exact.close()
+
+
+class LayeredIndex:
+    """A read-only base index (e.g. the main crawl's) under a writable index for new IDs"""
+
+    def __init__(self, base, top):
+        self.base = base
+        self.top = top
+
+    def __contains__(self, repo_id: str) -> bool:
+        return repo_id in self.top or repo_id in self.base
+
+    def add(self, repo_id: str):
+        self.top.add(repo_id)
+
+    def __len__(self) -> int:
+        return len(self.top)
+
+    def iter_keys(self) -> Iterator[int]:
+        return self.top.iter_keys()
+
+    def save(self):
+        self.top.save()
+
+    def close(self):
+        self.top.close()
+        self.base.close()
+
+
+def create_dedup_index(backend: Optional[str] = None):
+    """Dedup index for the configured backend ('set', 'sorted' or 'bloom')"""
+    backend = backend or Config.DEDUP_BACKEND
+    if backend == 'set':
+        return SetIndex()
+    if backend == 'sorted':
+        return SortedArrayIndex()
+    if backend == 'bloom':
+        return BloomIndex(SortedArrayIndex())
+    raise ValueError(f"Unknown dedup backend: {backend}")
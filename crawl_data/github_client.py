@@ -1,117 +1,237 @@
 import requests
 import time
-from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Tuple
 from tqdm import tqdm
 import json
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from http_fixtures import create_fixture_session
+from metrics import metrics
+from retry_policy import Outcome, QueryFailedError, QueryResult, RetryPolicy, classify_response
 
 class GitHubGraphQLClient:
     def __init__(self, api_key_manager):
         self.api_key_manager = api_key_manager
-        self.base_url = "https://api.github.com/graphql"
-        
-    def execute_query(self, query: str, variables: Dict = None, retry_count: int = 0) -> Dict:
-        """Execute GraphQL query with automatic key rotation and better error handling"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key_manager.get_current_key()}",
+        self.base_url = Config.GRAPHQL_ENDPOINT
+        self.request_count = 0
+        self.session = self.create_session()
+        self.retry_policy = RetryPolicy()
+        self.last_result = None
+    
+    def create_session(self) -> requests.Session:
+        """Pooled keep-alive session shared by every query (recording or replaying fixtures if configured)"""
+        session = create_fixture_session() or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.HTTP_POOL_SIZE, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Accept-Encoding": "gzip, deflate",  # Decompressed transparently by requests
+            "Connection": "keep-alive",
             "Content-Type": "application/json"
+        })
+        return session
+    
+    def connection_stats(self) -> Dict[str, int]:
+        """Connection reuse statistics of the session pools"""
+        opened = 0
+        pooled_requests = 0
+        adapters = {id(adapter): adapter for adapter in self.session.adapters.values()}  # Mounted for http and https
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    pooled_requests += pool.num_requests
+        return {
+            "requests": self.request_count,
+            "connections_opened": opened,
+            "connections_reused": max(0, pooled_requests - opened)
         }
+    
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
         
-        max_retries = 5
-        
-        if retry_count >= max_retries:
-            raise Exception(f"Max retries ({max_retries}) exceeded")
+    # Console message per failed outcome
+    OUTCOME_MESSAGES = {
+        Outcome.TIMEOUT: "⚠️ Query timeout, retrying with smaller batch...",
+        Outcome.RATE_LIMITED: "⚠️ Rate limit hit, switching key...",
+        Outcome.SECONDARY_RATE_LIMIT: "⚠️ Secondary rate limit, switching key...",
+        Outcome.AUTH_FAILED: "❌ Authentication failed, switching key...",
+        Outcome.SERVER_ERROR: "⚠️ GitHub server error, waiting and retrying...",
+        Outcome.NETWORK_ERROR: "🔌 Connection error, retrying...",
+        Outcome.INVALID_RESPONSE: "⚠️ Invalid JSON response, retrying...",
+        Outcome.UNEXPECTED_STATUS: "❌ Unexpected status, retrying...",
+    }
+    
+    def report_outcome(self, result: QueryResult):
+        """Print a one-line description of a failed or partially failed request"""
+        if result.ok:
+            if result.message:
+                print(f"⚠️ GraphQL errors: {result.message}")
+            return
+        detail = f" ({result.status})" if result.status and result.status != 200 else ""
+        if result.outcome == Outcome.NETWORK_ERROR:
+            detail = f" ({result.message})"
+        print(f"{self.OUTCOME_MESSAGES[result.outcome]}{detail}")
+    
+    @staticmethod
+    def query_type(query: str) -> str:
+        """Metric label of a query built by this client"""
+        if "nodes(ids:" in query:
+            return "nodes"
+        if "type: REPOSITORY, first: 0" in query:
+            return "search_count"
+        if "search(" in query:
+            return "search"
+        if "r0: repository(" in query:
+            return "readme_batch"
+        if "repository(" in query:
+            return "readme"
+        if query == GitHubGraphQLClient.PROBE_QUERY:
+            return "rate_limit"
+        return "other"
+    
+    def record_metrics(self, query: str, result: QueryResult):
+        """Latency and outcome of one request"""
+        query_type = self.query_type(query)
+        metrics.inc("github_requests_total", query_type=query_type, outcome=result.outcome.value)
+        if result.latency is not None:
+            metrics.observe("github_query_seconds", result.latency, query_type=query_type)
+    
+    def record_key_outcome(self, result: QueryResult, key: str):
+        """Feed rate-limit information and key failures back to the key manager"""
+        rate_limit = result.rate_limit
+        if rate_limit and rate_limit.get("cost") is not None:
+            metrics.inc("github_rate_limit_points_total", rate_limit["cost"], key=self.api_key_manager.key_label(key))
+        if rate_limit:
+            print(f"  📊 Rate limit: {rate_limit['remaining']} remaining")
+            self.api_key_manager.update_rate_limit(rate_limit["remaining"], rate_limit["resetAt"], key,
+                                                   rate_limit.get("cost"))
         
+        if result.outcome in (Outcome.RATE_LIMITED, Outcome.SECONDARY_RATE_LIMIT):
+            self.api_key_manager.mark_exhausted(key, result.reset_at)
+        elif result.outcome == Outcome.AUTH_FAILED:
+            self.api_key_manager.disable_key(key)
+    
+    # Budget-only query used to refresh every key's rate limit before crawling
+    PROBE_QUERY = "query { rateLimit { cost limit remaining resetAt } }"
+    
+    def apply_probe_results(self, keys: List[str], results: List[QueryResult]):
+        """Record the probe answer of every key, then make the best key current"""
+        for key, result in zip(keys, results):
+            self.apply_probe_result(key, result)
+        self.api_key_manager.select_best_key()
+        print(f"🔑 Key budgets: {self.api_key_manager.budget_summary()}")
+    
+    def apply_probe_result(self, key: str, result: QueryResult):
+        """Record the probe answer of one key; a disabled key that answers is re-enabled"""
+        rate_limit = result.rate_limit
+        if result.ok and rate_limit:
+            self.api_key_manager.enable_key(key)
+            # No cost passed: the saved last-seen cost stays that of a crawl query
+            self.api_key_manager.update_rate_limit(rate_limit["remaining"], rate_limit["resetAt"], key)
+        elif result.outcome in RetryPolicy.KEY_OUTCOMES:
+            self.record_key_outcome(result, key)
+        else:
+            print(f"⚠️ Could not probe {self.api_key_manager.key_label(key)}, keeping its saved budget")
+    
+    def probe_rate_limits(self):
+        """Query rateLimit for every key concurrently, then make the best key current"""
+        keys = self.api_key_manager.keys
+        if not keys:
+            return
+        with ThreadPoolExecutor(max_workers=len(keys)) as executor:
+            results = list(executor.map(lambda key: self.send(self.PROBE_QUERY, None, key), keys))
+        self.apply_probe_results(keys, results)
+    
+    def send(self, query: str, variables: Optional[Dict], key: str) -> QueryResult:
+        """Send one request and classify the response"""
         try:
-            response = requests.post(
+            self.request_count += 1
+            response = self.session.post(
                 self.base_url,
                 json={"query": query, "variables": variables or {}},
-                headers=headers,
-                timeout=60  # Increased timeout
+                headers={"Authorization": f"Bearer {key}"},
+                timeout=(Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
             )
+        except requests.exceptions.RequestException as e:
+            result = QueryResult(Outcome.NETWORK_ERROR, message=str(e))
+            self.record_metrics(query, result)
+            return result
+        
+        result = classify_response(response.status_code, response.headers, response.text)
+        result.latency = response.elapsed.total_seconds()  # Replayed fixtures carry the recorded value
+        self.record_metrics(query, result)
+        return result
+    
+    def execute(self, query: str, variables: Dict = None) -> QueryResult:
+        """Execute GraphQL query with key rotation and the retry policy"""
+        attempts = self.retry_policy.start()
+        
+        while True:
+            key = self.api_key_manager.get_current_key()
+            attempts.attempts += 1
+            result = self.send(query, variables, key)
+            result.attempts = attempts.attempts
+            self.last_result = result
             
-            # Handle different status codes
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                except json.JSONDecodeError:
-                    print(f"⚠️ Invalid JSON response, retrying...")
-                    time.sleep(5)
-                    return self.execute_query(query, variables, retry_count + 1)
-                
-                # Check rate limit
-                if "data" in data and data["data"] and "rateLimit" in data["data"]:
-                    rate_limit = data["data"]["rateLimit"]
-                    remaining = rate_limit["remaining"]
-                    reset_at = rate_limit["resetAt"]
-                    
-                    print(f"  📊 Rate limit: {remaining} remaining")
-                    self.api_key_manager.update_rate_limit(remaining, reset_at)
-                    
-                    if self.api_key_manager.should_switch_key(remaining):
-                        self.api_key_manager.switch_to_next_key()
-                
-                # Check for GraphQL errors
-                if "errors" in data:
-                    error_msg = str(data["errors"])
-                    if "rate limit" in error_msg.lower():
-                        print(f"⚠️ Rate limit in response, switching key...")
-                        self.api_key_manager.switch_to_next_key()
-                        time.sleep(2)
-                        return self.execute_query(query, variables, retry_count + 1)
-                    elif "timeout" in error_msg.lower():
-                        print(f"⚠️ Query timeout, retrying with smaller batch...")
-                        time.sleep(5)
-                        return None  # Signal to reduce batch size
-                    else:
-                        print(f"⚠️ GraphQL errors: {data['errors']}")
-                
-                return data
-                
-            elif response.status_code == 401:
-                print(f"❌ Authentication failed, switching key...")
-                self.api_key_manager.switch_to_next_key()
-                return self.execute_query(query, variables, retry_count + 1)
-                
-            elif response.status_code == 403:
-                print(f"⚠️ Rate limit (403), switching key...")
-                self.api_key_manager.switch_to_next_key()
-                time.sleep(2)
-                return self.execute_query(query, variables, retry_count + 1)
-                
-            elif response.status_code in [502, 503, 504]:
-                # Gateway errors - GitHub is having issues
-                print(f"⚠️ GitHub server error ({response.status_code}), waiting and retrying...")
-                wait_time = min(60, 10 * (retry_count + 1))  # Progressive backoff
-                time.sleep(wait_time)
-                return self.execute_query(query, variables, retry_count + 1)
-                
-            else:
-                print(f"❌ Unexpected status {response.status_code}")
-                time.sleep(5)
-                return self.execute_query(query, variables, retry_count + 1)
-                
-        except requests.exceptions.Timeout:
-            print(f"⏱️ Request timeout, retrying...")
-            time.sleep(10)
-            return self.execute_query(query, variables, retry_count + 1)
+            self.record_key_outcome(result, key)
+            self.report_outcome(result)
+            
+            rate_limit = result.rate_limit
+            low_budget = rate_limit and self.api_key_manager.should_switch_key(rate_limit["remaining"])
+            if result.outcome in RetryPolicy.KEY_OUTCOMES or low_budget:
+                if key == self.api_key_manager.get_current_key():
+                    self.api_key_manager.switch_to_next_key()
             
-        except requests.exceptions.ConnectionError as e:
-            print(f"🔌 Connection error: {e}, retrying...")
-            time.sleep(10)
-            return self.execute_query(query, variables, retry_count + 1)
+            if result.ok or not attempts.should_retry(result):
+                return result
             
-        except Exception as e:
-            print(f"❌ Unexpected error: {e}")
-            time.sleep(5)
-            return self.execute_query(query, variables, retry_count + 1)
+            metrics.inc("github_retries_total", outcome=result.outcome.value)
+            wait_time = attempts.delay(result)
+            if wait_time:
+                metrics.inc("github_backoff_seconds_total", wait_time, outcome=result.outcome.value)
+                time.sleep(wait_time)
+    
+    def query_data(self, result: QueryResult) -> Optional[Dict]:
+        """Response of a finished query; None on query timeout (signal to reduce batch size)"""
+        if result.ok:
+            return result.data
+        if result.outcome == Outcome.TIMEOUT:
+            return None
+        raise QueryFailedError(result)
     
-    def search_repos_simple_query(self, search_query: str, batch_size: int = 20, after_cursor: str = None) -> str:
-        """Simplified query without README (fetch separately)"""
+    def execute_query(self, query: str, variables: Dict = None) -> Optional[Dict]:
+        """Execute GraphQL query; returns None on query timeout (signal to reduce batch size)"""
+        return self.query_data(self.execute(query, variables))
+    
+    def execute_timed_query(self, query: str, variables: Dict = None) -> Tuple[Optional[Dict], Optional[float]]:
+        """execute_query, also returning the latency of the request that answered (retry waits excluded)"""
+        result = self.execute(query, variables)
+        return self.query_data(result), result.latency
+    
+    def search_repos_simple_query(self, search_query: str, batch_size: int = 20, after_cursor: str = None,
+                                  readme_sizes: bool = False) -> str:
+        """Simplified query without README text (fetch separately), optionally with README byte sizes"""
+        extra_fields = self.readme_fields("byteSize") if readme_sizes else ""
+        return self._search_query(search_query, batch_size, after_cursor, extra_fields)
+    
+    def search_repos_with_readme_query(self, search_query: str, batch_size: int = 10, after_cursor: str = None) -> str:
+        """Search query that also selects README blobs (single-pass crawl)"""
+        return self._search_query(search_query, batch_size, after_cursor, self.readme_fields())
+    
+    def _search_query(self, search_query: str, batch_size: int, after_cursor: str = None, extra_fields: str = "") -> str:
+        """Build the repository search query, optionally with extra node fields"""
         after = f', after: "{after_cursor}"' if after_cursor else ""
         
         return f"""
         query {{
             rateLimit {{
+                cost
+                nodeCount
                 remaining
                 resetAt
             }}
@@ -127,7 +247,15 @@ class GitHubGraphQLClient:
                     endCursor
                 }}
                 nodes {{
-                    ... on Repository {{
+                    {self.repository_fields(extra_fields)}
+                }}
+            }}
+        }}
+        """
+    
+    def repository_fields(self, extra_fields: str = "") -> str:
+        """Repository node selection shared by search and nodes(ids:) queries"""
+        return f"""... on Repository {{
                         id
                         name
                         nameWithOwner
@@ -149,38 +277,171 @@ class GitHubGraphQLClient:
                         url
                         defaultBranchRef {{
                             name
+                            target {{
+                                oid
+                            }}
                         }}
-                    }}
-                }}
+                        {extra_fields}
+                    }}"""
+    
+    def get_nodes_query(self, node_ids: List[str]) -> str:
+        """Current state of known repositories by node ID (refresh mode)"""
+        return f"""
+        query {{
+            rateLimit {{
+                cost
+                remaining
+                resetAt
+            }}
+            nodes(ids: {json.dumps(node_ids)}) {{
+                {self.repository_fields()}
             }}
         }}
         """
     
+    @classmethod
+    def extract_head_oid(cls, repo_data: Dict) -> Optional[str]:
+        """Commit OID at the head of the default branch"""
+        return ((repo_data.get("defaultBranchRef") or {}).get("target") or {}).get("oid")
+    
+    # Candidate README paths, tried in this order
+    README_EXPRESSIONS = [
+        ("readme", "HEAD:README.md"),
+        ("readmeLower", "HEAD:readme.md"),
+        ("readmeUpper", "HEAD:README.MD"),
+        ("readmeRst", "HEAD:README.rst"),
+    ]
+    
+    # Error fragments GitHub returns when a query is too big or too costly
+    BATCH_TOO_LARGE_MARKERS = ["max_node_limit_exceeded", "complexity", "cost", "too large"]
+    
+    def readme_fields(self, blob_fields: str = "text") -> str:
+        """GraphQL selection for the README blob variations"""
+        return "\n".join(
+            f"""
+                {alias}: object(expression: "{expression}") {{
+                    ... on Blob {{
+                        {blob_fields}
+                    }}
+                }}"""
+            for alias, expression in self.README_EXPRESSIONS
+        )
+    
+    @classmethod
+    def extract_readme_text(cls, repo_data: Optional[Dict]) -> Optional[str]:
+        """Pick the first non-empty README variation from a repository node"""
+        if not repo_data:
+            return None
+        for alias, _ in cls.README_EXPRESSIONS:
+            if repo_data.get(alias) and repo_data[alias].get("text"):
+                return repo_data[alias]["text"]
+        return None
+    
+    @classmethod
+    def extract_readme_size(cls, repo_data: Dict) -> int:
+        """Byte size of the README extract_readme_text would pick (0 if none), from byteSize selections"""
+        for alias, _ in cls.README_EXPRESSIONS:
+            if repo_data.get(alias) and repo_data[alias].get("byteSize"):
+                return repo_data[alias]["byteSize"]
+        return 0
+    
     def get_readme_query(self, owner: str, name: str) -> str:
         """Separate query to fetch README"""
         return f"""
         query {{
             repository(owner: "{owner}", name: "{name}") {{
-                readme: object(expression: "HEAD:README.md") {{
-                    ... on Blob {{
-                        text
-                    }}
-                }}
-                readmeLower: object(expression: "HEAD:readme.md") {{
-                    ... on Blob {{
-                        text
-                    }}
-                }}
-                readmeUpper: object(expression: "HEAD:README.MD") {{
-                    ... on Blob {{
-                        text
-                    }}
-                }}
-                readmeRst: object(expression: "HEAD:README.rst") {{
-                    ... on Blob {{
-                        text
-                    }}
-                }}
+                {self.readme_fields()}
+            }}
+        }}
+        """
+    
+    def get_readmes_batch_query(self, repos: List[Tuple[str, str]]) -> str:
+        """Aliased query fetching the READMEs of several repositories at once (r0, r1, ...)"""
+        aliases = "".join(
+            f"""
+            r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{
+                {self.readme_fields()}
+            }}"""
+            for i, (owner, name) in enumerate(repos)
+        )
+        
+        return f"""
+        query {{
+            rateLimit {{
+                cost
+                remaining
+                resetAt
             }}
+            {aliases}
         }}
-        """
\ No newline at end of file
+        """
+    
+    def _needs_smaller_batch(self, result: Optional[Dict]) -> bool:
+        """Check if a batched query failed because it was too large or too expensive"""
+        if result is None:
+            return True  # Timeout signal from execute_query
+        if result.get("data"):
+            return False  # Partial errors (e.g. a renamed repo) still carry data
+        error_msg = str(result.get("errors", "")).lower()
+        return any(marker in error_msg for marker in self.BATCH_TOO_LARGE_MARKERS)
+    
+    def fetch_readmes_batch(self, repos: List[Tuple[str, str]], batch_size: int = 25) -> Dict[str, Optional[str]]:
+        """Fetch READMEs for many repos with aliased queries, splitting batches that are too large
+        
+        Repos of a batch that failed for another reason (the retry policy gave up) are
+        left out of the result, so callers can tell them from repos without a README.
+        """
+        readmes = {}
+        pending = [repos[i:i + batch_size] for i in range(0, len(repos), batch_size)]
+        
+        while pending:
+            chunk = pending.pop(0)
+            try:
+                result = self.execute_query(self.get_readmes_batch_query(chunk))
+            except QueryFailedError as e:
+                # Not a size problem: smaller batches would only repeat the retries
+                print(f"  ⚠️ README batch of {len(chunk)} failed: {e}")
+                continue
+            
+            if self._needs_smaller_batch(result) and len(chunk) > 1:
+                half = len(chunk) // 2
+                print(f"  ⚠️ README batch too large, splitting {len(chunk)} -> {half} + {len(chunk) - half}")
+                pending[:0] = [chunk[:half], chunk[half:]]
+                continue
+            
+            data = (result or {}).get("data")
+            if not data:
+                # A single repo that timed out or came back without data: left out, not "no README"
+                print(f"  ⚠️ README batch of {len(chunk)} returned no data")
+                continue
+            for i, (owner, name) in enumerate(chunk):
+                readmes[f"{owner}/{name}"] = self.extract_readme_text(data.get(f"r{i}"))
+        
+        return readmes
+    
+    def fetch_nodes_batch(self, node_ids: List[str], batch_size: int = 100) -> Dict[str, Optional[Dict]]:
+        """Fetch repository nodes by ID, splitting batches that are too large; deleted repos map to None"""
+        nodes = {}
+        pending = [node_ids[i:i + batch_size] for i in range(0, len(node_ids), batch_size)]
+        
+        while pending:
+            chunk = pending.pop(0)
+            try:
+                result = self.execute_query(self.get_nodes_query(chunk))
+            except QueryFailedError as e:
+                print(f"  ⚠️ Fetching {len(chunk)} repository nodes failed: {e}")
+                continue  # Left out, so its repos keep their watermarks
+            
+            if self._needs_smaller_batch(result) and len(chunk) > 1:
+                half = len(chunk) // 2
+                print(f"  ⚠️ Node batch too large, splitting {len(chunk)} -> {half} + {len(chunk) - half}")
+                pending[:0] = [chunk[:half], chunk[half:]]
+                continue
+            
+            data = (result or {}).get("data") or {}
+            if not data.get("nodes"):
+                continue  # Failed batch: left out, so its repos keep their watermarks
+            for node_id, node in zip(chunk, data["nodes"]):
+                nodes[node_id] = node or None
+        
+        return nodes
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+import requests
+from config import Config
+
+# Response headers kept in fixtures (rate-limit handling reads these)
+RECORDED_HEADERS = ["Content-Type", "Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining",
+                    "X-RateLimit-Reset", "X-RateLimit-Used"]
+
+# Search string of a query, the part that differs between runs
+SEARCH_RE = re.compile(r'search\(query: "([^"]*)"')
+
+
+class FixtureMissingError(LookupError):
+    """Replay was asked for a request that was never recorded"""
+
+
+class FixtureResponse:
+    """The parts of a requests.Response the client reads"""
+
+    def __init__(self, status_code: int, headers: Dict, text: str, elapsed: float):
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.text = text
+        self.elapsed = timedelta(seconds=elapsed)
+
+
+def _dumps(record: Dict) -> str:
+    # Module-level so the json= keyword of Session.post does not shadow the json module
+    return json.dumps(record, ensure_ascii=False)
+
+
+def request_key(payload: Optional[Dict]) -> str:
+    """Fixture key of a GraphQL request body (query + variables; the token is never part of it)"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def read_fixture_meta(path: str) -> Dict:
+    """Run settings saved at the top of a fixture file ({} for fixtures recorded without them)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        line = f.readline()
+    try:
+        return json.loads(line).get('meta', {})
+    except json.JSONDecodeError:
+        return {}
+
+
+def pin_search_plan_end(meta: Dict):
+    """Plan searches up to the fixture's date, so replay on another day sends the recorded created: queries"""
+    if meta.get('search_plan_end'):
+        Config.SEARCH_PLAN_END = meta['search_plan_end']
+
+
+class RecordingSession(requests.Session):
+    """Session that appends every GraphQL response to a JSONL fixture file
+
+    A new fixture starts with a meta record holding the search plan end date;
+    recording more into an existing fixture keeps using the date it holds.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        meta = read_fixture_meta(path)
+        if meta:
+            pin_search_plan_end(meta)
+        elif not Config.SEARCH_PLAN_END:
+            Config.SEARCH_PLAN_END = datetime.now(timezone.utc).date().isoformat()
+        self.handle = open(path, 'a', encoding='utf-8')
+        if not meta:
+            self.handle.write(_dumps({'meta': {'search_plan_end': Config.SEARCH_PLAN_END}}) + '\n')
+            self.handle.flush()
+
+    def post(self, url, json=None, **kwargs):
+        response = super().post(url, json=json, **kwargs)
+        self.handle.write(_dumps({
+            'key': request_key(json),
+            'status': response.status_code,
+            'headers': {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            'body': response.text,
+            'elapsed': response.elapsed.total_seconds()
+        }) + '\n')
+        self.handle.flush()
+        return response
+
+    def close(self):
+        super().close()
+        self.handle.close()
+
+
+class ReplaySession(requests.Session):
+    """Session answering GraphQL requests from a fixture file, without network access
+
+    Responses to the same request are replayed in recorded order (a 502 followed by
+    its successful retry replays the same way); the last one is repeated after that.
+    The recorded latency is replayed too, so latency-driven page sizing sends the
+    same queries as the recorded run, and so is the search plan end date.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Fixture file not found: {path}")
+        self.path = path
+        self.responses = defaultdict(deque)
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if 'key' in record:
+                    self.responses[record['key']].append(record)
+        pin_search_plan_end(read_fixture_meta(path))
+        self.replayed = 0
+
+    def post(self, url, json=None, **kwargs):
+        queue = self.responses.get(request_key(json))
+        if not queue:
+            query = " ".join(((json or {}).get('query') or "").split())
+            search = SEARCH_RE.search(query)
+            raise FixtureMissingError(f"No recorded response in {self.path} for: "
+                                      f"{search.group(1) if search else query[:120]}")
+        record = queue.popleft() if len(queue) > 1 else queue[0]
+        self.replayed += 1
+        return FixtureResponse(record['status'], record['headers'], record['body'], record['elapsed'])
+
+
+def create_fixture_session() -> Optional[requests.Session]:
+    """Replay or recording session when Config.HTTP_REPLAY_FILE / HTTP_RECORD_FILE is set, else None"""
+    if Config.HTTP_REPLAY_FILE:
+        return ReplaySession(Config.HTTP_REPLAY_FILE)
+    if Config.HTTP_RECORD_FILE:
+        return RecordingSession(Config.HTTP_RECORD_FILE)
+    return None
@@ -0,0 +1,119 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+from config import Config
+
+
+def atomic_write_json(path: str, data, **dump_kwargs):
+    """Write JSON to a temp file, fsync it, then rename it over the target"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps(data, **dump_kwargs))  # One-shot dumps uses the C encoder, json.dump never does
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CrawlJournal:
+    """Append-only write-ahead log of crawled repo IDs and checkpoint updates
+
+    The snapshot is checkpoint.json + the dedup index files; every change after it is a
+    JSON line in the journal. Records are held in memory until commit(), which the
+    crawler calls only after the output store is flushed and fsynced, so the journal
+    never claims a repo whose row is not on disk. The checkpoint committed with them
+    records the store's size ("store"); load() cuts the store back to it, dropping rows
+    of a flush whose commit never happened. Each record carries a sequence number and the
+    snapshot stores the last one it contains, so replay after a crash during
+    compaction never applies a record twice.
+    """
+
+    def __init__(self, journal_file: str = None, checkpoint_file: str = None):
+        self.journal_file = journal_file or Config.JOURNAL_FILE
+        self.checkpoint_file = checkpoint_file or Config.CHECKPOINT_FILE
+        self.pending: List[Dict] = []
+        self.seq = 0
+        self.handle = None
+
+    def load(self, crawled_repos, store=None) -> Optional[Dict]:
+        """Load the checkpoint snapshot and replay the journal into it and the dedup index
+        
+        Given the output store, it is cut back to the size the checkpoint recorded.
+        """
+        checkpoint = None
+
+        if os.path.exists(self.checkpoint_file):
+            with open(self.checkpoint_file, 'r') as f:
+                checkpoint = json.load(f)
+            self.seq = checkpoint.pop("journal_seq", 0)
+
+        replayed = 0
+        for record in self._read_records():
+            if record["seq"] <= self.seq:
+                continue  # Already part of the snapshot
+            self.seq = record["seq"]
+            replayed += 1
+            if "repo" in record:
+                crawled_repos.add(record["repo"])
+            elif "checkpoint" in record:
+                checkpoint = record["checkpoint"]
+
+        if replayed:
+            print(f"📒 Replayed {replayed} journal records")
+        if store is not None and checkpoint and checkpoint.get("store"):
+            store.restore(checkpoint["store"])
+        return checkpoint
+
+    def _read_records(self) -> Iterable[Dict]:
+        """Journal records in order, stopping at a torn last line"""
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print("⚠️ Ignoring torn record at the end of the journal")
+                    return
+
+    def append_repo(self, repo_id: str):
+        """Record a newly crawled repo (written on the next commit)"""
+        self.seq += 1
+        self.pending.append({"seq": self.seq, "repo": repo_id})
+
+    def append_checkpoint(self, checkpoint: Dict):
+        """Record a checkpoint update (written on the next commit)"""
+        self.seq += 1
+        self.pending.append({"seq": self.seq, "checkpoint": dict(checkpoint)})
+
+    def commit(self):
+        """Append pending records to the journal and fsync it"""
+        if not self.pending:
+            return
+        if self.handle is None:
+            self.handle = open(self.journal_file, 'a', encoding='utf-8')
+        self.handle.write("".join(json.dumps(record) + "\n" for record in self.pending))
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        self.pending = []
+
+    def needs_compaction(self) -> bool:
+        return os.path.exists(self.journal_file) and os.path.getsize(self.journal_file) >= Config.JOURNAL_COMPACT_BYTES
+
+    def compact(self, checkpoint: Dict, crawled_repos):
+        """Fold the journal into a new snapshot and start an empty journal"""
+        self.commit()
+        crawled_repos.save()
+        atomic_write_json(self.checkpoint_file, dict(checkpoint, journal_seq=self.seq), indent=2)
+
+        # A crash before this point only leaves records the snapshot already covers
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        open(self.journal_file, 'w').close()
+
+    def close(self):
+        """Commit pending records and close the journal"""
+        self.commit()
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
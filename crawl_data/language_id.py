@@ -0,0 +1,237 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+from config import Config
+
+# Frequent words per language; the character trigram profiles are built from these
+LANGUAGE_WORDS = {
+    "en": """the of and to a in is it you that was for on are with as they be at one have this from or had by
+        not but what some we can out other were all there when up use your how an each which do their if will
+        about many then them would like so these make see has more could no most my over than first who may
+        been now any new work get only where after just also should must into its our such even does well
+        because while both same through between need here before those very under both without
+        install usage example build run project support library using features license documentation open
+        source simple following provides available create file please installation requirements release
+        version note command""",
+    "es": """de la que el en y a los se del las un por con no una su para es al lo como más pero sus le ya o
+        este sí porque esta entre cuando muy sin sobre también me hasta hay donde quien desde todo nos durante
+        todos uno les ni contra otros ese eso ante ellos e esto mí antes algunos qué unos yo otro otras otra él
+        tanto esa estos mucho quienes nada muchos cual poco ella estar estas algunas algo nosotros puedes
+        cada mismo ser tiene hacer son está han fue siempre después primero forma parte nuevo otra vez
+        proyecto instalación uso ejemplo archivo datos puede usar crear versión código aplicación biblioteca
+        ejecutar""",
+    "pt": """de a o que e do da em um para é com não uma os no se na por mais as dos como mas foi ao ele das tem
+        à seu sua ou ser quando muito há nos já está eu também só pelo pela até isso ela entre era depois sem
+        mesmo aos ter seus quem nas me esse eles estão você tinha foram essa num nem suas meu às minha têm numa
+        pelos elas havia seja qual será nós tenho lhe deles essas esses pelas este fosse dele cada forma
+        fazer são então sobre todos todo ainda onde antes durante desenvolvido através novo
+        projeto instalação exemplo arquivo dados pode usar criar versão código aplicação biblioteca
+        executar""",
+    "fr": """de la le et les des en un du une que est pour qui dans par plus pas au sur ne se ce il sont avec ou
+        mais comme on tout nous sa aux son ses cette elle ont être été leur fait peut était ces entre deux aussi
+        dont même leurs sans autres très bien où encore si lui après avant ils sous votre vous faire
+        chaque autre alors donc tous toutes ici elles quand notre nos aussi depuis sera avoir peu
+        leur mon ma mes cet car lors ainsi afin selon fichiers permet
+        projet utilisation exemple fichier données pouvez utiliser créer version code application bibliothèque
+        installer lancer""",
+    "de": """der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an werden
+        aus er hat dass sie nach wird bei einer um am sind noch wie einem über einen so zum war haben nur oder
+        aber vor zur bis mehr durch man sein wurde sei wenn kann diese dieser ihre ich wir können
+        alle beim dann damit dazu doch dort euch hier immer jetzt keine mich mir muss schon sehr soll unter
+        viel weil welche wieder wo zwischen ohne neue ersten gibt ob ihr uns unsere bitte
+        projekt installation beispiel datei daten verwenden erstellen version anwendung bibliothek
+        ausführen""",
+    "it": """di e il la che in a per un è del non sono una con le si da al lo dei come ma più anche nel della alla
+        gli ha se sua suo questo quando essere tutti ci loro delle molto dove tra fra stato questa ancora dopo
+        sempre senza cosa ogni nella sulla hanno io noi voi lui lei mio tuo nostro vostro quello quella
+        quelli questi perché però già qui fare può devi deve solo prima poi così quindi ecco altri altro
+        sul sui dal dalla degli agli nelle alle uno due nuovo essere
+        progetto installazione esempio file dati puoi usare creare versione codice applicazione libreria
+        eseguire""",
+    "nl": """de het een en van ik te dat die in is niet op hij zijn er maar met voor als ook aan om dan ze wat nog
+        bij uit zo naar of heb kan wel al door over was ben tot meer geen hem mijn deze worden wordt onze jullie
+        je jij we wij zij u hun haar hebben had moet moeten kunnen zou zouden waar wanneer hoe omdat want
+        dus toch echter alle veel andere nieuwe eerste twee wordt gaan doen maakt tussen zonder tegen
+        onder sinds hier daar altijd nu
+        project installatie voorbeeld bestand gegevens gebruiken maken versie toepassing bibliotheek
+        uitvoeren""",
+    "id": """yang dan di ini itu dengan untuk tidak dari dalam akan pada juga saya ke karena tersebut bisa ada
+        mereka lebih kami sudah atau hanya oleh sebagai telah harus kita dapat menjadi anda adalah secara
+        setelah sebelum saat agar jika kalau namun tetapi masih sangat semua setiap banyak baru sendiri
+        cara hal bagian sama seperti antara melalui tanpa terhadap sedang belum pernah selalu lagi
+        apa siapa mana bagaimana kapan sini sana bahwa maka serta yaitu ialah
+        proyek instalasi contoh berkas gunakan membuat versi kode aplikasi pustaka menyediakan
+        menjalankan""",
+    "vi": """của và các có là trong được cho không những với một này đã người để từ khi theo như về ra đến
+        nhiều năm cũng sẽ nhưng làm thì mà lại tại nên bạn chúng tôi họ nó đó đây nào gì sao vì nếu
+        hay hoặc rất đều chỉ vẫn còn đang phải cần muốn biết thấy đi lên xuống trước sau giữa ngoài
+        mới cũ mỗi tất cả bằng qua vào trên dưới bên cách việc nhà ngày
+        dự án cài đặt ví dụ tệp dữ liệu sử dụng tạo phiên bản mã ứng dụng thư viện chạy""",
+}
+
+NON_LATIN = "non_latin"  # language() result for text mostly outside the Latin script
+
+FENCED_CODE_RE = re.compile(r'^\s*(```|~~~).*?^\s*\1', re.M | re.S)
+INDENTED_CODE_RE = re.compile(r'^(?: {4}|\t).*$', re.M)
+HTML_COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+IMAGE_RE = re.compile(r'!\[[^\]]*\]\([^)]*\)')
+LINK_RE = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+URL_RE = re.compile(r'https?://\S+|www\.\S+')
+INLINE_CODE_RE = re.compile(r'`[^`\n]*`')
+WORD_RE = re.compile(r'[^\W\d_]+')
+
+
+def strip_markdown(text: str) -> str:
+    """Prose of a README: code blocks, inline code, HTML, images, URLs and table pipes removed"""
+    text = FENCED_CODE_RE.sub(' ', text)
+    text = HTML_COMMENT_RE.sub(' ', text)
+    text = INDENTED_CODE_RE.sub(' ', text)
+    text = IMAGE_RE.sub(' ', text)
+    text = LINK_RE.sub(r'\1', text)
+    text = HTML_TAG_RE.sub(' ', text)
+    text = URL_RE.sub(' ', text)
+    text = INLINE_CODE_RE.sub(' ', text)
+    return text.replace('|', ' ')
+
+
+def non_latin_ratio(text: str) -> float:
+    """Share of letters outside the Latin blocks (CJK, Cyrillic, Arabic, ...)"""
+    letters = [c for c in text if c.isalpha()]
+    if not letters:
+        return 0.0
+    return sum(1 for c in letters if ord(c) > 0x24F and not 0x1E00 <= ord(c) <= 0x1EFF) / len(letters)
+
+
+class SimpleLanguageDetector:
+    """The original heuristic: at least 3 of 10 common English words in the first 1,000 characters"""
+
+    ENGLISH_INDICATORS = ['the', 'is', 'and', 'to', 'of', 'in', 'for', 'with', 'this', 'that']
+
+    def language(self, text: str, min_words: int = None) -> Optional[str]:
+        """'en', NON_LATIN for text mostly outside the Latin script, else None (the word check
+        cannot tell other Latin-script languages from text too short to judge)"""
+        if text and non_latin_ratio(strip_markdown(text)) > Config.LANGID_MAX_NON_LATIN_RATIO:
+            return NON_LATIN
+        return "en" if self.is_english(text) else None
+
+    def is_english(self, text: str) -> bool:
+        if not text or len(text) < 50:
+            return False
+        text_lower = text.lower()[:1000]
+        english_count = sum(1 for word in self.ENGLISH_INDICATORS if f' {word} ' in text_lower)
+        return english_count >= 3
+
+    def is_english_batch(self, texts: List[str]) -> List[bool]:
+        return [self.is_english(text) for text in texts]
+
+
+class NgramLanguageDetector:
+    """Naive Bayes language ID over the prose words of a README (markdown and code stripped)
+
+    A word's likelihood mixes an exact hit in the language's frequent-word list with
+    a character trigram model of that list, which scores words the lists never saw.
+    Profiles are built at startup from the embedded word lists of similar size, so
+    there is no model file or dependency. Word scores are memoized, which makes batch scoring of many
+    READMEs with a shared vocabulary much cheaper than scoring each from scratch.
+    """
+
+    N = 3
+    MIN_CHARS = 50  # Same floor as the original check (the README byte-size pre-filter relies on it)
+    CACHE_SIZE = 200_000
+    WORD_WEIGHT = 0.9  # Share of a word's probability from exact word-list hits
+    TRIGRAM_WEIGHT = 0.9  # Share of a trigram's probability from the trigram table (rest: character backoff)
+    UNSEEN_CHAR_PROBABILITY = 1e-4
+
+    def __init__(self, min_words: int = None, max_words: int = None):
+        self.min_words = min_words or Config.LANGID_MIN_WORDS
+        self.max_words = max_words or Config.LANGID_MAX_WORDS
+        self.languages = list(LANGUAGE_WORDS)
+        self.vocabularies = [set(LANGUAGE_WORDS[language].split()) for language in self.languages]
+        self.profiles = [self._profile(sorted(vocabulary)) for vocabulary in self.vocabularies]
+        self.word_cache: Dict[str, List[float]] = {}
+
+    def _profile(self, words: List[str]):
+        """Trigram log probabilities of a word list, interpolated with a character unigram backoff
+
+        The backoff scores trigrams the short word lists never saw by their characters
+        (e.g. 'ç', 'ß', 'ñ'); unseen characters fall to the same floor for every
+        language, so a language is not favoured just because its list is longer.
+        """
+        grams = Counter(gram for word in words for gram in self._grams(word))
+        chars = Counter(char for word in words for char in f" {word} ")
+        gram_total, char_total = sum(grams.values()), sum(chars.values())
+        char_probs = {char: count / char_total for char, count in chars.items()}
+        
+        def backoff(gram: str) -> float:
+            probability = 1.0
+            for char in gram:
+                probability *= char_probs.get(char, self.UNSEEN_CHAR_PROBABILITY)
+            return (1 - self.TRIGRAM_WEIGHT) * probability
+        
+        table = {gram: math.log(self.TRIGRAM_WEIGHT * count / gram_total + backoff(gram)) for gram, count in grams.items()}
+        return table, backoff
+    
+    def _grams(self, word: str) -> List[str]:
+        padded = f" {word} "
+        return [padded[i:i + self.N] for i in range(len(padded) - self.N + 1)]
+
+    def word_scores(self, word: str) -> List[float]:
+        """Log likelihood of one word under every language profile (memoized)"""
+        scores = self.word_cache.get(word)
+        if scores is None:
+            grams = self._grams(word)
+            scores = []
+            for (table, backoff), vocabulary in zip(self.profiles, self.vocabularies):
+                trigram_score = sum(table[gram] if gram in table else math.log(backoff(gram)) for gram in grams)
+                if word in vocabulary:
+                    scores.append(math.log(self.WORD_WEIGHT / len(vocabulary)
+                                           + (1 - self.WORD_WEIGHT) * math.exp(trigram_score)))
+                else:
+                    scores.append(math.log(1 - self.WORD_WEIGHT) + trigram_score)
+            if len(self.word_cache) >= self.CACHE_SIZE:
+                self.word_cache.clear()
+            self.word_cache[word] = scores
+        return scores
+
+    def scores(self, words: List[str]) -> List[float]:
+        """Summed log likelihood per language"""
+        totals = [0.0] * len(self.languages)
+        for word in words:
+            for i, score in enumerate(self.word_scores(word)):
+                totals[i] += score
+        return totals
+
+    def language(self, text: str, min_words: int = None) -> Optional[str]:
+        """Most likely language code, NON_LATIN, or None when there is too little prose to judge"""
+        if not text:
+            return None
+        prose = strip_markdown(text)
+        if non_latin_ratio(prose) > Config.LANGID_MAX_NON_LATIN_RATIO:
+            return NON_LATIN
+        words = WORD_RE.findall(prose.lower())[:self.max_words]
+        if len(words) < (min_words or self.min_words):
+            return None
+        totals = self.scores(words)
+        return self.languages[max(range(len(totals)), key=totals.__getitem__)]
+
+    def is_english(self, text: str) -> bool:
+        """True if the README is long enough and its prose is English"""
+        if not text or len(text) < self.MIN_CHARS:
+            return False
+        return self.language(text) == "en"
+
+    def is_english_batch(self, texts: List[str]) -> List[bool]:
+        """is_english for many READMEs, sharing the word score cache"""
+        return [self.is_english(text) for text in texts]
+
+
+def create_language_detector(backend: Optional[str] = None):
+    """Language detector for the configured backend ('ngram' or 'simple')"""
+    backend = backend or Config.LANGUAGE_DETECTOR
+    if backend == 'ngram':
+        return NgramLanguageDetector()
+    if backend == 'simple':
+        return SimpleLanguageDetector()
+    raise ValueError(f"Unknown language detector: {backend}")
@@ -10,6 +10,9 @@ from datetime import datetime
 
 def check_api_keys():
     """Check if API keys are configured"""
+    if Config.HTTP_REPLAY_FILE:
+        print(f"✅ Replaying responses from {Config.HTTP_REPLAY_FILE}, API keys are not used")
+        return True
     if not Config.API_KEYS or all(key.startswith("ghp_xxx") for key in Config.API_KEYS):
         print("❌ Error: Please configure your GitHub API keys in config.py")
         print("   Replace 'ghp_xxxxxxxxxxxxxxxxxxxx' with your actual tokens")
@@ -18,54 +21,212 @@ def check_api_keys():
     print(f"✅ Found {len(Config.API_KEYS)} API key(s)")
     return True
 
+def dedup_readmes():
+    """Index new READMEs and report duplicate clusters"""
+    from readme_dedup import ReadmeDedupIndex
+    print("\n" + "="*50)
+    print("🧬 DEDUPLICATING READMES")
+    print("="*50)
+    
+    index = ReadmeDedupIndex()
+    try:
+        index.update()
+        index.report()
+        index.export_clusters()
+    finally:
+        index.close()
+
+def convert_readmes():
+    """Move readme_data.jsonl into compressed README shards"""
+    import os
+    from readme_shards import ZstdReadmeShards
+    if not os.path.exists(Config.README_FILE):
+        print(f"❌ {Config.README_FILE} not found")
+        return
+    shards = ZstdReadmeShards()
+    if shards.stats()["records"]:
+        print(f"❌ {Config.README_SHARD_DIR} already holds READMEs; converting again would duplicate them")
+        return
+    
+    print(f"🗜️ Compressing {Config.README_FILE} into {Config.README_SHARD_DIR}...")
+    count = shards.import_jsonl(Config.README_FILE)
+    stats = shards.stats()
+    print(f"✅ {count} READMEs: {stats['raw_bytes'] / 2**20:.1f} MB -> {stats['bytes'] / 2**20:.1f} MB "
+          f"in {stats['shards']} shard(s)")
+    os.replace(Config.README_FILE, Config.README_FILE + ".converted")
+    if os.path.exists(Config.README_FILE + ".idx"):
+        os.remove(Config.README_FILE + ".idx")
+    print(f"ℹ️ Kept the original as {Config.README_FILE}.converted, delete it once the shards are verified")
+
+def run_stages(args):
+    """Crawl, refresh, dedup and classify, as requested"""
+    # Run crawler
+    if args.crawl:
+        print("\n" + "="*50)
+        print("🚀 STARTING GITHUB CRAWLER")
+        print("="*50)
+        print(f"⏰ Start time: {datetime.now()}")
+        
+        if args.workers > 1:
+            from sharded_crawl import ShardedCrawl
+            crawler = ShardedCrawl(args.workers, single_pass=args.single_pass or None, use_async=args.use_async)
+        elif args.pipeline:
+            from pipeline_crawler import PipelinedCrawler
+            crawler = PipelinedCrawler(single_pass=args.single_pass or None)
+        elif args.use_async:
+            from async_crawler import AsyncGitHubCrawler
+            crawler = AsyncGitHubCrawler(single_pass=args.single_pass or None)
+        else:
+            crawler = GitHubCrawler(single_pass=args.single_pass or None)
+        crawler.crawl_all_topics()
+        
+        print(f"⏰ End time: {datetime.now()}")
+    
+    # Refresh stored repos
+    if args.refresh:
+        print("\n" + "="*50)
+        print("🔄 REFRESHING STORED REPOS")
+        print("="*50)
+        
+        from refresh import RepoRefresher
+        RepoRefresher().refresh_all()
+    
+    if args.dedup_readmes:
+        dedup_readmes()
+    
+    # Run classifier
+    if args.classify:
+        print("\n" + "="*50)
+        print("🏷️ STARTING TAXONOMY CLASSIFIER")
+        print("="*50)
+        
+        classifier = TaxonomyClassifier()
+        classifier.classify_all_repos(chunksize=args.chunksize, workers=args.classify_workers,
+                                      incremental=args.incremental)
+
 def main():
     parser = argparse.ArgumentParser(description='GitHub Repository Crawler and Classifier')
     parser.add_argument('--crawl', action='store_true', help='Run the crawler')
     parser.add_argument('--classify', action='store_true', help='Run the classifier')
     parser.add_argument('--reset', action='store_true', help='Reset checkpoint and start fresh')
+    parser.add_argument('--single-pass', action='store_true',
+                        help='Fetch READMEs inside the search query instead of a second request wave')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Crawl topics, sorts and README batches concurrently (requires aiohttp)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Run search paging, README fetching, filtering and writing as separate threaded stages')
+    parser.add_argument('--partition-search', action='store_true',
+                        help='Split each topic by created:/stars: ranges to get past the 1,000-result search cap')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Crawl topic shards in this many processes (API keys are split between them)')
+    parser.add_argument('--output-format', choices=['csv', 'parquet'],
+                        help='Output store: CSV + JSONL (default) or Parquet part files (requires pyarrow)')
+    parser.add_argument('--dedup-backend', choices=['set', 'sorted', 'bloom'],
+                        help='Index used to skip already crawled repos')
+    parser.add_argument('--compress-readmes', action='store_true',
+                        help='Store READMEs as zstd-compressed, size-rotated shards (requires zstandard)')
+    parser.add_argument('--convert-readmes', action='store_true',
+                        help='Move the existing README JSONL file into compressed shards')
+    parser.add_argument('--export-csv', action='store_true', help='Export the Parquet metadata dataset to CSV')
+    parser.add_argument('--chunksize', type=int, help='Repos read and classified per chunk')
+    parser.add_argument('--classify-workers', type=int,
+                        help='Processes classifying chunks in parallel (not used with --incremental)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only classify repos that are new or changed since the last --classify run')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Re-check stored repos and update the rows and READMEs that changed')
+    parser.add_argument('--endpoint', help='GraphQL endpoint URL (e.g. a local stub server)')
+    parser.add_argument('--record', metavar='FILE', help='Record every GraphQL response to a JSONL fixture file')
+    parser.add_argument('--replay', metavar='FILE', help='Answer GraphQL requests from a recorded fixture file')
+    parser.add_argument('--metrics-port', type=int, help='Serve Prometheus metrics at http://localhost:PORT/metrics')
+    parser.add_argument('--metrics-file', help='Write a JSON metrics snapshot to this file periodically')
+    parser.add_argument('--profile', metavar='FILE', help='Run under cProfile and save the stats to FILE')
+    parser.add_argument('--dedup-readmes', action='store_true',
+                        help='Cluster exact and near-duplicate READMEs (only READMEs new since the last run are compared)')
     
     args = parser.parse_args()
     
-    if not args.crawl and not args.classify:
-        print("Please specify --crawl or --classify (or both)")
+    if args.output_format:
+        Config.OUTPUT_FORMAT = args.output_format
+    if args.dedup_backend:
+        Config.DEDUP_BACKEND = args.dedup_backend
+    if args.partition_search:
+        Config.SEARCH_PARTITIONING = True
+    if args.compress_readmes or args.convert_readmes:
+        Config.README_COMPRESSION = "zstd"
+    if args.endpoint:
+        Config.GRAPHQL_ENDPOINT = args.endpoint
+    Config.HTTP_RECORD_FILE = args.record or Config.HTTP_RECORD_FILE
+    Config.HTTP_REPLAY_FILE = args.replay or Config.HTTP_REPLAY_FILE
+    Config.METRICS_PORT = args.metrics_port or Config.METRICS_PORT
+    Config.METRICS_SNAPSHOT_FILE = args.metrics_file or Config.METRICS_SNAPSHOT_FILE
+    if (args.use_async or args.pipeline or args.workers > 1) and (Config.HTTP_RECORD_FILE or Config.HTTP_REPLAY_FILE):
+        print("❌ --record/--replay work with the sequential crawler only (drop --async/--pipeline/--workers)")
+        return
+    if args.use_async and args.pipeline:
+        print("❌ --async and --pipeline are alternative crawlers, pick one")
+        return
+    if args.pipeline and args.workers > 1:
+        print("❌ Shards run the sequential or --async crawler, --pipeline cannot be combined with --workers")
+        return
+    
+    if args.export_csv:
+        from storage import ParquetStore
+        ParquetStore().export_csv()
+    
+    if args.convert_readmes:
+        convert_readmes()
+    
+    if not args.crawl and not args.classify and not args.refresh:
+        if args.dedup_readmes:
+            dedup_readmes()
+        elif not args.export_csv and not args.convert_readmes:
+            print("Please specify --crawl, --refresh or --classify")
         return
     
     # Check API keys
-    if args.crawl and not check_api_keys():
+    if (args.crawl or args.refresh) and not check_api_keys():
         return
     
     # Reset if requested
     if args.reset:
         import os
+        from sharded_crawl import ShardedCrawl
+        sharded = ShardedCrawl.existing()
+        if sharded is not None:
+            # Shard output not merged yet would be lost with the shard directory
+            print(f"🔀 Merging the shards in {Config.SHARD_DIR} before removing them")
+            sharded.merge()
         files_to_remove = [
             Config.CHECKPOINT_FILE,
-            Config.CRAWLED_REPOS_FILE
+            Config.SEARCH_PLAN_FILE,
+            Config.CRAWLED_REPOS_FILE,
+            Config.JOURNAL_FILE,
+            Config.DEDUP_INDEX_FILE,
+            Config.DEDUP_BLOOM_FILE
         ]
         for file in files_to_remove:
             if os.path.exists(file):
                 os.remove(file)
                 print(f"🗑️ Removed {file}")
+        if os.path.exists(Config.SHARD_DIR):
+            import shutil
+            shutil.rmtree(Config.SHARD_DIR)
+            print(f"🗑️ Removed {Config.SHARD_DIR}")
     
-    # Run crawler
-    if args.crawl:
-        print("\n" + "="*50)
-        print("🚀 STARTING GITHUB CRAWLER")
-        print("="*50)
-        print(f"⏰ Start time: {datetime.now()}")
-        
-        crawler = GitHubCrawler()
-        crawler.crawl_all_topics()
-        
-        print(f"⏰ End time: {datetime.now()}")
-    
-    # Run classifier
-    if args.classify:
-        print("\n" + "="*50)
-        print("🏷️ STARTING TAXONOMY CLASSIFIER")
-        print("="*50)
-        
-        classifier = TaxonomyClassifier()
-        classifier.classify_all_repos()
+    from metrics import profiled, start_exporters
+    from http_fixtures import FixtureMissingError
+    stop_exporters = start_exporters(Config.METRICS_PORT, Config.METRICS_SNAPSHOT_FILE, Config.METRICS_SNAPSHOT_INTERVAL)
+    try:
+        with profiled(args.profile):
+            run_stages(args)
+    except FixtureMissingError as e:
+        print(f"\n❌ Replay stopped: {e}")
+        print("   The crawl sent a query the fixture never recorded (changed settings or crawler code, or a fixture "
+              "recorded without its search plan date); record the fixture again with --record")
+        sys.exit(1)
+    finally:
+        stop_exporters()
     
     print("\n✅ Pipeline completed successfully!")
 
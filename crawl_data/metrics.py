@@ -0,0 +1,247 @@
+import bisect
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram of one label set"""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot: above every bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms with Prometheus text and JSON output
+
+    Metrics are created on first use; labels are keyword arguments. Recording is a
+    dict update under a lock, cheap enough for every request and every repo.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self.started = time.time()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        with self.lock:
+            self.gauges.setdefault(name, {})[label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(LATENCY_BUCKETS)
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the duration of the block in a histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def sleep(self, seconds: float, reason: str):
+        """time.sleep that is accounted in crawler_sleep_seconds_total"""
+        if seconds > 0:
+            self.inc("crawler_sleep_seconds_total", seconds, reason=reason)
+            time.sleep(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    # Output
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for kind, by_name in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted(by_name):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in by_name[name].items():
+                        lines.append(f"{name}{format_labels(key)} {value:g}")
+            for name in sorted(self.histograms):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in self.histograms[name].items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + [float('inf')], histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float('inf') else f"{bound:g}"
+                        lines.append(f"{name}_bucket{format_labels(key, (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(key)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        """JSON-friendly view: counters and gauges by label string, histograms with quantiles"""
+        with self.lock:
+            return {
+                "timestamp": time.time(),
+                "uptime_seconds": time.time() - self.started,
+                "counters": {name: {format_labels(key): value for key, value in series.items()}
+                             for name, series in self.counters.items()},
+                "gauges": {name: {format_labels(key): value for key, value in series.items()}
+                           for name, series in self.gauges.items()},
+                "histograms": {
+                    name: {format_labels(key): {"count": h.count, "sum": h.sum, "p50": h.quantile(0.5),
+                                                "p95": h.quantile(0.95), "p99": h.quantile(0.99)}
+                           for key, h in series.items()}
+                    for name, series in self.histograms.items()
+                },
+            }
+
+    def write_snapshot(self, path: str):
+        """Write the JSON snapshot atomically"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def time_breakdown(self) -> List[Tuple[str, float]]:
+        """Seconds spent per activity, largest first"""
+        rows = []
+        with self.lock:
+            for key, h in self.histograms.get("github_query_seconds", {}).items():
+                rows.append((f"query {dict(key).get('query_type')}", h.sum))
+            for key, h in self.histograms.get("crawler_io_seconds", {}).items():
+                rows.append((f"io {dict(key).get('op')}", h.sum))
+            for key, value in self.counters.get("crawler_sleep_seconds_total", {}).items():
+                rows.append((f"sleep {dict(key).get('reason')}", value))
+            for key, value in self.counters.get("github_backoff_seconds_total", {}).items():
+                rows.append((f"backoff {dict(key).get('outcome')}", value))
+        return sorted(rows, key=lambda row: -row[1])
+
+    def print_summary(self):
+        """Where the crawl's time went"""
+        elapsed = time.time() - self.started
+        print(f"⏱️ Time breakdown over {elapsed:.0f}s (queries overlap in async mode):")
+        for activity, seconds in self.time_breakdown():
+            print(f"  - {activity}: {seconds:.1f}s ({seconds / max(elapsed, 1e-9) * 100:.0f}%)")
+
+
+metrics = MetricsRegistry()
+
+
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    """Serve metrics.prometheus_text() at http://0.0.0.0:<port>/metrics in a background thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = metrics.prometheus_text().encode('utf-8')
+            self.send_response(200 if self.path.startswith("/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 Metrics at http://localhost:{port}/metrics")
+    return server
+
+
+def start_snapshot_writer(path: str, interval: float) -> threading.Event:
+    """Write a JSON snapshot every interval seconds until the returned event is set"""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            metrics.write_snapshot(path)
+
+    threading.Thread(target=run, daemon=True).start()
+    print(f"📈 Metrics snapshot every {interval:.0f}s to {path}")
+    return stop
+
+
+def start_exporters(port: Optional[int], path: Optional[str], interval: float) -> Callable[[], None]:
+    """Start the configured exporters; returns a function that stops them (and writes a final snapshot)"""
+    server = start_metrics_server(port) if port else None
+    stop = start_snapshot_writer(path, interval) if path else None
+
+    def shutdown():
+        if stop is not None:
+            stop.set()
+            metrics.write_snapshot(path)
+        if server is not None:
+            server.shutdown()
+
+    return shutdown
+
+
+@contextmanager
+def profiled(path: Optional[str], top: int = 25):
+    """Run the block under cProfile when path is set: dump stats there and print the top functions"""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"\n🔬 Profile saved to {path} (top {top} by cumulative time):")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
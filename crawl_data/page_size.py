@@ -0,0 +1,90 @@
+import math
+from typing import Dict, Optional
+from config import Config
+
+
+class PageSizeController:
+    """Picks the search page size (first:) from observed query cost and latency
+
+    A query's cost (rateLimit.cost) is a step function of the page size, at least 1
+    point, so larger pages cost fewer points per repo until a step is crossed.
+    Latency also grows with the page (most of all with README blobs in single-pass
+    mode) and queries past ~10s time out. After every page the controller updates
+    running estimates of points per repo and seconds per repo, then picks the size
+    with the most repos per predicted point whose predicted latency stays under
+    Config.PAGE_LATENCY_TARGET (ties go to the larger page, which keeps probing
+    upwards). Growth is additive (at most Config.PAGE_SIZE_STEP per page),
+    shrinking is immediate, and a timeout halves the page. Without a cost in the
+    response, nodeCount (~100 nodes per point) stands in for it.
+
+    The state is a plain dict, stored in the checkpoint as "page_size".
+    """
+
+    SMOOTHING = 0.3  # Weight of the newest observation
+
+    def __init__(self, state: Optional[Dict] = None):
+        self.state = state if state is not None else {}
+        self.state.setdefault("size", Config.PAGE_SIZE_INITIAL)
+        self.state.setdefault("cost_per_repo", None)
+        self.state.setdefault("nodes_per_repo", None)
+        self.state.setdefault("seconds_per_repo", None)
+        self.state.setdefault("queries", 0)
+        self.state.setdefault("points", 0)
+        self.state.setdefault("repos", 0)
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: Dict) -> "PageSizeController":
+        """Controller sharing its state with the checkpoint (seeded from a legacy "batch_size")"""
+        if "page_size" not in checkpoint:
+            checkpoint["page_size"] = {"size": checkpoint.pop("batch_size", Config.PAGE_SIZE_INITIAL)}
+        checkpoint.pop("batch_size", None)
+        return cls(checkpoint["page_size"])
+
+    @property
+    def size(self) -> int:
+        return self.state["size"]
+
+    def smooth(self, key: str, value: float):
+        previous = self.state[key]
+        self.state[key] = value if previous is None else previous + self.SMOOTHING * (value - previous)
+
+    def predicted_cost(self, size: int) -> int:
+        if self.state["cost_per_repo"]:
+            return max(1, math.ceil(self.state["cost_per_repo"] * size - 1e-9))
+        if self.state["nodes_per_repo"]:
+            return max(1, math.ceil(self.state["nodes_per_repo"] * size / 100))
+        return 1
+
+    def best_size(self) -> int:
+        """Size with the most repos per predicted point that the latency target allows"""
+        limit = min(Config.PAGE_SIZE_MAX, self.size + Config.PAGE_SIZE_STEP)
+        if self.state["seconds_per_repo"]:
+            limit = min(limit, int(Config.PAGE_LATENCY_TARGET / self.state["seconds_per_repo"]))
+        limit = max(Config.PAGE_SIZE_MIN, limit)
+        return max(range(Config.PAGE_SIZE_MIN, limit + 1), key=lambda size: (size / self.predicted_cost(size), size))
+
+    def record(self, size: int, latency: Optional[float], rate_limit: Optional[Dict], repos: int):
+        """Feed back a successful page: size requested, latency, rateLimit block and nodes returned"""
+        self.state["queries"] += 1
+        self.state["repos"] += repos
+        if rate_limit and rate_limit.get("nodeCount"):
+            self.smooth("nodes_per_repo", rate_limit["nodeCount"] / size)
+        if rate_limit and rate_limit.get("cost"):
+            # The cost is rounded up: half a point of it is taken as rounding, so a page
+            # whose cost did not move is expected to stay flat a bit further
+            self.smooth("cost_per_repo", (rate_limit["cost"] - 0.5) / size)
+            self.state["points"] += rate_limit["cost"]
+        if latency is not None:
+            self.smooth("seconds_per_repo", latency / size)
+        self.state["size"] = self.best_size()
+
+    def record_timeout(self):
+        """The page timed out: halve it and make the latency estimate at least as pessimistic"""
+        self.state["size"] = max(Config.PAGE_SIZE_MIN, self.size // 2)
+        floor = Config.PAGE_LATENCY_TARGET / self.size
+        if self.state["seconds_per_repo"] is None or self.state["seconds_per_repo"] < floor:
+            self.state["seconds_per_repo"] = floor
+
+    def summary(self) -> str:
+        return (f"page size {self.size}, {self.state['repos'] / max(1, self.state['points']):.1f} repos per point "
+                f"over {self.state['queries']} pages")
@@ -0,0 +1,462 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from tqdm import tqdm
+from config import Config
+from crawler import GitHubCrawler
+from metrics import metrics
+
+STOP = object()  # End-of-input marker passed down the stages
+POLL_SECONDS = 0.5  # How often blocked queue operations check for an abort
+
+
+class PipelineAborted(Exception):
+    """A stage failed or the crawl was interrupted"""
+
+
+class PageWork:
+    """One search page travelling through the pipeline, in search order (seq)"""
+
+    def __init__(self, seq: int, topic_index: int, sort_index: int, start_cursor: Optional[str],
+                 end_cursor: Optional[str], has_next_page: bool, repos_per_sort: int,
+                 candidates: List[Tuple[Dict, List[str]]]):
+        self.seq = seq
+        self.topic_index = topic_index
+        self.sort_index = sort_index
+        self.start_cursor = start_cursor
+        self.end_cursor = end_cursor
+        self.has_next_page = has_next_page
+        self.repos_per_sort = repos_per_sort
+        self.candidates = candidates
+        self.readmes: Dict[str, Optional[str]] = {}
+        self.error: Optional[Exception] = None  # README fetch failed: the page must not be checkpointed
+        self.accepted: List[Tuple[Dict, List[str], str]] = []
+
+
+class Stage:
+    """Threads taking items from an inbox queue and passing the handler's result to an outbox
+
+    Counts, per stage, the items handled, busy time, time starved (waiting for input)
+    and time blocked on a full outbox (backpressure from the next stage). STOP is put
+    back for sibling threads; the last thread to exit forwards it to the outbox.
+    """
+
+    def __init__(self, name: str, handler: Optional[Callable], inbox: Optional[queue.Queue],
+                 outbox: Optional[queue.Queue], threads: int, abort: threading.Event):
+        self.name = name
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.thread_count = threads
+        self.abort = abort
+        self.error: Optional[BaseException] = None
+        self.lock = threading.Lock()
+        self.running = 0
+        self.threads: List[threading.Thread] = []
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+
+    def get(self):
+        start = time.perf_counter()
+        while True:
+            if self.abort.is_set():
+                raise PipelineAborted(self.name)
+            try:
+                item = self.inbox.get(timeout=POLL_SECONDS)
+                self.record(starved=time.perf_counter() - start)
+                return item
+            except queue.Empty:
+                continue
+
+    def put(self, item):
+        start = time.perf_counter()
+        while True:
+            if self.abort.is_set():
+                raise PipelineAborted(self.name)
+            try:
+                self.outbox.put(item, timeout=POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        self.record(blocked=time.perf_counter() - start)
+        metrics.set("pipeline_queue_depth", self.outbox.qsize(), stage=self.name)
+
+    def record(self, items: int = 0, busy: float = 0.0, starved: float = 0.0, blocked: float = 0.0):
+        with self.lock:
+            self.items += items
+            self.busy += busy
+            self.starved += starved
+            self.blocked += blocked
+        if items:
+            metrics.inc("pipeline_items_total", items, stage=self.name)
+        for kind, seconds in (("busy", busy), ("starved", starved), ("blocked", blocked)):
+            if seconds:
+                metrics.inc("pipeline_stage_seconds_total", seconds, stage=self.name, state=kind)
+
+    def start(self):
+        self.running = self.thread_count
+        self.threads = [threading.Thread(target=self.run, name=f"{self.name}-{i}", daemon=True)
+                        for i in range(self.thread_count)]
+        for thread in self.threads:
+            thread.start()
+
+    def run(self):
+        try:
+            while True:
+                item = self.get()
+                if item is STOP:
+                    self.inbox.put(STOP)
+                    break
+                start = time.perf_counter()
+                result = self.handler(item)
+                self.record(items=1, busy=time.perf_counter() - start)
+                if result is not None and self.outbox is not None:
+                    self.put(result)
+        except PipelineAborted:
+            pass
+        except BaseException as e:
+            self.error = e
+            self.abort.set()
+        finally:
+            with self.lock:
+                self.running -= 1
+                last = self.running == 0
+            if last and self.outbox is not None and not self.abort.is_set():
+                try:
+                    self.put(STOP)
+                except PipelineAborted:
+                    pass
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+    def summary(self) -> str:
+        rate = self.items / self.busy if self.busy else 0.0
+        return (f"{self.name:<8} x{self.thread_count}: {self.items} pages, busy {self.busy:.1f}s ({rate:.1f}/s), "
+                f"starved {self.starved:.1f}s, blocked {self.blocked:.1f}s")
+
+
+class PipelinedCrawler(GitHubCrawler):
+    """GitHubCrawler with search paging, README fetching, filtering and persistence in separate stages
+
+    search (calling thread) -> readme (Config.PIPELINE_README_WORKERS threads) ->
+    filter -> writer, joined by queues of at most Config.PIPELINE_QUEUE_PAGES pages,
+    so a slow README batch or disk write stalls the search cursor only once the
+    queues are full. The single writer persists pages in search order, so the
+    checkpoint cursor only ever moves past pages whose repos are all saved and a
+    resumed crawl picks up exactly where the written output ends. Repos in flight
+    are claimed so a later page cannot queue them again. Near a sort's repo limit
+    the search stage waits for the writer before paging further, so no page is
+    fetched that the limit would throw away.
+
+    A page whose READMEs still fail after Config.PIPELINE_README_ATTEMPTS fetches
+    is not written, nor are the pages of its sort queued behind it; the search
+    stage pages that sort again from the failed page once the writer has drained,
+    and skips the sort after 5 failures in a row, like the sequential crawler.
+    """
+
+    def __init__(self, single_pass: bool = None, partition_search: bool = None):
+        super().__init__(single_pass, partition_search)
+        self.readme_workers = max(1, Config.PIPELINE_README_WORKERS)
+        self.abort = threading.Event()
+        self.state_lock = threading.RLock()  # Claims, reads of the crawled index and its compaction
+        self.progress = threading.Condition(self.state_lock)
+        self.claimed = set()
+        self.stages: List[Stage] = []
+        self.search_stage: Optional[Stage] = None
+        self.reset_topic_state()
+
+    def reset_topic_state(self):
+        self.next_seq = 0  # Next page the search stage produces
+        self.written_seq = 0  # Pages below this are persisted
+        self.pending: Dict[int, PageWork] = {}  # Pages filtered ahead of their turn
+        self.sort_counts: Dict[int, int] = {}
+        self.failed_pages: Dict[int, Optional[str]] = {}  # Sort index -> start cursor of its failed page
+        self.topic_repos: Dict[str, Dict] = {}
+        self.pbar = None
+
+    # Stages
+
+    def start_stages(self):
+        size = max(1, Config.PIPELINE_QUEUE_PAGES)
+        pages, fetched, filtered = queue.Queue(size), queue.Queue(size), queue.Queue(size)
+        self.search_stage = Stage("search", None, None, pages, 1, self.abort)
+        self.stages = [
+            Stage("readme", self.fetch_stage, pages, fetched, self.readme_workers, self.abort),
+            Stage("filter", self.filter_stage, fetched, filtered, 1, self.abort),
+            Stage("writer", self.write_stage, filtered, None, 1, self.abort),
+        ]
+        for stage in self.stages:
+            stage.start()
+
+    def stop_stages(self):
+        """Let the queued pages drain and the threads exit (or abandon them after an abort)"""
+        if not self.stages:
+            return
+        if not self.abort.is_set():
+            try:
+                self.search_stage.put(STOP)
+            except PipelineAborted:
+                pass
+        for stage in self.stages:
+            stage.join()
+
+    def raise_stage_error(self):
+        for stage in self.stages:
+            if stage.error is not None:
+                raise RuntimeError(f"Pipeline stage '{stage.name}' failed: {stage.error!r}") from stage.error
+
+    def fetch_stage(self, work: PageWork) -> PageWork:
+        for attempt in range(1, Config.PIPELINE_README_ATTEMPTS + 1):
+            try:
+                work.readmes = self.fetch_readmes([repo for repo, _ in work.candidates])
+                work.error = None
+                break
+            except Exception as e:
+                print(f"\n  ⚠️ README fetch failed for a page ({attempt}/{Config.PIPELINE_README_ATTEMPTS}): {e}")
+                work.error = e
+                if self.abort.is_set():
+                    raise PipelineAborted("readme")
+                if attempt < Config.PIPELINE_README_ATTEMPTS:
+                    metrics.sleep(Config.ERROR_DELAY_SECONDS, "error_delay")
+        return work
+
+    def filter_stage(self, work: PageWork) -> PageWork:
+        if work.error is not None:
+            with self.state_lock:
+                self.claimed.difference_update(repo["id"] for repo, _ in work.candidates)
+            return work  # The writer drops it and the search stage pages its sort again
+        rejected = []
+        for repo, topics in work.candidates:
+            readme_text = work.readmes.get(repo["nameWithOwner"])
+            if self.check_readme(readme_text):
+                work.accepted.append((repo, topics, readme_text))
+            else:
+                rejected.append(repo["id"])
+        work.readmes = {}
+        with self.state_lock:
+            self.claimed.difference_update(rejected)
+        return work
+
+    def write_stage(self, work: PageWork):
+        with self.progress:
+            self.pending[work.seq] = work
+        while True:
+            with self.progress:
+                work = self.pending.pop(self.written_seq, None)
+            if work is None:
+                return
+            self.write_page(work)
+            with self.progress:
+                self.written_seq += 1
+                self.progress.notify_all()
+
+    def write_page(self, work: PageWork):
+        """Persist one page and move the checkpoint past it (writer thread, pages in search order)
+        
+        A page whose READMEs could not be fetched, and every later page of its sort, is
+        dropped instead: the checkpoint stays on the failed page's start cursor and the
+        search stage is told where to page the sort again.
+        """
+        count = self.sort_counts.get(work.sort_index, 0)
+        if work.error is not None or work.sort_index in self.failed_pages:
+            with self.progress:
+                if work.error is not None and work.sort_index not in self.failed_pages \
+                        and count < work.repos_per_sort:
+                    self.failed_pages[work.sort_index] = work.start_cursor
+                self.claimed.difference_update(repo["id"] for repo, _, _ in work.accepted)
+            return
+        for repo, topics, readme_text in work.accepted:
+            if count < work.repos_per_sort:
+                repo_data = self.save_repo(repo, topics, readme_text)
+                self.topic_repos[repo_data['repo_id']] = repo_data
+                count += 1
+                self.repos_since_save += 1
+                self.pbar.update(1)
+        # Released only once marked crawled, so the search stage sees one or the other
+        with self.state_lock:
+            self.claimed.difference_update(repo["id"] for repo, _, _ in work.accepted)
+        self.sort_counts[work.sort_index] = count
+
+        sort_done = not work.has_next_page or count >= work.repos_per_sort
+        self.checkpoint.update({
+            "current_topic_index": work.topic_index,
+            "current_sort_index": work.sort_index + 1 if sort_done else work.sort_index,
+            "current_page": None if sort_done else work.end_cursor,
+            "repos_crawled_for_sort": 0 if sort_done else count,
+            "repos_crawled_for_topic": len(self.topic_repos)
+        })
+        if self.repos_since_save >= self.store.flush_interval:
+            self.save_checkpoint()
+
+    def compact_journal(self, checkpoint: Dict = None):
+        """Compaction rewrites the crawled index, so the search stage waits for it"""
+        with self.state_lock:
+            super().compact_journal(checkpoint)
+
+    # Search stage
+
+    def wait_for_writer(self, seq: int):
+        """Block until every page before seq is persisted"""
+        with self.progress:
+            while self.written_seq < seq:
+                if self.abort.is_set():
+                    raise PipelineAborted("search")
+                self.progress.wait(POLL_SECONDS)
+
+    def claim_candidates(self, nodes: List[Dict]) -> List[Tuple[Dict, List[str]]]:
+        """New candidates of a page that are not already in flight; claims them"""
+        with self.state_lock:
+            nodes = [repo for repo in nodes if not repo or repo["id"] not in self.claimed]
+            candidates = self.collect_candidates(nodes)
+            self.claimed.update(repo["id"] for repo, _ in candidates)
+        return candidates
+
+    def search_sort(self, topic_index: int, sort_index: int, sort_option: str, search_query: str,
+                    repos_per_sort: int, cursor: Optional[str]):
+        """Queue every page of one search, paging again from a page the writer dropped (search stage)"""
+        failures = 0
+        while True:
+            self.search_pages(topic_index, sort_index, sort_option, search_query, repos_per_sort, cursor)
+            self.wait_for_writer(self.next_seq)
+            with self.progress:
+                if sort_index not in self.failed_pages:
+                    return
+                cursor = self.failed_pages.pop(sort_index)
+            failures += 1
+            if failures > 5:
+                print(f"  ❌ Too many README fetch errors, skipping {sort_option}")
+                return
+            print(f"  ⚠️ README fetch failed, paging {sort_option} again from the failed page")
+            metrics.sleep(Config.ERROR_DELAY_SECONDS, "error_delay")
+
+    def search_pages(self, topic_index: int, sort_index: int, sort_option: str, search_query: str,
+                     repos_per_sort: int, cursor: Optional[str]):
+        """Page through one search and queue every page, until the writer drops one of them"""
+        has_next_page = True
+        consecutive_errors = 0
+        produced = 0  # Candidates queued since the writer's count was last checked
+
+        while has_next_page and sort_index not in self.failed_pages:
+            if produced >= repos_per_sort - self.sort_counts.get(sort_index, 0):
+                # Enough candidates in flight to reach the limit: see what the writer kept
+                self.wait_for_writer(self.next_seq)
+                if self.sort_counts.get(sort_index, 0) >= repos_per_sort:
+                    break
+                produced = 0
+
+            try:
+                start = time.perf_counter()
+                page_size = self.page_size.size
+                if self.single_pass:
+                    query = self.client.search_repos_with_readme_query(search_query, page_size, cursor)
+                else:
+                    query = self.client.search_repos_simple_query(search_query, page_size, cursor,
+                                                                  readme_sizes=self.prefilter is not None)
+                result, latency = self.client.execute_timed_query(query)
+
+                if not result:
+                    self.page_size.record_timeout()
+                    print(f"  ⚠️ Reducing page size to {self.page_size.size}")
+                    consecutive_errors += 1
+                    if consecutive_errors > 5:
+                        print(f"  ❌ Too many errors, skipping {sort_option}")
+                        break
+                    metrics.sleep(Config.ERROR_DELAY_SECONDS, "error_delay")
+                    continue
+
+                consecutive_errors = 0
+                if "data" not in result or not result["data"] or "search" not in result["data"]:
+                    print(f"  ⚠️ No data returned for {sort_option}")
+                    break
+
+                search_data = result["data"]["search"]
+                has_next_page = search_data["pageInfo"]["hasNextPage"]
+                start_cursor, cursor = cursor, search_data["pageInfo"]["endCursor"]
+                self.page_size.record(page_size, latency, result["data"].get("rateLimit"), len(search_data["nodes"]))
+                candidates = self.claim_candidates(search_data["nodes"])
+                produced += len(candidates)
+
+                work = PageWork(self.next_seq, topic_index, sort_index, start_cursor, cursor, has_next_page,
+                                repos_per_sort, candidates)
+                self.next_seq += 1
+                self.search_stage.record(items=1, busy=time.perf_counter() - start)
+                self.search_stage.put(work)
+
+                metrics.sleep(Config.PAGE_DELAY_SECONDS, "page_delay")
+
+            except PipelineAborted:
+                raise
+            except Exception as e:
+                print(f"\n  ❌ Error: {e}")
+                consecutive_errors += 1
+                if consecutive_errors > 5:
+                    print("  ❌ Too many consecutive errors, moving to next sort option")
+                    break
+                metrics.sleep(Config.ERROR_DELAY_SECONDS, "error_delay")
+
+    def crawl_repos_for_topic(self, topic: str, topic_index: int):
+        """Crawl a topic through the pipeline; returns once all of its pages are persisted"""
+        print(f"\n📌 Crawling topic: {topic} ({topic_index + 1}/{len(Config.ALL_TOPICS)})")
+        topic_start_time = time.time()
+        topic_start_requests = self.client.request_count
+
+        searches = self.topic_searches(topic, self.plan_topic_search(topic, topic_index))
+        resuming = self.checkpoint.get("current_topic_index") == topic_index
+        start_sort_index = self.checkpoint.get("current_sort_index", 0) if resuming else 0
+
+        self.reset_topic_state()
+        if resuming:
+            self.sort_counts[start_sort_index] = self.checkpoint.get("repos_crawled_for_sort", 0)
+        self.pbar = tqdm(total=sum(limit for _, _, limit in searches[start_sort_index:]), desc="  repos")
+        try:
+            for sort_index, (sort_option, search_query, repos_per_sort) in enumerate(searches[start_sort_index:],
+                                                                                     start_sort_index):
+                print(f"\n  🔍 {'Slice' if self.partition_search else 'Sort by'}: {sort_option}")
+                print(f"  📝 Query: {search_query}")
+                cursor = self.checkpoint.get("current_page") if \
+                    resuming and self.checkpoint.get("current_sort_index") == sort_index else None
+                self.search_sort(topic_index, sort_index, sort_option, search_query, repos_per_sort, cursor)
+            self.wait_for_writer(self.next_seq)
+        except (KeyboardInterrupt, PipelineAborted):
+            # Stop the stages; the checkpoint only covers pages the writer finished
+            self.abort.set()
+            for stage in self.stages:
+                stage.join()
+            self.pbar.close()
+            self.save_checkpoint()
+            self.raise_stage_error()
+            raise KeyboardInterrupt
+        self.pbar.close()
+
+        print(f"\n  📊 Total unique repos for {topic}: {len(self.topic_repos)}")
+        topic_requests = self.client.request_count - topic_start_requests
+        print(f"  📡 Requests: {topic_requests} ({topic_requests / max(1, len(self.topic_repos)):.2f} per repo) "
+              f"in {time.time() - topic_start_time:.0f}s [pipeline, {'single-pass' if self.single_pass else 'two-phase'}, "
+              f"{self.page_size.summary()}]")
+
+        self.checkpoint["current_sort_index"] = 0
+        self.checkpoint["current_page"] = None
+        self.checkpoint["repos_crawled_for_sort"] = 0
+        self.save_checkpoint()
+        return self.topic_repos
+
+    def print_stage_stats(self):
+        """Per-stage throughput: the busiest stage is the one to scale"""
+        print("🧵 Pipeline stages:")
+        for stage in [self.search_stage] + self.stages:
+            print(f"  - {stage.summary()}")
+
+    def crawl_all_topics(self):
+        """Main crawling function"""
+        print(f"🧵 Pipeline: {self.readme_workers} README fetch threads, queues of {Config.PIPELINE_QUEUE_PAGES} pages")
+        self.start_stages()
+        try:
+            super().crawl_all_topics()
+        finally:
+            self.stop_stages()
+            self.print_stage_stats()
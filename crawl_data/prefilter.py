@@ -0,0 +1,58 @@
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+from config import Config
+from github_client import GitHubGraphQLClient
+from language_id import create_language_detector
+from metrics import metrics
+
+
+class CandidateFilter:
+    """Rejects search nodes that would fail after their README is fetched, using only search fields
+
+    Rules run in order and the first failing rule is counted, so the counters show
+    how many README lookups each rule saved. The README size rule needs the
+    byteSize selections of search_repos_simple_query(readme_sizes=True).
+    """
+
+    def __init__(self, check_readme_size: bool = True, language_detector=None):
+        self.language_detector = language_detector or create_language_detector()
+        self.rules: List[Tuple[str, Callable[[Dict, List[str]], bool]]] = [
+            ("no_topics", lambda repo, topics: bool(topics)),
+            ("excluded_language", self.language_allowed),
+            ("non_english_description", self.description_english),
+        ]
+        if check_readme_size:
+            self.rules.append(("readme_missing_or_small", self.readme_large_enough))
+        self.rejected = Counter()
+        self.checked = 0
+
+    def language_allowed(self, repo: Dict, topics: List[str]) -> bool:
+        language = (repo.get("primaryLanguage") or {}).get("name")
+        return language not in Config.PREFILTER_EXCLUDED_LANGUAGES
+
+    def description_english(self, repo: Dict, topics: List[str]) -> bool:
+        # Too short to judge -> None, which passes
+        language = self.language_detector.language(repo.get("description") or "", Config.PREFILTER_MIN_DESCRIPTION_WORDS)
+        return language in (None, "en")
+
+    def readme_large_enough(self, repo: Dict, topics: List[str]) -> bool:
+        # Byte size >= character count, so this never rejects a README is_english_readme would accept
+        return GitHubGraphQLClient.extract_readme_size(repo) >= Config.PREFILTER_MIN_README_BYTES
+
+    def accept(self, repo: Dict, topics: List[str]) -> bool:
+        """True if the candidate is worth a README request"""
+        self.checked += 1
+        for name, rule in self.rules:
+            if not rule(repo, topics):
+                self.rejected[name] += 1
+                metrics.inc("crawler_repos_total", result="rejected", reason=name)
+                return False
+        return True
+
+    def print_stats(self):
+        """Print how many candidates (and batched README requests) each rule saved"""
+        total = sum(self.rejected.values())
+        print(f"🧹 Pre-filter: {total} of {self.checked} new candidates rejected before the README fetch")
+        for name, _ in self.rules:
+            count = self.rejected[name]
+            print(f"  - {name}: {count} repos (~{count / Config.README_BATCH_SIZE:.1f} batched README requests)")
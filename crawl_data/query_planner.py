@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from config import Config
+
+
+@dataclass
+class SearchSlice:
+    """A created:/stars: range of a topic's search space"""
+    created_from: date
+    created_to: date
+    stars_from: Optional[int] = None
+    stars_to: Optional[int] = None  # None: no upper bound
+    count: Optional[int] = None  # repositoryCount, once known
+
+    @property
+    def qualifiers(self) -> str:
+        """Search qualifiers selecting this slice"""
+        parts = [f"created:{self.created_from.isoformat()}..{self.created_to.isoformat()}"]
+        if self.stars_from is not None:
+            parts.append(f"stars:>={self.stars_from}" if self.stars_to is None
+                         else f"stars:{self.stars_from}..{self.stars_to}")
+        return " ".join(parts)
+
+    def split(self) -> Optional[List["SearchSlice"]]:
+        """Halve the date range, then bucket by stars once it is a single day; None if indivisible"""
+        if self.created_from < self.created_to:
+            middle = self.created_from + (self.created_to - self.created_from) // 2
+            return [SearchSlice(self.created_from, middle, self.stars_from, self.stars_to),
+                    SearchSlice(middle + timedelta(days=1), self.created_to, self.stars_from, self.stars_to)]
+        if self.stars_from is None:
+            bounds = QueryPlanner.STAR_BUCKETS
+            return [SearchSlice(self.created_from, self.created_to, low, high - 1 if high else None)
+                    for low, high in zip(bounds, bounds[1:] + [None])]
+        if self.stars_to is not None and self.stars_from < self.stars_to:
+            middle = (self.stars_from + self.stars_to) // 2
+            return [SearchSlice(self.created_from, self.created_to, self.stars_from, middle),
+                    SearchSlice(self.created_from, self.created_to, middle + 1, self.stars_to)]
+        return None
+
+
+class QueryPlanner:
+    """Splits a search into slices that each stay under GitHub's 1,000-result cap
+
+    The search space is cut by created: date ranges, then by stars: buckets, until
+    every slice's repositoryCount is at most Config.SEARCH_RESULT_CAP. Counts are
+    fetched for several slices per request with aliased first:0 searches, and empty
+    slices are dropped so they cost no page requests later. The caller runs the
+    count queries (sync or async) and feeds the responses back with record().
+    """
+
+    STAR_BUCKETS = [0, 10, 100, 1000, 10000]
+    MAX_FAILURES = 3
+
+    def __init__(self, base_query: str, start: str = None, end: date = None):
+        self.base_query = base_query
+        created_from = date.fromisoformat(start or Config.SEARCH_PLAN_START)
+        created_to = end or (date.fromisoformat(Config.SEARCH_PLAN_END) if Config.SEARCH_PLAN_END
+                             else datetime.now(timezone.utc).date())
+        self.pending = [SearchSlice(created_from, created_to)]
+        self.slices: List[SearchSlice] = []
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def finished(self) -> bool:
+        return not self.pending
+
+    def search_query(self, search_slice: SearchSlice) -> str:
+        return f"{self.base_query} {search_slice.qualifiers}"
+
+    def next_batch(self) -> List[SearchSlice]:
+        """Slices to count in the next request"""
+        return self.pending[:Config.SEARCH_PLAN_BATCH]
+
+    def count_query(self, batch: List[SearchSlice]) -> str:
+        """Aliased query returning repositoryCount for every slice of the batch"""
+        aliases = "".join(
+            f"""
+            s{i}: search(query: "{self.search_query(search_slice)}", type: REPOSITORY, first: 0) {{
+                repositoryCount
+            }}"""
+            for i, search_slice in enumerate(batch)
+        )
+        return f"""
+        query {{
+            rateLimit {{
+                cost
+                remaining
+                resetAt
+            }}
+            {aliases}
+        }}
+        """
+
+    def record(self, batch: List[SearchSlice], result: Optional[Dict]):
+        """Apply the counts of a batch: keep small slices, split large ones"""
+        self.requests += 1
+        data = (result or {}).get("data") or {}
+        if not all(data.get(f"s{i}") for i in range(len(batch))):
+            self.failures += 1
+            if self.failures >= self.MAX_FAILURES:
+                print(f"  ⚠️ Could not count {len(self.pending)} slices, crawling them unsplit")
+                self.slices.extend(self.pending)
+                self.pending = []
+            return
+
+        self.failures = 0
+        del self.pending[:len(batch)]
+        for i, search_slice in enumerate(batch):
+            search_slice.count = data[f"s{i}"]["repositoryCount"]
+            if search_slice.count == 0:
+                continue
+            parts = search_slice.split() if search_slice.count > Config.SEARCH_RESULT_CAP else None
+            if parts:
+                self.pending.extend(parts)
+            else:
+                if search_slice.count > Config.SEARCH_RESULT_CAP:
+                    print(f"  ⚠️ {search_slice.qualifiers} has {search_slice.count} repos and cannot be split further")
+                self.slices.append(search_slice)
+
+    def plan(self) -> List[Dict]:
+        """Finished slices in crawl order, as checkpoint-friendly dicts"""
+        self.slices.sort(key=lambda s: (s.created_from, s.stars_from or 0))
+        return [{"qualifiers": s.qualifiers, "count": s.count} for s in self.slices]
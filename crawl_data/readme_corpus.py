@@ -0,0 +1,226 @@
+import json
+import mmap
+import os
+import struct
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from config import Config
+from dedup_index import repo_key
+
+# Sidecar record: repo key (dedup_index.repo_key), byte offset and length of the JSONL line
+RECORD = struct.Struct("<QQI")
+
+
+def index_path(readme_file: str) -> str:
+    """Sidecar offset index of a README JSONL file"""
+    return readme_file + ".idx"
+
+
+class ReadmeOffsetIndex:
+    """Append-only sidecar of a README JSONL file: one fixed-width record per line
+
+    CsvJsonlStore appends records right after the lines reach the JSONL file, so
+    the index can lag the file after a crash but never runs ahead of it. sync()
+    repairs that: a torn record is dropped, lines past the last record are indexed,
+    and an index that no longer matches the file (rewritten, or written before this
+    index existed) is rebuilt with one sequential scan.
+    """
+
+    def __init__(self, readme_file: str = None, index_file: str = None):
+        self.readme_file = readme_file or Config.README_FILE
+        self.index_file = index_file or index_path(self.readme_file)
+
+    def read_last(self, f) -> Optional[Tuple[int, int, int]]:
+        size = os.fstat(f.fileno()).st_size
+        if size < RECORD.size:
+            return None
+        f.seek(size - RECORD.size)
+        return RECORD.unpack(f.read(RECORD.size))
+
+    def matches(self, record: Tuple[int, int, int]) -> bool:
+        """The JSONL line a record points at exists and belongs to its repo"""
+        key, offset, length = record
+        if offset + length > os.path.getsize(self.readme_file):
+            return False
+        with open(self.readme_file, 'rb') as f:
+            f.seek(offset)
+            line = f.read(length)
+        if not line.endswith(b'\n'):
+            return False
+        try:
+            return repo_key(json.loads(line)['repo_id']) == key
+        except (ValueError, KeyError):
+            return False
+
+    def scan(self, start: int) -> Iterator[Tuple[int, int, int]]:
+        """Records of the complete JSONL lines from byte offset start"""
+        with open(self.readme_file, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Partially written last line
+                yield repo_key(json.loads(line)['repo_id']), offset, len(line)
+                offset += len(line)
+
+    def sync(self) -> int:
+        """Make the index cover every complete line of the JSONL file; returns the records added"""
+        if not os.path.exists(self.readme_file):
+            if os.path.exists(self.index_file):
+                os.remove(self.index_file)
+            return 0
+
+        start = 0
+        mode = 'wb'
+        if os.path.exists(self.index_file):
+            whole = os.path.getsize(self.index_file) // RECORD.size * RECORD.size
+            with open(self.index_file, 'r+b') as f:
+                f.truncate(whole)  # Drop a torn record
+                last = self.read_last(f)
+            if last is None:
+                start = 0
+            elif self.matches(last):
+                start, mode = last[1] + last[2], 'ab'
+            else:
+                print(f"🔁 {self.index_file} does not match {self.readme_file}, rebuilding it")
+        elif os.path.getsize(self.readme_file):
+            print(f"🔁 Building {self.index_file}")
+
+        added = 0
+        with open(self.index_file, mode) as f:
+            for record in self.scan(start):
+                f.write(RECORD.pack(*record))
+                added += 1
+        return added
+
+    def append(self, records: List[Tuple[str, int, int]]):
+        """Append (repo_id, offset, length) of lines already written to the JSONL file"""
+        with open(self.index_file, 'ab') as f:
+            f.write(b''.join(RECORD.pack(repo_key(repo_id), offset, length) for repo_id, offset, length in records))
+
+    def truncate(self, size: int):
+        """Drop the records of lines at or past byte size (after the JSONL file was cut back)"""
+        if not os.path.exists(self.index_file):
+            return
+        with open(self.index_file, 'r+b') as f:
+            count = os.fstat(f.fileno()).st_size // RECORD.size
+            while count:
+                f.seek((count - 1) * RECORD.size)
+                _, offset, length = RECORD.unpack(f.read(RECORD.size))
+                if offset + length <= size:
+                    break
+                count -= 1
+            f.truncate(count * RECORD.size)
+
+    def rewrite(self, records: Iterable[Tuple[str, int, int]]):
+        """Replace the index (after the JSONL file was rewritten)"""
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            for repo_id, offset, length in records:
+                f.write(RECORD.pack(repo_key(repo_id), offset, length))
+        os.replace(tmp_file, self.index_file)
+
+
+class ReadmeCorpus:
+    """Random access and batched iteration over the README corpus without loading it
+
+    Reads readme_data.jsonl, or the compressed shards when Config.README_COMPRESSION
+    is set (each record there is a zstd frame, decompressed on its own). Data files
+    and offset indexes are memory-mapped; only a dict of repo key -> (segment,
+    record number) is kept in memory. get() decodes one record, and iter_batches()
+    decodes batch_size records at a time, in write order or in the order of given
+    repo IDs (e.g. the rows of github_repos.csv). A repo written more than once
+    resolves to its last record. Covers the CSV + JSONL store; the Parquet dataset
+    is columnar already and is read with ParquetStore.
+    """
+
+    def __init__(self, readme_file: str = None, readme_shard_dir: str = None):
+        # Segment: (data mapping, index mapping, records, decompress or None)
+        self.segments: List[Tuple[mmap.mmap, mmap.mmap, int, Optional[Callable[[bytes], bytes]]]] = []
+        if Config.README_COMPRESSION:
+            from readme_shards import ZstdReadmeShards
+            self.segments.extend(ZstdReadmeShards(readme_shard_dir).open_segments())
+        else:
+            index = ReadmeOffsetIndex(readme_file or Config.README_FILE)
+            index.sync()
+            data, records = self._map(index.readme_file), self._map(index.index_file)
+            if data is not None and records is not None:
+                self.segments.append((data, records, len(records) // RECORD.size, None))
+
+        self.positions: Dict[int, Tuple[int, int]] = {}
+        for segment, (_, records, count, _) in enumerate(self.segments):
+            for number in range(count):
+                self.positions[RECORD.unpack_from(records, number * RECORD.size)[0]] = (segment, number)
+
+    @staticmethod
+    def _map(path: str) -> Optional[mmap.mmap]:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, repo_id: str) -> bool:
+        return repo_key(repo_id) in self.positions
+
+    def read(self, position: Tuple[int, int]) -> Dict:
+        """README record at a (segment, record number) position"""
+        data, records, _, decompress = self.segments[position[0]]
+        _, offset, length = RECORD.unpack_from(records, position[1] * RECORD.size)
+        line = data[offset:offset + length]
+        return json.loads(decompress(line) if decompress else line)
+
+    def get(self, repo_id: str) -> Optional[Dict]:
+        """README record (repo_id, full_name, readme, timestamp) of a repo, or None"""
+        position = self.positions.get(repo_key(repo_id))
+        if position is None:
+            return None
+        record = self.read(position)
+        return record if record['repo_id'] == repo_id else None
+
+    def get_readme(self, repo_id: str) -> Optional[str]:
+        record = self.get(repo_id)
+        return record['readme'] if record else None
+
+    def iter_batches(self, batch_size: int = None, repo_ids: Iterable[str] = None) -> Iterator[List[Dict]]:
+        """Lists of README records: every repo in file order, or the given repos (missing ones skipped)"""
+        batch_size = batch_size or Config.README_CORPUS_BATCH_SIZE
+        if repo_ids is None:
+            positions = iter(sorted(self.positions.values()))
+        else:
+            positions = (self.positions.get(repo_key(repo_id)) for repo_id in repo_ids)
+        batch = []
+        for position in positions:
+            if position is None:
+                continue
+            batch.append(self.read(position))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def join_repos(self, repos: Iterable[Dict], batch_size: int = None) -> Iterator[List[Dict]]:
+        """Batches of repository rows (e.g. store.iter_repos()) with their README under 'readme'"""
+        batch_size = batch_size or Config.README_CORPUS_BATCH_SIZE
+        batch = []
+        for row in repos:
+            batch.append({**row, 'readme': self.get_readme(row['repo_id'])})
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def close(self):
+        for data, records, _, _ in self.segments:
+            data.close()
+            records.close()
+        self.segments = []
@@ -0,0 +1,226 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import zlib
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from config import Config
+from storage import create_store
+
+WORD_RE = re.compile(r'\w+')
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_readme(text: str) -> str:
+    """Lowercased README with whitespace collapsed, the form compared for exact duplicates"""
+    return " ".join(text.lower().split())
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(normalize_readme(text).encode('utf-8'), digest_size=16).digest()
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, with universal hashing mod 2^31-1 in NumPy"""
+
+    def __init__(self, num_perm: int = None, shingle_size: int = None, seed: int = 1):
+        self.num_perm = num_perm or Config.README_MINHASH_PERMUTATIONS
+        self.shingle_size = shingle_size or Config.README_SHINGLE_SIZE
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, MERSENNE_PRIME, size=self.num_perm).astype(np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=self.num_perm).astype(np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = WORD_RE.findall(text.lower())
+        size = min(self.shingle_size, max(1, len(words)))
+        grams = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+        return np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text) % np.uint64(MERSENNE_PRIME)
+        permuted = (hashes[:, None] * self.a[None, :] + self.b[None, :]) % np.uint64(MERSENNE_PRIME)
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class ReadmeDedupIndex:
+    """Persistent exact + near-duplicate index of crawled READMEs
+
+    Every README gets a normalized-text hash and a MinHash signature. A README whose
+    hash is already known joins that document's cluster; otherwise its LSH band
+    buckets give candidates, and the best one with estimated Jaccard similarity over
+    the threshold decides the cluster. Signatures and buckets live in SQLite and the
+    position reached in the README file is saved, so a later run only reads and
+    compares the READMEs appended since. A README whose text changed (a refresh
+    upsert) is taken out of the index and indexed again.
+    """
+
+    COMMIT_EVERY = 1000
+
+    def __init__(self, path: str = None, hasher: MinHasher = None):
+        self.path = path or Config.README_DEDUP_INDEX_FILE
+        self.hasher = hasher or MinHasher()
+        self.bands = Config.README_LSH_BANDS
+        self.rows = self.hasher.num_perm // self.bands
+        self.threshold = Config.README_NEAR_DUP_THRESHOLD
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS docs (
+                repo_id TEXT PRIMARY KEY, content_hash BLOB, signature BLOB, cluster_id TEXT, match TEXT
+            );
+            CREATE INDEX IF NOT EXISTS docs_hash ON docs (content_hash);
+            CREATE TABLE IF NOT EXISTS buckets (band INTEGER, bucket INTEGER, repo_id TEXT);
+            CREATE INDEX IF NOT EXISTS buckets_key ON buckets (band, bucket);
+        """)
+        self.added = Counter()
+        self.reindexed = 0
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """One 64-bit bucket key per LSH band"""
+        return [
+            int.from_bytes(hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(),
+                                           digest_size=8).digest(), 'little', signed=True)
+            for band in range(self.bands)
+        ]
+
+    def find_cluster(self, digest: bytes, signature: np.ndarray, band_keys: List[int]) -> Tuple[Optional[str], str]:
+        """(cluster to join, 'exact' / 'near'), or (None, 'unique')"""
+        row = self.conn.execute("SELECT cluster_id FROM docs WHERE content_hash = ? LIMIT 1", (digest,)).fetchone()
+        if row:
+            return row[0], "exact"
+
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            candidates.update(repo_id for repo_id, in self.conn.execute(
+                "SELECT repo_id FROM buckets WHERE band = ? AND bucket = ?", (band, key)))
+        best, best_similarity = None, self.threshold
+        for repo_id in candidates:
+            cluster_id, stored = self.conn.execute(
+                "SELECT cluster_id, signature FROM docs WHERE repo_id = ?", (repo_id,)).fetchone()
+            similarity = float(np.mean(np.frombuffer(stored, dtype=np.uint32) == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = cluster_id, similarity
+        return (best, "near") if best else (None, "unique")
+
+    def remove(self, repo_id: str, digest: bytes):
+        """Take a README out of the index, keeping its cluster and an exact copy's buckets intact"""
+        copy = self.conn.execute(
+            "SELECT repo_id FROM docs WHERE content_hash = ? AND repo_id != ? ORDER BY rowid LIMIT 1",
+            (digest, repo_id)).fetchone()
+        if copy:  # Exact copies have no buckets of their own: hand them this README's
+            self.conn.execute("UPDATE buckets SET repo_id = ? WHERE repo_id = ?", (copy[0], repo_id))
+        else:
+            self.conn.execute("DELETE FROM buckets WHERE repo_id = ?", (repo_id,))
+        self.conn.execute("DELETE FROM docs WHERE repo_id = ?", (repo_id,))
+        head = self.conn.execute("SELECT repo_id FROM docs WHERE cluster_id = ? ORDER BY rowid LIMIT 1",
+                                 (repo_id,)).fetchone()
+        if head:  # The cluster was named after this README: the oldest remaining member names it now
+            self.conn.execute("UPDATE docs SET cluster_id = ? WHERE cluster_id = ?", (head[0], repo_id))
+
+    def add(self, repo_id: str, readme_text: str) -> str:
+        """Index one README and return how it matched ('exact', 'near' or 'unique')"""
+        digest = content_hash(readme_text)
+        row = self.conn.execute("SELECT content_hash FROM docs WHERE repo_id = ?", (repo_id,)).fetchone()
+        if row:
+            if row[0] == digest:
+                return "known"
+            self.remove(repo_id, row[0])
+            self.reindexed += 1
+        signature = self.hasher.signature(normalize_readme(readme_text))
+        band_keys = self.band_keys(signature)
+        cluster_id, match = self.find_cluster(digest, signature, band_keys)
+
+        self.conn.execute("INSERT INTO docs VALUES (?, ?, ?, ?, ?)",
+                          (repo_id, digest, signature.tobytes(), cluster_id or repo_id, match))
+        if match != "exact":  # An exact copy adds nothing new to the buckets
+            self.conn.executemany("INSERT INTO buckets VALUES (?, ?, ?)",
+                                  ((band, key, repo_id) for band, key in enumerate(band_keys)))
+        self.added[match] += 1
+        return match
+
+    def iter_new_readmes(self) -> Iterator[Tuple[str, str, Optional[int]]]:
+        """(repo_id, README, file offset after it), reading the JSONL from the saved offset
+
+        The Parquet dataset and compressed shards have no append offset; they are
+        rescanned and known repos skipped.
+        """
+        if Config.OUTPUT_FORMAT == "parquet" or Config.README_COMPRESSION:
+            for row in create_store().iter_readmes():
+                yield row['repo_id'], row['readme'], None
+            return
+
+        if not os.path.exists(Config.README_FILE):
+            return
+        offset = int(self.get_meta("readme_offset") or 0)
+        inode = str(os.stat(Config.README_FILE).st_ino)
+        if inode != self.get_meta("readme_inode") or offset > os.path.getsize(Config.README_FILE):
+            offset = 0  # File was rewritten (e.g. by a refresh upsert): rescan, unchanged repos are skipped
+            self.set_meta("readme_inode", inode)
+        with open(Config.README_FILE, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Partially written last line, picked up next run
+                offset += len(line)
+                record = json.loads(line)
+                yield record['repo_id'], record['readme'], offset
+
+    def update(self):
+        """Index every README appended since the last run"""
+        processed = 0
+        for repo_id, readme_text, offset in self.iter_new_readmes():
+            match = self.add(repo_id, readme_text or "")
+            if offset is not None:
+                self.set_meta("readme_offset", str(offset))
+            if match == "known":
+                continue
+            processed += 1
+            if processed % self.COMMIT_EVERY == 0:
+                self.conn.commit()
+                print(f"  ✓ Indexed {processed} READMEs")
+        self.conn.commit()
+        print(f"🧬 Indexed {processed} new or changed READMEs ({self.reindexed} changed): "
+              f"{self.added['exact']} exact duplicates, {self.added['near']} near duplicates, "
+              f"{self.added['unique']} unique")
+
+    def cluster_sizes(self) -> Dict[str, int]:
+        """Cluster ID -> number of READMEs, for clusters with more than one member"""
+        rows = self.conn.execute(
+            "SELECT cluster_id, COUNT(*) FROM docs GROUP BY cluster_id HAVING COUNT(*) > 1 ORDER BY COUNT(*) DESC")
+        return dict(rows)
+
+    def report(self, top: int = 10):
+        """Print the cluster size distribution and the largest clusters"""
+        total = self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        sizes = self.cluster_sizes()
+        duplicates = sum(sizes.values()) - len(sizes)
+        print(f"\n📚 {total} READMEs, {len(sizes)} duplicate clusters, {duplicates} redundant copies "
+              f"({duplicates / max(1, total) * 100:.1f}%)")
+        histogram = Counter(sizes.values())
+        for size in sorted(histogram):
+            print(f"  - clusters of {size}: {histogram[size]}")
+        for cluster_id, size in list(sizes.items())[:top]:
+            print(f"  🔁 {cluster_id}: {size} READMEs")
+
+    def export_clusters(self, output_file: str = None):
+        """Write repo_id, cluster_id and match type of every README"""
+        output_file = output_file or Config.README_CLUSTERS_FILE
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['repo_id', 'cluster_id', 'match'])
+            writer.writerows(self.conn.execute("SELECT repo_id, cluster_id, match FROM docs ORDER BY rowid"))
+        print(f"✅ README clusters saved to {output_file}")
+
+    def close(self):
+        self.conn.close()
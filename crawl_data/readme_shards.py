@@ -0,0 +1,338 @@
+import json
+import mmap
+import os
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config import Config
+from dedup_index import repo_key
+from journal import atomic_write_json
+from readme_corpus import RECORD, index_path
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, only needed for compressed README shards
+    zstandard = None
+
+MANIFEST_FILE = "manifest.json"
+
+
+class ZstdReadmeShards:
+    """README records as zstd frames in size-rotated shard files, described by a manifest
+
+    Every README line (the same JSON as in readme_data.jsonl) is one zstd frame, so a
+    shard is a valid multi-frame .zst file and any record can be decompressed on its
+    own. Each shard has a sidecar offset index like the JSONL file's (see
+    readme_corpus.py). A shard is closed for writing once it reaches
+    Config.README_SHARD_MAX_BYTES compressed bytes.
+
+    Once Config.README_ZSTD_DICT_SAMPLES READMEs exist, a dictionary is trained on
+    them and the following shards are compressed with it (the manifest names the
+    dictionary of every shard). Small frames rely on it: markdown headings, badges and
+    install snippets repeat across READMEs but rarely within one.
+
+    The manifest is rewritten atomically on every flush with each shard's committed
+    bytes and records. Readers only look at committed records; before the first
+    write, bytes past them (a crash mid-flush) are cut off.
+    """
+
+    def __init__(self, directory: str = None):
+        if zstandard is None:
+            raise ImportError("zstandard is required for compressed README shards (pip install zstandard)")
+        self.directory = directory or Config.README_SHARD_DIR
+        self.manifest_file = os.path.join(self.directory, MANIFEST_FILE)
+        os.makedirs(self.directory, exist_ok=True)
+        self.manifest = self.load_manifest()
+        self.pending: List[Tuple[str, bytes]] = []
+        self.samples: List[bytes] = []
+        self.compressor = None
+        self.handle = None
+        self.index_handle = None
+        self.writing = False  # Repair and sampling wait for the first write, readers never change files
+
+    def load_manifest(self) -> Dict:
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        return {"version": 1, "dictionaries": [], "shards": []}
+
+    def save_manifest(self):
+        atomic_write_json(self.manifest_file, self.manifest)  # Once per flush, so compact
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def repair(self):
+        """Cut shard and index files back to what the manifest committed, and remove unlisted ones
+
+        Unlisted shard files are left by a crash during upsert (the rewritten copy) or
+        right after it (the replaced original).
+        """
+        listed = {name for shard in self.manifest["shards"] for name in (shard["file"], index_path(shard["file"]))}
+        for name in os.listdir(self.directory):
+            if name.startswith("readme-") and name not in listed:
+                os.remove(self.path(name))
+        for shard in self.manifest["shards"]:
+            for path, size in ((self.path(shard["file"]), shard["bytes"]),
+                               (index_path(self.path(shard["file"])), shard["records"] * RECORD.size)):
+                if os.path.exists(path) and os.path.getsize(path) > size:
+                    with open(path, 'r+b') as f:
+                        f.truncate(size)
+
+    # Dictionaries
+
+    def load_dictionary(self, name: Optional[str]) -> Optional["zstandard.ZstdCompressionDict"]:
+        if not name:
+            return None
+        with open(self.path(name), 'rb') as f:
+            return zstandard.ZstdCompressionDict(f.read())
+
+    def decompressor(self, shard: Dict) -> "zstandard.ZstdDecompressor":
+        dictionary = self.load_dictionary(shard.get("dictionary"))
+        return zstandard.ZstdDecompressor(dict_data=dictionary) if dictionary else zstandard.ZstdDecompressor()
+
+    def current_dictionary(self) -> Optional[str]:
+        return self.manifest["dictionaries"][-1] if self.manifest["dictionaries"] else None
+
+    def wants_dictionary(self) -> bool:
+        return (Config.README_ZSTD_DICT_SAMPLES > 0 and not self.manifest["dictionaries"]
+                and not self.manifest.get("dictionary_failed"))
+
+    def collect_sample(self, line: bytes):
+        if self.wants_dictionary() and len(self.samples) < Config.README_ZSTD_DICT_SAMPLES:
+            self.samples.append(line)
+
+    def seed_samples(self):
+        """Samples from READMEs already in (dictionary-less) shards, so restarts keep counting"""
+        if not self.wants_dictionary():
+            return
+        for _, record in zip(range(Config.README_ZSTD_DICT_SAMPLES), self.iter_lines()):
+            self.samples.append(record)
+
+    def train_dictionary(self):
+        """Train a dictionary on the collected samples and rotate to a shard that uses it"""
+        try:
+            dictionary = zstandard.train_dictionary(Config.README_ZSTD_DICT_BYTES, self.samples,
+                                                    level=Config.README_ZSTD_LEVEL)
+        except zstandard.ZstdError as e:
+            print(f"⚠️ README dictionary training failed ({e}), shards stay dictionary-less")
+            self.manifest["dictionary_failed"] = True
+            self.samples = []
+            return
+        name = f"dict-{len(self.manifest['dictionaries']):03d}.zdict"
+        with open(self.path(name), 'wb') as f:
+            f.write(dictionary.as_bytes())
+        self.manifest["dictionaries"].append(name)
+        print(f"📚 Trained a {len(dictionary.as_bytes()) // 1024} KB README dictionary on {len(self.samples)} samples")
+        self.samples = []
+        self.rotate()
+
+    # Writing
+
+    def current_shard(self) -> Dict:
+        """Shard taking new frames, opening a new one when the last is full or uses an old dictionary"""
+        shards = self.manifest["shards"]
+        if (not shards or shards[-1]["bytes"] >= Config.README_SHARD_MAX_BYTES
+                or shards[-1].get("dictionary") != self.current_dictionary()):
+            self.rotate()
+        if self.handle is None:
+            self.handle = open(self.path(shards[-1]["file"]), 'ab')
+            self.index_handle = open(index_path(self.path(shards[-1]["file"])), 'ab')
+            dictionary = self.load_dictionary(shards[-1].get("dictionary"))
+            self.compressor = zstandard.ZstdCompressor(level=Config.README_ZSTD_LEVEL, dict_data=dictionary,
+                                                       write_content_size=True, write_dict_id=dictionary is not None)
+        return shards[-1]
+
+    def rotate(self):
+        """Close the current shard and register an empty one in the manifest"""
+        self.close_handles()
+        shards = self.manifest["shards"]
+        shards.append({"file": f"readme-{len(shards):05d}.zst", "dictionary": self.current_dictionary(),
+                       "records": 0, "bytes": 0, "raw_bytes": 0})
+        self.save_manifest()
+
+    def write(self, repo_id: str, line: bytes):
+        """Buffer one README line (JSON + newline)"""
+        self.pending.append((repo_id, line))
+
+    def compress_batch(self, lines: List[bytes]) -> List[bytes]:
+        """One frame per line; large batches are compressed on all CPUs"""
+        if len(lines) < Config.README_ZSTD_PARALLEL_MIN or (os.cpu_count() or 1) < 2:
+            return [self.compressor.compress(line) for line in lines]
+        result = self.compressor.multi_compress_to_buffer(lines, threads=Config.README_ZSTD_THREADS)
+        return [result[i].tobytes() for i in range(len(result))]
+
+    def flush(self):
+        """Compress buffered lines into the current shard, then commit them in the manifest"""
+        if not self.pending:
+            return
+        if not self.writing:
+            self.repair()
+            self.seed_samples()
+            self.writing = True
+        shard = self.current_shard()
+        records = []
+        frames = self.compress_batch([line for _, line in self.pending])
+        offset = shard["bytes"]
+        raw_bytes = 0
+        for (repo_id, line), frame in zip(self.pending, frames):
+            records.append(RECORD.pack(repo_key(repo_id), offset, len(frame)))
+            offset += len(frame)
+            raw_bytes += len(line)
+            self.collect_sample(line)
+        self.handle.write(b''.join(frames))
+        self.handle.flush()
+        os.fsync(self.handle.fileno())  # Frames on disk before the manifest commits them
+        self.index_handle.write(b''.join(records))
+        self.index_handle.flush()
+        os.fsync(self.index_handle.fileno())
+        shard["records"] += len(records)
+        shard["bytes"] = offset
+        shard["raw_bytes"] += raw_bytes
+        self.pending = []
+        self.save_manifest()
+        if self.wants_dictionary() and len(self.samples) >= Config.README_ZSTD_DICT_SAMPLES:
+            self.train_dictionary()
+
+    def position(self) -> Dict:
+        """Committed extent (shard count and the last shard's size), for journal checkpoints"""
+        shards = self.manifest["shards"]
+        if not shards:
+            return {"shards": 0}
+        last = shards[-1]
+        return {"shards": len(shards), "file": last["file"], "records": last["records"],
+                "bytes": last["bytes"], "raw_bytes": last["raw_bytes"]}
+
+    def restore(self, position: Dict):
+        """Drop records committed to the manifest after a journaled position"""
+        shards = self.manifest["shards"]
+        count = position["shards"]
+        if count and (len(shards) < count or shards[count - 1]["file"] != position["file"]):
+            print(f"⚠️ {self.directory} was rewritten after the last checkpoint, not cutting it back")
+            return
+        if len(shards) == count and (not count or shards[-1]["records"] == position["records"]):
+            return
+        print("✂️ Dropping README shard records written after the last checkpoint")
+        for shard in shards[count:]:
+            for path in (self.path(shard["file"]), index_path(self.path(shard["file"]))):
+                if os.path.exists(path):
+                    os.remove(path)
+        del shards[count:]
+        if count:
+            shards[-1].update(records=position["records"], bytes=position["bytes"], raw_bytes=position["raw_bytes"])
+        self.save_manifest()
+        self.repair()
+
+    def close(self):
+        self.flush()
+        self.close_handles()
+
+    def close_handles(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.index_handle.close()
+            self.handle = self.index_handle = None
+
+    # Reading
+
+    def open_segments(self) -> Iterator[Tuple[mmap.mmap, mmap.mmap, int, Callable[[bytes], bytes]]]:
+        """(shard mapping, index mapping, committed records, decompress) of every non-empty shard"""
+        for shard in self.manifest["shards"]:
+            if not shard["records"]:
+                continue
+            path = self.path(shard["file"])
+            with open(path, 'rb') as data, open(index_path(path), 'rb') as records:
+                yield (mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ),
+                       mmap.mmap(records.fileno(), 0, access=mmap.ACCESS_READ),
+                       shard["records"], self.decompressor(shard).decompress)
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """Decompressed README lines, shard by shard in write order"""
+        for data, records, count, decompress in self.open_segments():
+            try:
+                for number in range(count):
+                    _, offset, length = RECORD.unpack_from(records, number * RECORD.size)
+                    yield decompress(data[offset:offset + length])
+            finally:
+                data.close()
+                records.close()
+
+    def iter_readmes(self) -> Iterator[Dict]:
+        for line in self.iter_lines():
+            yield json.loads(line)
+
+    @staticmethod
+    def rewritten_name(name: str) -> str:
+        """File name of a rewritten shard: readme-00003.zst -> readme-00003.1.zst -> readme-00003.2.zst"""
+        stem = name[:-len(".zst")]
+        base, _, generation = stem.partition('.')
+        return f"{base}.{int(generation or 0) + 1}.zst"
+
+    def upsert(self, readme_records: Dict[str, Dict]):
+        """Replace the records of the given repo_ids, rewriting only the shards that hold one
+
+        A rewritten shard and its index get new file names; one atomic manifest write
+        switches to them and only then are the old files removed, so a crash leaves the
+        old or the new shard in place, never offsets of one pointing into the other.
+        """
+        self.close()
+        keys = {repo_key(repo_id) for repo_id in readme_records}
+        for shard in self.manifest["shards"]:
+            if not shard["records"]:
+                continue
+            path = self.path(shard["file"])
+            with open(index_path(path), 'rb') as f:
+                index = list(RECORD.iter_unpack(f.read(shard["records"] * RECORD.size)))
+            if not any(key in keys for key, _, _ in index):
+                continue
+
+            dictionary = self.load_dictionary(shard.get("dictionary"))
+            compressor = zstandard.ZstdCompressor(level=Config.README_ZSTD_LEVEL, dict_data=dictionary,
+                                                  write_content_size=True, write_dict_id=dictionary is not None)
+            decompress = self.decompressor(shard).decompress
+            new_file = self.rewritten_name(shard["file"])
+            new_path = self.path(new_file)
+            offset = raw_bytes = 0
+            with open(path, 'rb') as src, open(new_path, 'wb') as dst, open(index_path(new_path), 'wb') as dst_index:
+                for key, old_offset, length in index:
+                    src.seek(old_offset)
+                    frame = src.read(length)
+                    line = decompress(frame)
+                    if key in keys:
+                        record = readme_records.get(json.loads(line)['repo_id'])
+                        if record:
+                            line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+                            frame = compressor.compress(line)
+                    dst.write(frame)
+                    dst_index.write(RECORD.pack(key, offset, len(frame)))
+                    offset += len(frame)
+                    raw_bytes += len(line)
+                for handle in (dst, dst_index):
+                    handle.flush()
+                    os.fsync(handle.fileno())
+
+            shard.update(file=new_file, bytes=offset, raw_bytes=raw_bytes)
+            self.save_manifest()
+            for old_path in (path, index_path(path)):
+                os.remove(old_path)
+
+    def import_jsonl(self, readme_file: str) -> int:
+        """Append every line of a README JSONL file; returns the number of records"""
+        count = 0
+        with open(readme_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Partially written last line
+                self.write(json.loads(line)['repo_id'], line)
+                count += 1
+                if len(self.pending) >= 1000:
+                    self.flush()
+        self.close()
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        shards = self.manifest["shards"]
+        return {
+            "shards": len(shards),
+            "records": sum(shard["records"] for shard in shards),
+            "bytes": sum(shard["bytes"] for shard in shards),
+            "raw_bytes": sum(shard["raw_bytes"] for shard in shards),
+        }
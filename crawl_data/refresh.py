@@ -0,0 +1,195 @@
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import Config, APIKeyManager
+from crawler import GitHubCrawler
+from github_client import GitHubGraphQLClient
+from language_id import create_language_detector
+from storage import create_store
+
+
+class WatermarkStore:
+    """Last seen updatedAt and default-branch head OID of every stored repo, in SQLite
+
+    Repos are seeded from the output store the first time they are seen, without an
+    OID; the first refresh that looks at them records it. A refresh in progress keeps
+    its position (the rowid reached), so an interrupted refresh resumes.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.REFRESH_STATE_FILE
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS watermarks (
+                repo_id TEXT PRIMARY KEY, full_name TEXT, updated_at TEXT, head_oid TEXT
+            );
+        """)
+
+    def seed(self, repos: Iterator[Dict]) -> int:
+        """Add stored repos that have no watermark yet; returns how many were added"""
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO watermarks (repo_id, full_name, updated_at) VALUES (?, ?, ?)",
+                ((repo['repo_id'], repo['full_name'], repo['updated_at']) for repo in repos)
+            )
+        return self.conn.total_changes - before
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM watermarks").fetchone()[0]
+
+    @property
+    def cursor(self) -> int:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'refresh_cursor'").fetchone()
+        return int(row[0]) if row else 0
+
+    def iter_batches(self, batch_size: int, after: int) -> Iterator[List[Tuple[int, str, str, Optional[str]]]]:
+        """(rowid, repo_id, updated_at, head_oid) in rowid order, batch by batch"""
+        while True:
+            batch = self.conn.execute(
+                "SELECT rowid, repo_id, updated_at, head_oid FROM watermarks WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (after, batch_size)
+            ).fetchall()
+            if not batch:
+                return
+            yield batch
+            after = batch[-1][0]
+
+    def commit(self, marks: List[Tuple[str, str, Optional[str], str]], cursor: Optional[int]):
+        """Save new (full_name, updated_at, head_oid, repo_id) marks and the refresh position (None: finished)"""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE watermarks SET full_name = ?, updated_at = ?, head_oid = ? WHERE repo_id = ?", marks)
+            if cursor is None:
+                self.conn.execute("DELETE FROM meta WHERE key = 'refresh_cursor'")
+            else:
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('refresh_cursor', ?)", (str(cursor),))
+
+    def close(self):
+        self.conn.close()
+
+
+class RepoRefresher(GitHubCrawler):
+    """Keeps the stored corpus current without re-crawling it
+
+    Known repos are re-read with nodes(ids:) queries (up to 100 per request) that
+    select only the metadata fields. A changed updatedAt updates the metadata row;
+    the README is re-fetched only when the default branch head moved (or, before an
+    OID is recorded, when updatedAt changed). Changed rows are upserted into the
+    output store every Config.REFRESH_REWRITE_INTERVAL changed repos.
+
+    Shares the row building of GitHubCrawler but none of its crawl state: the search
+    checkpoint, journal and dedup index are left alone.
+    """
+
+    def __init__(self):
+        self.api_key_manager = APIKeyManager(Config.API_KEYS)
+        self.restored_keys = self.api_key_manager.load_state(Config.KEY_STATE_FILE)
+        self.client = GitHubGraphQLClient(self.api_key_manager)
+        self.language_detector = create_language_detector()
+        self.store = create_store()
+        self.watermarks = WatermarkStore()
+        self.stats = Counter()
+        self.repo_rows: Dict[str, Dict] = {}
+        self.readme_repos: List[Tuple[Dict, str, Optional[str]]] = []  # (current node, recorded updatedAt and OID)
+        self.marks: Dict[str, Tuple[str, str, Optional[str]]] = {}
+
+    def check_batch(self, batch: List[Tuple[int, str, str, Optional[str]]]):
+        """Compare a batch of watermarks with the repos' current state and queue what changed"""
+        nodes = self.client.fetch_nodes_batch([repo_id for _, repo_id, _, _ in batch], Config.REFRESH_BATCH_SIZE)
+        for _, repo_id, updated_at, head_oid in batch:
+            if repo_id not in nodes:
+                self.stats["failed"] += 1
+                continue
+            repo = nodes[repo_id]
+            self.stats["checked"] += 1
+            if repo is None:
+                self.stats["missing"] += 1  # Deleted or made private; the stored rows are kept
+                continue
+
+            new_oid = self.client.extract_head_oid(repo)
+            if repo["updatedAt"] != updated_at:
+                self.stats["metadata_changed"] += 1
+                self.repo_rows[repo_id] = self.build_repo_data(repo, self.extract_topics(repo))
+            if (new_oid != head_oid) if head_oid else (repo["updatedAt"] != updated_at):
+                self.readme_repos.append((repo, updated_at, head_oid))
+            if repo["updatedAt"] != updated_at or new_oid != head_oid:
+                self.marks[repo_id] = (repo["nameWithOwner"], repo["updatedAt"], new_oid)
+
+    def apply_changes(self, cursor: Optional[int]):
+        """Fetch the queued READMEs, upsert the changed rows and commit the watermarks"""
+        readme_records = {}
+        if self.readme_repos:
+            readmes = self.client.fetch_readmes_batch(
+                [tuple(repo["nameWithOwner"].split('/', 1)) for repo, _, _ in self.readme_repos],
+                Config.README_BATCH_SIZE)
+            self.stats["readmes_fetched"] += len(self.readme_repos)
+            for repo, updated_at, head_oid in self.readme_repos:
+                if repo["nameWithOwner"] not in readmes:
+                    self.stats["readmes_failed"] += 1  # Batch failed (left out by fetch_readmes_batch)
+                    readme_text = None
+                else:
+                    readme_text = readmes[repo["nameWithOwner"]]
+                    if not readme_text or not self.is_english_readme(readme_text):
+                        self.stats["readmes_rejected"] += 1
+                        readme_text = None
+                if readme_text is None:
+                    # Keep the stored README and the old watermark (updatedAt too: a seeded repo
+                    # has no OID to compare), so the next refresh fetches it again
+                    self.marks[repo["id"]] = (self.marks[repo["id"]][0], updated_at, head_oid)
+                    continue
+                readme_records[repo["id"]] = {
+                    'repo_id': repo["id"],
+                    'full_name': repo["nameWithOwner"],
+                    'readme': readme_text,
+                    'timestamp': datetime.now().isoformat()
+                }
+            self.stats["readmes_updated"] += len(readme_records)
+
+        if self.repo_rows or readme_records:
+            self.store.upsert(self.repo_rows, readme_records)
+        self.watermarks.commit([mark + (repo_id,) for repo_id, mark in self.marks.items()], cursor)
+        self.api_key_manager.save_state(Config.KEY_STATE_FILE)
+        self.repo_rows, self.readme_repos, self.marks = {}, [], {}
+
+    def refresh_all(self):
+        """Check every stored repo once, resuming an interrupted refresh"""
+        print("🔄 Starting refresh of the stored corpus")
+        seeded = self.watermarks.seed(self.store.iter_repos())
+        cursor = self.watermarks.cursor
+        print(f"📋 {len(self.watermarks)} known repos ({seeded} new since the last refresh)"
+              + (", resuming" if cursor else ""))
+        start_time = time.time()
+        if self.should_probe_keys():
+            self.client.probe_rate_limits()
+
+        try:
+            for batch in self.watermarks.iter_batches(Config.REFRESH_BATCH_SIZE, cursor):
+                self.check_batch(batch)
+                cursor = batch[-1][0]
+                if len(self.repo_rows) + len(self.readme_repos) >= Config.REFRESH_REWRITE_INTERVAL:
+                    self.apply_changes(cursor)
+                    print(f"  ✓ {self.stats['checked']} repos checked")
+            self.apply_changes(None)
+        except KeyboardInterrupt:
+            print("\n🛑 Refresh stopped by user, progress up to the last upsert is saved")
+            return
+        finally:
+            self.store.close()
+            self.watermarks.close()
+
+        self.print_stats(time.time() - start_time)
+
+    def print_stats(self, elapsed: float):
+        """Print what changed and the requests spent against a full re-crawl"""
+        stats = self.stats
+        print(f"\n✅ Refresh completed in {elapsed:.0f}s: {stats['checked']} repos checked, "
+              f"{stats['missing']} gone, {stats['failed']} not reachable")
+        print(f"  - metadata updated: {stats['metadata_changed']}")
+        print(f"  - READMEs re-fetched: {stats['readmes_fetched']}, updated: {stats['readmes_updated']}, "
+              f"kept (removed or not English): {stats['readmes_rejected']}, fetch failed: {stats['readmes_failed']}")
+        print(f"  📡 {self.client.request_count} requests; fetching every README again alone would take "
+              f"~{stats['checked'] / Config.README_BATCH_SIZE:.0f}")
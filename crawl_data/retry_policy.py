@@ -0,0 +1,150 @@
+import json
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Dict, Optional
+
+
+class Outcome(Enum):
+    """What happened to a single GraphQL request"""
+    OK = "ok"
+    TIMEOUT = "timeout"  # GraphQL query timed out: caller should shrink the query
+    RATE_LIMITED = "rate_limited"  # Primary budget of the key is spent
+    SECONDARY_RATE_LIMIT = "secondary_rate_limit"  # Abuse/secondary limit, honor Retry-After
+    AUTH_FAILED = "auth_failed"
+    SERVER_ERROR = "server_error"  # 5xx
+    NETWORK_ERROR = "network_error"  # Connection error or read timeout
+    INVALID_RESPONSE = "invalid_response"  # Body is not JSON
+    UNEXPECTED_STATUS = "unexpected_status"
+
+
+@dataclass
+class QueryResult:
+    """Structured outcome of a query, so callers do not parse error strings"""
+    outcome: Outcome
+    data: Optional[Dict] = None
+    status: Optional[int] = None
+    retry_after: Optional[float] = None  # Seconds requested by the server
+    reset_at: Optional[str] = None  # When the key budget resets (ISO 8601)
+    message: str = ""
+    attempts: int = 1
+    latency: Optional[float] = None  # Seconds the answering request took
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome == Outcome.OK
+
+    @property
+    def rate_limit(self) -> Optional[Dict]:
+        """rateLimit block of the response, if the query selected it"""
+        if self.data and self.data.get("data"):
+            return self.data["data"].get("rateLimit")
+        return None
+
+
+class QueryFailedError(Exception):
+    """Raised when the retry policy gives up on a query"""
+
+    def __init__(self, result: QueryResult):
+        super().__init__(f"{result.outcome.value} after {result.attempts} attempts: {result.message}")
+        self.result = result
+
+
+def classify_response(status: int, headers: Dict, body: str) -> QueryResult:
+    """Map an HTTP response to an Outcome"""
+    retry_after = float(headers["Retry-After"]) if str(headers.get("Retry-After", "")).isdigit() else None
+    reset_at = None
+    if str(headers.get("X-RateLimit-Reset", "")).isdigit():
+        reset_at = datetime.fromtimestamp(int(headers["X-RateLimit-Reset"]), timezone.utc).isoformat()
+    elif retry_after is not None:
+        reset_at = (datetime.now(timezone.utc) + timedelta(seconds=retry_after)).isoformat()
+
+    if status == 200:
+        try:
+            data = json.loads(body)
+        except json.JSONDecodeError:
+            return QueryResult(Outcome.INVALID_RESPONSE, status=status, message="Invalid JSON response")
+
+        errors = data.get("errors")
+        if errors:
+            error_types = {str(error.get("type", "")).upper() for error in errors if isinstance(error, dict)}
+            error_msg = str(errors).lower()
+            if "RATE_LIMITED" in error_types or "rate limit" in error_msg:
+                return QueryResult(Outcome.RATE_LIMITED, data, status, retry_after, reset_at, str(errors))
+            if "timeout" in error_msg:
+                return QueryResult(Outcome.TIMEOUT, data, status, message=str(errors))
+        # Other GraphQL errors (e.g. NOT_FOUND for one alias) still carry usable data
+        return QueryResult(Outcome.OK, data, status, message=str(errors) if errors else "")
+
+    message = body[:200] if body else ""
+    if status == 401:
+        return QueryResult(Outcome.AUTH_FAILED, status=status, message=message)
+    if status in (403, 429):
+        if "secondary rate limit" in message.lower() or retry_after is not None:
+            return QueryResult(Outcome.SECONDARY_RATE_LIMIT, status=status, retry_after=retry_after,
+                               reset_at=reset_at, message=message)
+        return QueryResult(Outcome.RATE_LIMITED, status=status, reset_at=reset_at, message=message)
+    if 500 <= status < 600:
+        return QueryResult(Outcome.SERVER_ERROR, status=status, retry_after=retry_after, message=message)
+    return QueryResult(Outcome.UNEXPECTED_STATUS, status=status, message=message)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter and a retry budget per outcome
+
+    Rate-limit and auth outcomes are retried right away: the key manager moves to
+    another key (and sleeps until a reset if every key is drained).
+    """
+
+    DEFAULT_BUDGETS = {
+        Outcome.TIMEOUT: 0,  # Returned to the caller, which shrinks the page
+        Outcome.RATE_LIMITED: 10,
+        Outcome.SECONDARY_RATE_LIMIT: 5,
+        Outcome.AUTH_FAILED: 10,
+        Outcome.SERVER_ERROR: 4,
+        Outcome.NETWORK_ERROR: 4,
+        Outcome.INVALID_RESPONSE: 2,
+        Outcome.UNEXPECTED_STATUS: 2,
+    }
+    KEY_OUTCOMES = (Outcome.RATE_LIMITED, Outcome.SECONDARY_RATE_LIMIT, Outcome.AUTH_FAILED)
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0, max_attempts: int = 12,
+                 budgets: Dict[Outcome, int] = None):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.budgets = {**self.DEFAULT_BUDGETS, **(budgets or {})}
+
+    def start(self) -> "RetryState":
+        """Begin retry bookkeeping for one logical query"""
+        return RetryState(self)
+
+
+@dataclass
+class RetryState:
+    """Retry bookkeeping for one logical query"""
+    policy: RetryPolicy
+    attempts: int = 0
+    retries_by_outcome: Dict[Outcome, int] = field(default_factory=dict)
+
+    def should_retry(self, result: QueryResult) -> bool:
+        """Record a failed attempt and decide whether to try again"""
+        result.attempts = self.attempts
+        if result.ok or self.attempts >= self.policy.max_attempts:
+            return False
+        used = self.retries_by_outcome.get(result.outcome, 0)
+        if used >= self.policy.budgets.get(result.outcome, 0):
+            return False
+        self.retries_by_outcome[result.outcome] = used + 1
+        return True
+
+    def delay(self, result: QueryResult) -> float:
+        """Seconds to wait before the next attempt"""
+        if result.outcome in RetryPolicy.KEY_OUTCOMES:
+            return 0.0  # The key manager decides when a key can be used again
+        if result.retry_after is not None:
+            return min(self.policy.max_delay, result.retry_after)
+        retries = self.retries_by_outcome.get(result.outcome, 1)
+        ceiling = min(self.policy.max_delay, self.policy.base_delay * (2 ** retries))
+        return random.uniform(0, ceiling)
@@ -0,0 +1,199 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from config import Config
+from dedup_index import LayeredIndex, create_dedup_index
+from journal import CrawlJournal, atomic_write_json
+from metrics import start_exporters
+from storage import CsvJsonlStore, ParquetStore, create_store
+
+# Config paths that each shard gets its own copy of
+SHARD_PATHS = [
+    'CHECKPOINT_FILE', 'CSV_FILE', 'README_FILE', 'CRAWLED_REPOS_FILE', 'JOURNAL_FILE',
+    'DEDUP_INDEX_FILE', 'DEDUP_BLOOM_FILE', 'PARQUET_REPOS_DIR', 'PARQUET_README_DIR', 'KEY_STATE_FILE',
+    'README_SHARD_DIR', 'SEARCH_PLAN_FILE'
+]
+
+
+def shard_paths(shard_index: int) -> Dict[str, str]:
+    """Config path overrides for one shard: the same file names inside the shard directory"""
+    shard_dir = os.path.join(Config.SHARD_DIR, f"shard-{shard_index:02d}")
+    return {name: os.path.join(shard_dir, getattr(Config, name)) for name in SHARD_PATHS}
+
+
+def run_shard(shard_index: int, topics: List[str], keys: List[str], settings: Dict,
+              single_pass: bool, use_async: bool) -> int:
+    """Crawl one shard's topics with its own keys, checkpoint and output files (worker process)"""
+    for name, value in settings.items():
+        setattr(Config, name, value)
+
+    # The main crawl's dedup snapshot, read-only, so shards skip what is already merged
+    base_index = create_dedup_index()
+
+    paths = shard_paths(shard_index)
+    os.makedirs(os.path.dirname(paths['CHECKPOINT_FILE']), exist_ok=True)
+    for name, path in paths.items():
+        setattr(Config, name, path)
+    Config.ALL_TOPICS = topics
+    Config.API_KEYS = keys
+
+    if use_async:
+        from async_crawler import AsyncGitHubCrawler
+        crawler = AsyncGitHubCrawler(single_pass=single_pass)
+    else:
+        from crawler import GitHubCrawler
+        crawler = GitHubCrawler(single_pass=single_pass)
+    crawler.crawled_repos = LayeredIndex(base_index, crawler.crawled_repos)
+
+    # Workers have their own registry: snapshots go to the shard directory, there is no port
+    snapshot_file = None
+    if Config.METRICS_SNAPSHOT_FILE:
+        snapshot_file = os.path.join(os.path.dirname(paths['CHECKPOINT_FILE']),
+                                     os.path.basename(Config.METRICS_SNAPSHOT_FILE))
+    stop_exporters = start_exporters(None, snapshot_file, Config.METRICS_SNAPSHOT_INTERVAL)
+    try:
+        crawler.crawl_all_topics()
+    finally:
+        stop_exporters()
+    return len(crawler.crawled_repos)
+
+
+class ShardedCrawl:
+    """Crawl topics in parallel worker processes, then merge the shards into the main output
+
+    Topics are dealt round-robin to the shards and every shard gets its own slice of
+    the API keys, so workers never compete for a key. Each shard has its own
+    checkpoint, journal, dedup index and output files under Config.SHARD_DIR. A repo
+    found by several shards is written once: the merge checks every row against the
+    main dedup index, journaling accepted repos the same way the crawler does.
+    """
+
+    def __init__(self, workers: int = None, single_pass: bool = None, use_async: bool = False):
+        self.single_pass = single_pass
+        self.use_async = use_async
+        self.plan_file = os.path.join(Config.SHARD_DIR, "plan.json")
+        self.plan = self.load_plan(workers)
+
+    @classmethod
+    def existing(cls) -> Optional["ShardedCrawl"]:
+        """The sharded crawl of the plan in Config.SHARD_DIR, or None when there is no plan"""
+        if not os.path.exists(os.path.join(Config.SHARD_DIR, "plan.json")):
+            return None
+        return cls()
+
+    def load_plan(self, workers: Optional[int]) -> List[List[str]]:
+        """Topics per shard; an existing plan is kept so shard checkpoints stay valid"""
+        if os.path.exists(self.plan_file):
+            with open(self.plan_file, 'r') as f:
+                plan = json.load(f)["topics"]
+            if workers is not None and len(plan) != workers:
+                print(f"ℹ️ Resuming the existing plan with {len(plan)} shards "
+                      f"(--reset merges its shards into the main output, then a new plan is made)")
+            return plan
+
+        workers = max(1, min(workers, len(Config.API_KEYS), len(Config.ALL_TOPICS)))
+        plan = [Config.ALL_TOPICS[i::workers] for i in range(workers)]
+        os.makedirs(Config.SHARD_DIR, exist_ok=True)
+        atomic_write_json(self.plan_file, {"topics": plan}, indent=2)
+        return plan
+
+    def shard_keys(self, shard_index: int) -> List[str]:
+        """API keys of one shard"""
+        return Config.API_KEYS[shard_index::len(self.plan)]
+
+    def prepare_main_index(self):
+        """Fold the main journal into the main dedup snapshot so the shards can read it"""
+        index = create_dedup_index()
+        journal = CrawlJournal()
+        checkpoint = journal.load(index) or {}
+        journal.compact(checkpoint, index)
+        journal.close()
+        index.close()
+
+    def crawl_shards(self):
+        """Run every shard in its own process"""
+        settings = {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+        with ProcessPoolExecutor(max_workers=len(self.plan)) as executor:
+            futures = [
+                executor.submit(run_shard, i, topics, self.shard_keys(i), settings, self.single_pass, self.use_async)
+                for i, topics in enumerate(self.plan)
+            ]
+            for i, future in enumerate(futures):
+                print(f"✅ Shard {i} finished with {future.result()} repos")
+
+    def open_shard_store(self, shard_index: int):
+        """Output store of a shard, for reading, cut back to what the shard's journal committed"""
+        paths = shard_paths(shard_index)
+        if Config.OUTPUT_FORMAT == 'parquet':
+            store = ParquetStore(paths['PARQUET_REPOS_DIR'], paths['PARQUET_README_DIR'])
+        else:
+            store = CsvJsonlStore(paths['CSV_FILE'], paths['README_FILE'], paths['README_SHARD_DIR'])
+        # A shard stopped mid-crawl may have rows past its last commit
+        CrawlJournal(paths['JOURNAL_FILE'], paths['CHECKPOINT_FILE']).load(set(), store)
+        return store
+
+    def commit_merged(self, store, journal: CrawlJournal, checkpoint: Dict):
+        """Flush merged rows to disk, then journal them with the main store's new size"""
+        store.flush()
+        checkpoint["store"] = store.position()
+        journal.append_checkpoint(checkpoint)
+        journal.commit()
+
+    def merge(self):
+        """Append every shard's repos that are not in the main output yet"""
+        store = create_store()
+        journal = CrawlJournal()
+        index = create_dedup_index()
+        checkpoint = journal.load(index, store) or {}
+
+        try:
+            if not checkpoint.get("store"):
+                self.commit_merged(store, journal, checkpoint)  # Record where the main store starts
+            for shard_index in range(len(self.plan)):
+                if not os.path.exists(os.path.dirname(shard_paths(shard_index)['CHECKPOINT_FILE'])):
+                    continue  # Never started
+                source = self.open_shard_store(shard_index)
+                merged = duplicates = 0
+                for repo, readme in zip(source.iter_repos(), source.iter_readmes()):
+                    if repo['repo_id'] != readme['repo_id']:
+                        raise ValueError(f"Shard {shard_index} repos and READMEs are out of step at {repo['repo_id']}")
+                    if repo['repo_id'] in index:
+                        duplicates += 1
+                        continue
+
+                    store.write_repo(repo)
+                    store.write_readme(readme['repo_id'], readme['full_name'], readme['readme'], readme['timestamp'])
+                    index.add(repo['repo_id'])
+                    journal.append_repo(repo['repo_id'])
+                    merged += 1
+                    if merged % store.flush_interval == 0:
+                        self.commit_merged(store, journal, checkpoint)
+
+                self.commit_merged(store, journal, checkpoint)
+                print(f"🔀 Shard {shard_index}: merged {merged} repos, skipped {duplicates} already crawled")
+
+            journal.compact(checkpoint, index)
+            print(f"📊 Total unique repositories crawled: {len(index)}")
+        finally:
+            store.close()
+            journal.close()
+            index.close()
+
+    def crawl_all_topics(self):
+        """Crawl all shards, then merge them"""
+        if len(self.plan) > len(Config.API_KEYS):
+            raise ValueError(f"The shard plan needs at least {len(self.plan)} API keys; add keys, or use --reset "
+                             f"to merge the shards crawled so far and make a new plan")
+        print(f"🧩 Sharded crawl: {len(self.plan)} workers")
+        for i, topics in enumerate(self.plan):
+            print(f"  - Shard {i}: {len(topics)} topics, {len(self.shard_keys(i))} API key(s)")
+
+        self.prepare_main_index()
+        try:
+            self.crawl_shards()
+        except KeyboardInterrupt:
+            print("\n\n🛑 Sharded crawl stopped by user")
+            print("ℹ️ Shard checkpoints are saved. Run again to resume and merge.")
+            return
+        self.merge()
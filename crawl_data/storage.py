@@ -0,0 +1,340 @@
+import csv
+import glob
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import Config
+from readme_corpus import ReadmeOffsetIndex
+from readme_shards import ZstdReadmeShards
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency, only needed for the Parquet store
+    pa = None
+    pq = None
+
+
+REPO_FIELDS = [
+    'repo_id', 'name', 'full_name', 'description', 'topics',
+    'language', 'stars_count', 'forks_count', 'created_at',
+    'updated_at', 'url'
+]
+
+
+def file_state(path: str) -> Optional[List[int]]:
+    """[size, inode] of an output file (None if missing), as recorded in journal checkpoints"""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_ino]
+
+
+def cut_file(path: str, state: Optional[List[int]]) -> Optional[int]:
+    """Truncate a file back to a recorded file_state; returns its size, or None if it was left alone"""
+    if not os.path.exists(path):
+        return None
+    size, inode = state if state else (0, None)  # Missing at the checkpoint: everything is newer
+    stat = os.stat(path)
+    if inode is not None and stat.st_ino != inode:
+        print(f"⚠️ {path} was rewritten after the last checkpoint, not cutting it back")
+        return None
+    if stat.st_size < size:
+        print(f"⚠️ {path} is shorter than the last checkpoint recorded ({stat.st_size} < {size} bytes)")
+        return None
+    if stat.st_size > size:
+        print(f"✂️ Dropping {stat.st_size - size} bytes of {path} written after the last checkpoint")
+        with open(path, 'r+b') as f:
+            f.truncate(size)
+            os.fsync(f.fileno())
+    return size
+
+
+class CsvJsonlStore:
+    """Appends repos to the CSV and READMEs to the JSONL file through handles kept open
+
+    Rows are buffered until flush(), which fsyncs them before the crawler commits them.
+    The committed size of each file is journaled with the checkpoint (position()), and
+    restore() cuts off rows a crash left behind between a flush and its commit.
+    The byte offset of every README line goes to a sidecar index (see readme_corpus.py).
+    With Config.README_COMPRESSION = "zstd" the README lines go to compressed shards
+    (see readme_shards.py) instead of the JSONL file.
+    """
+
+    flush_interval = 10  # Repos between checkpoints
+
+    def __init__(self, csv_file: str = None, readme_file: str = None, readme_shard_dir: str = None):
+        self.csv_file = csv_file or Config.CSV_FILE
+        self.readme_file = readme_file or Config.README_FILE
+        self.readme_shards = None
+        if Config.README_COMPRESSION == "zstd":
+            self.readme_shards = ZstdReadmeShards(readme_shard_dir)
+            if os.path.exists(self.readme_file):
+                print(f"⚠️ {self.readme_file} is not read while README_COMPRESSION is set "
+                      f"(move it into the shards with --convert-readmes)")
+        elif Config.README_COMPRESSION:
+            raise ValueError(f"Unknown README compression: {Config.README_COMPRESSION}")
+        self.csv_handle = None
+        self.csv_writer = None
+        self.readme_handle = None
+        self.readme_index = ReadmeOffsetIndex(self.readme_file)
+        self.repo_rows: List[Dict] = []
+        self.readme_lines: List[Tuple[str, bytes]] = []  # (repo_id, encoded JSON line)
+
+    def _open_csv(self):
+        write_header = not os.path.exists(self.csv_file) or os.path.getsize(self.csv_file) == 0
+        self.csv_handle = open(self.csv_file, 'a', newline='', encoding='utf-8')
+        self.csv_writer = csv.DictWriter(self.csv_handle, fieldnames=REPO_FIELDS)
+        if write_header:
+            self.csv_writer.writeheader()
+
+    def write_repo(self, repo_data: Dict):
+        """Buffer one repository row"""
+        self.repo_rows.append(repo_data)
+
+    def write_readme(self, repo_id: str, full_name: str, readme_text: str, timestamp: str = None):
+        """Buffer one README line"""
+        json_line = json.dumps({
+            'repo_id': repo_id,
+            'full_name': full_name,
+            'readme': readme_text,
+            'timestamp': timestamp or datetime.now().isoformat()
+        }, ensure_ascii=False)
+        if self.readme_shards is not None:
+            self.readme_shards.write(repo_id, (json_line + '\n').encode('utf-8'))
+            return
+        self.readme_lines.append((repo_id, (json_line + '\n').encode('utf-8')))
+
+    def flush(self):
+        """Write buffered rows and push them to disk"""
+        if self.repo_rows:
+            if self.csv_writer is None:
+                self._open_csv()
+            self.csv_writer.writerows(self.repo_rows)
+            self.repo_rows = []
+        records = []
+        if self.readme_lines:
+            if self.readme_handle is None:
+                self.readme_index.sync()  # Index lines written before the index existed or a crash
+                self.readme_handle = open(self.readme_file, 'ab')
+            offset = self.readme_handle.tell()
+            for repo_id, line in self.readme_lines:
+                records.append((repo_id, offset, len(line)))
+                offset += len(line)
+            self.readme_handle.write(b''.join(line for _, line in self.readme_lines))
+            self.readme_lines = []
+        for handle in (self.csv_handle, self.readme_handle):
+            if handle is not None:
+                handle.flush()
+                os.fsync(handle.fileno())  # On disk before the journal commits the rows
+        if records:
+            self.readme_index.append(records)  # After the lines, so the index never points past the file
+        if self.readme_shards is not None:
+            self.readme_shards.flush()
+
+    def position(self) -> Dict:
+        """Size of the flushed output, recorded in the journal checkpoint committed after flush()"""
+        position = {"csv": file_state(self.csv_file)}
+        if self.readme_shards is not None:
+            position["readme_shards"] = self.readme_shards.position()
+        else:
+            position["readme"] = file_state(self.readme_file)
+        return position
+
+    def restore(self, position: Dict):
+        """Cut the files back to a journaled position (rows flushed after it were never committed)"""
+        if "csv" in position:
+            cut_file(self.csv_file, position["csv"])
+        if self.readme_shards is not None:
+            if "readme_shards" in position:
+                self.readme_shards.restore(position["readme_shards"])
+        elif "readme" in position:
+            size = cut_file(self.readme_file, position["readme"])
+            if size is not None:
+                self.readme_index.truncate(size)
+
+    def close(self):
+        """Flush and close the files"""
+        self.flush()
+        for handle in (self.csv_handle, self.readme_handle):
+            if handle is not None:
+                handle.close()
+        self.csv_handle = self.csv_writer = self.readme_handle = None
+        if self.readme_shards is not None:
+            self.readme_shards.close()
+    
+    def upsert(self, repo_rows: Dict[str, Dict], readme_records: Dict[str, Dict]):
+        """Replace rows of already stored repos (keyed by repo_id) by rewriting both files in one pass"""
+        self.close()
+        if repo_rows and os.path.exists(self.csv_file):
+            tmp_file = self.csv_file + '.tmp'
+            with open(self.csv_file, 'r', newline='', encoding='utf-8') as src, \
+                    open(tmp_file, 'w', newline='', encoding='utf-8') as dst:
+                writer = csv.DictWriter(dst, fieldnames=REPO_FIELDS)
+                writer.writeheader()
+                for row in csv.DictReader(src):
+                    writer.writerow(repo_rows.get(row['repo_id'], row))
+            os.replace(tmp_file, self.csv_file)
+        if readme_records and self.readme_shards is not None:
+            self.readme_shards.upsert(readme_records)
+        elif readme_records and os.path.exists(self.readme_file):
+            tmp_file = self.readme_file + '.tmp'
+            records = []
+            offset = 0
+            with open(self.readme_file, 'rb') as src, open(tmp_file, 'wb') as dst:
+                for line in src:
+                    repo_id = json.loads(line)['repo_id']
+                    record = readme_records.get(repo_id)
+                    if record:
+                        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+                    dst.write(line)
+                    records.append((repo_id, offset, len(line)))
+                    offset += len(line)
+            os.replace(tmp_file, self.readme_file)
+            self.readme_index.rewrite(records)
+    
+    def iter_repos(self) -> Iterator[Dict]:
+        """Repository rows already on disk"""
+        if os.path.exists(self.csv_file):
+            with open(self.csv_file, 'r', newline='', encoding='utf-8') as f:
+                yield from csv.DictReader(f)
+    
+    def iter_readmes(self) -> Iterator[Dict]:
+        """README records already on disk"""
+        if self.readme_shards is not None:
+            yield from self.readme_shards.iter_readmes()
+        elif os.path.exists(self.readme_file):
+            with open(self.readme_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+
+
+class ParquetStore:
+    """Buffers rows in memory and writes them as Parquet part files, one row group per flush
+
+    Metadata and README text go to separate datasets, so downstream stages can read
+    the metadata (or only the README column) without parsing the other.
+    """
+
+    REPO_SCHEMA = [
+        ('repo_id', 'string'), ('name', 'string'), ('full_name', 'string'), ('description', 'string'),
+        ('topics', 'string'), ('language', 'string'), ('stars_count', 'int64'), ('forks_count', 'int64'),
+        ('created_at', 'string'), ('updated_at', 'string'), ('url', 'string')
+    ]
+    README_SCHEMA = [('repo_id', 'string'), ('full_name', 'string'), ('readme', 'string'), ('timestamp', 'string')]
+
+    def __init__(self, repos_dir: str = None, readme_dir: str = None):
+        if pa is None:
+            raise ImportError("pyarrow is required for the Parquet output store (pip install pyarrow)")
+        self.repos_dir = repos_dir or Config.PARQUET_REPOS_DIR
+        self.readme_dir = readme_dir or Config.PARQUET_README_DIR
+        self.flush_interval = Config.PARQUET_CHECKPOINT_INTERVAL  # Repos between checkpoints
+        self.repo_rows: List[Dict] = []
+        self.readme_rows: List[Dict] = []
+        os.makedirs(self.repos_dir, exist_ok=True)
+        os.makedirs(self.readme_dir, exist_ok=True)
+
+    def write_repo(self, repo_data: Dict):
+        """Buffer one repository row"""
+        self.repo_rows.append(repo_data)
+
+    def write_readme(self, repo_id: str, full_name: str, readme_text: str, timestamp: str = None):
+        """Buffer one README row"""
+        self.readme_rows.append({
+            'repo_id': repo_id,
+            'full_name': full_name,
+            'readme': readme_text,
+            'timestamp': timestamp or datetime.now().isoformat()
+        })
+
+    def _write_part(self, directory: str, rows: List[Dict], schema_fields):
+        """Write rows as a new part file (tmp file + rename, so parts are never half-written)"""
+        schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in schema_fields])
+        table = pa.Table.from_pylist(rows, schema=schema)
+        part_index = len(glob.glob(os.path.join(directory, 'part-*.parquet')))
+        path = os.path.join(directory, f'part-{part_index:05d}.parquet')
+        tmp_path = os.path.join(directory, f'.part-{part_index:05d}.parquet.tmp')  # Hidden from dataset readers
+        pq.write_table(table, tmp_path, compression='zstd')
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())  # On disk before the journal commits the rows
+        os.replace(tmp_path, path)
+
+    def flush(self):
+        """Write buffered rows as one row group per dataset"""
+        if self.repo_rows:
+            self._write_part(self.repos_dir, self.repo_rows, self.REPO_SCHEMA)
+            self.repo_rows = []
+        if self.readme_rows:
+            self._write_part(self.readme_dir, self.readme_rows, self.README_SCHEMA)
+            self.readme_rows = []
+
+    def position(self) -> Dict:
+        """Part files written so far, recorded in the journal checkpoint committed after flush()"""
+        return {"repo_parts": len(glob.glob(os.path.join(self.repos_dir, 'part-*.parquet'))),
+                "readme_parts": len(glob.glob(os.path.join(self.readme_dir, 'part-*.parquet')))}
+
+    def restore(self, position: Dict):
+        """Remove part files written after a journaled position (their rows were never committed)"""
+        for directory, key in ((self.repos_dir, "repo_parts"), (self.readme_dir, "readme_parts")):
+            if key not in position:
+                continue
+            for path in sorted(glob.glob(os.path.join(directory, 'part-*.parquet')))[position[key]:]:
+                print(f"✂️ Removing {path}, written after the last checkpoint")
+                os.remove(path)
+
+    def close(self):
+        """Write the remaining rows"""
+        self.flush()
+
+    def _upsert_parts(self, directory: str, rows: Dict[str, Dict], schema_fields):
+        """Rewrite the part files holding any of the given repo_ids, in place"""
+        schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in schema_fields])
+        for path in sorted(glob.glob(os.path.join(directory, 'part-*.parquet'))):
+            ids = pq.read_table(path, columns=['repo_id']).column('repo_id').to_pylist()
+            if not any(repo_id in rows for repo_id in ids):
+                continue
+            updated = [rows.get(row['repo_id'], row) for row in pq.read_table(path).to_pylist()]
+            tmp_path = os.path.join(directory, '.' + os.path.basename(path) + '.tmp')
+            pq.write_table(pa.Table.from_pylist(updated, schema=schema), tmp_path, compression='zstd')
+            os.replace(tmp_path, path)
+
+    def upsert(self, repo_rows: Dict[str, Dict], readme_records: Dict[str, Dict]):
+        """Replace rows of already stored repos (keyed by repo_id), rewriting only the affected parts"""
+        self.flush()
+        if repo_rows:
+            self._upsert_parts(self.repos_dir, repo_rows, self.REPO_SCHEMA)
+        if readme_records:
+            self._upsert_parts(self.readme_dir, readme_records, self.README_SCHEMA)
+
+    def _iter_rows(self, directory: str) -> Iterator[Dict]:
+        for path in sorted(glob.glob(os.path.join(directory, 'part-*.parquet'))):
+            for batch in pq.ParquetFile(path).iter_batches():
+                yield from batch.to_pylist()
+    
+    def iter_repos(self) -> Iterator[Dict]:
+        """Repository rows already on disk"""
+        return self._iter_rows(self.repos_dir)
+    
+    def iter_readmes(self) -> Iterator[Dict]:
+        """README records already on disk"""
+        return self._iter_rows(self.readme_dir)
+    
+    def export_csv(self, csv_file: str = None):
+        """Export the metadata dataset to CSV"""
+        csv_file = csv_file or Config.CSV_FILE
+        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=REPO_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.iter_repos())
+        print(f"✅ Exported {self.repos_dir} to {csv_file}")
+
+
+def create_store(output_format: Optional[str] = None):
+    """Output store for the configured format ('csv' or 'parquet')"""
+    output_format = output_format or Config.OUTPUT_FORMAT
+    if output_format == 'parquet':
+        return ParquetStore()
+    if output_format == 'csv':
+        return CsvJsonlStore()
+    raise ValueError(f"Unknown output format: {output_format}")
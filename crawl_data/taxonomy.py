@@ -1,8 +1,19 @@
+import glob
+import hashlib
+import os
+import numpy as np
 import pandas as pd
 import json
-from collections import Counter
-from typing import Dict, List, Tuple
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from config import Config
+from classification_cache import ClassificationCache
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency, only needed for Parquet input
+    pq = None
 
 
 class TaxonomyClassifier:
@@ -20,11 +31,40 @@ class TaxonomyClassifier:
             "EmergingTech",
             "SoftwareEngTools"
         ]
+        self.build_topic_lookup()
+    
+    def build_topic_lookup(self):
+        """Precompute the topic -> category column lookup used by classify_series"""
+        # Columns in tie-break order: priority categories first, then the rest in taxonomy order
+        self.category_columns = [c for c in self.priority_order if c in self.taxonomy] + \
+                                [c for c in self.taxonomy if c not in self.priority_order]
+        self.topic_columns: Dict[str, List[int]] = {}
+        for column, category in enumerate(self.category_columns):
+            for topic in set(self.taxonomy[category]):
+                self.topic_columns.setdefault(topic, []).append(column)
         
+    def taxonomy_hash(self) -> str:
+        """Hash of everything classify_repository depends on besides the topics"""
+        payload = json.dumps([self.taxonomy, self.priority_order], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
     def load_repos(self) -> pd.DataFrame:
-        """Load repository data from CSV"""
+        """Load repository metadata from the configured output store"""
+        if Config.OUTPUT_FORMAT == "parquet":
+            return pd.read_parquet(Config.PARQUET_REPOS_DIR)
         return pd.read_csv(Config.CSV_FILE)
     
+    def iter_repo_chunks(self, chunksize: int) -> Iterator[pd.DataFrame]:
+        """Stream repository metadata from the configured output store, chunksize rows at a time"""
+        if Config.OUTPUT_FORMAT == "parquet":
+            if pq is None:
+                raise ImportError("pyarrow is required to read the Parquet dataset (pip install pyarrow)")
+            for path in sorted(glob.glob(os.path.join(Config.PARQUET_REPOS_DIR, 'part-*.parquet'))):
+                for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+                    yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(Config.CSV_FILE, chunksize=chunksize)
+    
     def analyze_topic_frequency(self, df: pd.DataFrame) -> Dict[str, int]:
         """Analyze frequency of each topic"""
         topic_counter = Counter()
@@ -64,46 +104,167 @@ class TaxonomyClassifier:
         
         return top_categories[0] if top_categories else "Others"
     
-    def classify_all_repos(self):
-        """Classify all repositories and save results"""
+    def classify_series(self, topics: pd.Series) -> pd.Series:
+        """Vectorized classify_repository over a whole column of topic strings
+        
+        All topic strings are split in one pass and factorized, so the lookup runs once
+        per distinct topic. Distinct (row, topic) pairs form a sparse row x topic matrix
+        that is reduced to per-category scores with bincount, and argmax over the
+        priority-ordered columns resolves ties (the first maximum wins).
+        """
+        values = topics.to_numpy(dtype=object)
+        categories = np.full(len(values), "Others", dtype=object)
+        valid = np.flatnonzero(pd.notna(values) & (values != ""))
+        if len(valid) == 0:
+            return pd.Series(categories, index=topics.index, name='category')
+        
+        # Flat token list with the row each token came from
+        valid_values = values[valid]
+        tokens = ';'.join(valid_values).split(';')
+        rows = np.repeat(np.arange(len(valid)), [value.count(';') + 1 for value in valid_values])
+        codes, uniques = pd.factorize(np.asarray(tokens, dtype=object))
+        
+        # Keep taxonomy topics only, one entry per distinct topic of a row
+        num_columns = len(self.category_columns)
+        membership = np.zeros((num_columns, len(uniques)), dtype=bool)
+        for code, topic in enumerate(uniques):
+            for column in self.topic_columns.get(topic, ()):
+                membership[column, code] = True
+        known = membership.any(axis=0)[codes]
+        pairs = pd.unique(rows[known].astype(np.int64) * len(uniques) + codes[known])
+        pair_rows, pair_codes = np.divmod(pairs, len(uniques))
+        
+        scores = np.empty((len(valid), num_columns), dtype=np.int64)
+        for column in range(num_columns):
+            scores[:, column] = np.bincount(pair_rows[membership[column, pair_codes]], minlength=len(valid))
+        
+        best = scores.argmax(axis=1)
+        labels = np.asarray(self.category_columns, dtype=object)[best]
+        labels[scores[np.arange(len(valid)), best] == 0] = "Others"
+        categories[valid] = labels
+        return pd.Series(categories, index=topics.index, name='category')
+    
+    def classify_chunk(self, chunk: pd.DataFrame) -> Tuple[pd.DataFrame, Counter, Counter]:
+        """Classify one chunk and count its topics and categories"""
+        chunk['category'] = self.classify_series(chunk['topics'])
+        return chunk, Counter(self.analyze_topic_frequency(chunk)), Counter(chunk['category'])
+    
+    def classify_chunk_cached(self, chunk: pd.DataFrame, cache: ClassificationCache) -> Tuple[pd.DataFrame, Counter, Counter]:
+        """Classify only the new or changed repos of a chunk and return the count deltas"""
+        repo_ids = chunk['repo_id'].astype(str).tolist()
+        topics = [value if isinstance(value, str) else None for value in chunk['topics']]
+        categories = cache.cached_categories(repo_ids, topics)
+        stale = [i for i, category in enumerate(categories) if category is None]
+        
+        topic_delta, category_delta = Counter(), Counter()
+        if stale:
+            fresh = chunk.iloc[stale]
+            fresh_categories = self.classify_series(fresh['topics']).tolist()
+            topic_delta.update(self.analyze_topic_frequency(fresh))
+            category_delta.update(fresh_categories)
+            
+            # Changed repos: take their previous contribution back out of the counts
+            previous = cache.changed_results()
+            topic_delta.subtract(self.analyze_topic_frequency(pd.DataFrame({'topics': [t for t, _ in previous]})))
+            category_delta.subtract(category for _, category in previous)
+            
+            for i, category in zip(stale, fresh_categories):
+                categories[i] = category
+            cache.store([(repo_ids[i], topics[i], categories[i]) for i in stale], topic_delta, category_delta)
+        
+        chunk['category'] = categories
+        return chunk, topic_delta, category_delta
+    
+    def iter_classified_chunks(self, chunksize: int, workers: int) -> Iterator[Tuple[pd.DataFrame, Counter, Counter]]:
+        """Classified chunks in input order, fanned out over worker processes if workers > 1"""
+        chunks = self.iter_repo_chunks(chunksize)
+        if workers <= 1:
+            yield from map(self.classify_chunk, chunks)
+            return
+        
+        # At most 2 chunks per worker in flight keeps memory bounded
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(executor.submit(self.classify_chunk, chunk))
+                if len(in_flight) >= workers * 2:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+    
+    def classify_all_repos(self, chunksize: Optional[int] = None, workers: Optional[int] = None,
+                           incremental: bool = False) -> Dict:
+        """Classify all repositories chunk by chunk and save results
+        
+        Each classified chunk is appended to the output CSV as soon as it is ready and
+        only the topic/category counters are kept, so memory does not grow with the input.
+        In incremental mode only repos that are new or whose topics changed since the
+        last run are classified; the rest come from the classification cache. Incremental
+        runs classify in this process, workers are not used.
+        
+        Returns the taxonomy mapping written to Config.TAXONOMY_MAPPING_FILE (taxonomy,
+        priority_order, statistics, topic_frequency), not the classified DataFrame: the
+        classified rows are only in Config.CLASSIFIED_CSV_FILE, read it to get them.
+        """
+        chunksize = chunksize or Config.CLASSIFY_CHUNK_SIZE
+        workers = workers or Config.CLASSIFY_WORKERS
+        if incremental and workers > 1:
+            print(f"⚠️ Ignoring {workers} workers: incremental classification runs in one process")
+            workers = 1
         print("\n🏷️ Starting Taxonomy Classification")
+        print(f"📦 Chunks of {chunksize} repos, {workers} worker(s)")
         
-        # Load data
-        df = self.load_repos()
-        print(f"📊 Loaded {len(df)} repositories")
+        cache = None
+        if incremental:
+            cache = ClassificationCache(self.taxonomy_hash())
+            chunks = (self.classify_chunk_cached(chunk, cache) for chunk in self.iter_repo_chunks(chunksize))
+        else:
+            chunks = self.iter_classified_chunks(chunksize, workers)
         
-        # Analyze topic frequency
-        topic_freq = self.analyze_topic_frequency(df)
+        topic_counter = Counter()
+        category_counter = Counter()
+        total = 0
+        output_file = Config.CLASSIFIED_CSV_FILE
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            for chunk, chunk_topics, chunk_categories in chunks:
+                chunk.to_csv(f, index=False, header=(total == 0))
+                topic_counter.update(chunk_topics)
+                category_counter.update(chunk_categories)
+                total += len(chunk)
+                print(f"  ✓ Classified {total} repositories")
+        
+        if cache is not None:
+            # The per-chunk counters are deltas; the totals live in the cache
+            removed = cache.remove_unseen()
+            topic_counter, category_counter = cache.topic_frequency(), cache.category_counts()
+            print(f"♻️ {cache.classified} new or changed repos classified, {total - cache.classified} from cache, "
+                  f"{removed} no longer in the input dropped")
+            cache.close()
+        
+        topic_freq = dict(topic_counter)
         print(f"\n📈 Top 20 most frequent topics:")
         for topic, count in sorted(topic_freq.items(), key=lambda x: x[1], reverse=True)[:20]:
             print(f"  - {topic}: {count}")
         
-        # Classify each repository
-        df['category'] = df['topics'].apply(self.classify_repository)
-        
         # Statistics
-        category_counts = df['category'].value_counts()
+        category_counts = dict(sorted(category_counter.items(), key=lambda x: x[1], reverse=True))
         print(f"\n📊 Category distribution:")
         for category, count in category_counts.items():
-            percentage = (count / len(df)) * 100
+            percentage = (count / total) * 100
             print(f"  - {category}: {count} ({percentage:.1f}%)")
-        
-        # Save classified data
-        output_file = "github_repos_classified.csv"
-        df.to_csv(output_file, index=False)
         print(f"\n✅ Classified data saved to {output_file}")
         
         # Save category mapping
         category_mapping = {
             "taxonomy": self.taxonomy,
             "priority_order": self.priority_order,
-            "statistics": category_counts.to_dict(),
+            "statistics": category_counts,
             "topic_frequency": topic_freq
         }
         
-        with open("taxonomy_mapping.json", 'w') as f:
+        with open(Config.TAXONOMY_MAPPING_FILE, 'w') as f:
             json.dump(category_mapping, f, indent=2)
         
-        print("✅ Taxonomy mapping saved to taxonomy_mapping.json")
+        print(f"✅ Taxonomy mapping saved to {Config.TAXONOMY_MAPPING_FILE}")
         
-        return df
\ No newline at end of file
+        return category_mapping
@@ -0,0 +1,104 @@
+"""
+Crash-resume test: the crawler is killed after the output store is flushed but before
+the journal commits, then resumed. The resumed output must match an uninterrupted crawl
+exactly (no duplicated rows, no skipped repos, READMEs in step with the CSV).
+
+Run from crawl_data/: python -m pytest tests
+"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+CRAWL_DATA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CRAWL_DATA)
+sys.path.insert(0, os.path.join(CRAWL_DATA, 'benchmarks'))
+
+from config import Config
+from stub_server import StubGitHub
+
+# Crawls one topic against the stub; with kill_at > 0, exits hard inside the
+# kill_at-th journal commit (the store is already flushed, the journal is not written)
+CHILD = r'''
+import os, sys
+crawl_data, endpoint, kill_at, compression = sys.argv[1], sys.argv[2], int(sys.argv[3]), sys.argv[4] or None
+sys.path.insert(0, crawl_data)
+from config import Config
+from journal import CrawlJournal
+
+Config.GRAPHQL_ENDPOINT = endpoint
+Config.API_KEYS = ["stub-key-1"]
+Config.ALL_TOPICS = Config.ALL_TOPICS[:1]
+Config.REPOS_PER_SORT = 40
+Config.PAGE_DELAY_SECONDS = Config.ERROR_DELAY_SECONDS = Config.TOPIC_PAUSE_SECONDS = 0
+Config.README_COMPRESSION = compression
+
+commits = [0]
+commit = CrawlJournal.commit
+def commit_or_die(self):
+    commits[0] += 1
+    if commits[0] == kill_at:
+        os._exit(9)
+    commit(self)
+CrawlJournal.commit = commit_or_die
+
+from crawler import GitHubCrawler
+GitHubCrawler().crawl_all_topics()
+'''
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    stub = StubGitHub(topics=Config.ALL_TOPICS[:1], repos=2000)
+    url = stub.start()
+    yield url
+    stub.stop()
+
+
+def crawl(workdir, endpoint: str, compression: str, kill_at: int = 0) -> int:
+    result = subprocess.run([sys.executable, "-c", CHILD, CRAWL_DATA, endpoint, str(kill_at), compression or ""],
+                            cwd=workdir, capture_output=True, text=True)
+    return result.returncode
+
+
+def crawled_ids(workdir, compression: str):
+    with open(os.path.join(workdir, Config.CSV_FILE), newline='', encoding='utf-8') as f:
+        repo_ids = [row['repo_id'] for row in csv.DictReader(f)]
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        Config.README_COMPRESSION = compression
+        from storage import CsvJsonlStore
+        readme_ids = [record['repo_id'] for record in CsvJsonlStore().iter_readmes()]
+    finally:
+        Config.README_COMPRESSION = None
+        os.chdir(cwd)
+    return repo_ids, readme_ids
+
+
+@pytest.mark.parametrize("compression", [None, "zstd"])
+@pytest.mark.parametrize("kill_at", [2, 4])
+def test_kill_between_store_flush_and_journal_commit(tmp_path, endpoint, compression, kill_at):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    clean, resumed = tmp_path / "clean", tmp_path / "resumed"
+    clean.mkdir()
+    resumed.mkdir()
+
+    assert crawl(clean, endpoint, compression) == 0
+    assert crawl(resumed, endpoint, compression, kill_at) == 9
+    assert crawl(resumed, endpoint, compression) == 0
+
+    expected, _ = crawled_ids(clean, compression)
+    repo_ids, readme_ids = crawled_ids(resumed, compression)
+    assert len(repo_ids) == len(set(repo_ids)), "rows of the uncommitted flush were written twice"
+    assert set(repo_ids) == set(expected)
+    assert readme_ids == repo_ids
+
+    with open(resumed / Config.JOURNAL_FILE) as f:
+        checkpoints = [json.loads(line)["checkpoint"] for line in f if '"checkpoint"' in line]
+    assert checkpoints and all("store" in checkpoint for checkpoint in checkpoints)